@@ -54,6 +54,9 @@ async def _create_indexes():
         # Index on createdAt for cleanup operations
         await db.db.downloads.create_index("createdAt")
 
+        # Index for the stuck-job reaper's scan of stale processing jobs
+        await db.db.downloads.create_index([("status", 1), ("updatedAt", 1)])
+
         logger.info("Database indexes created successfully")
     except Exception as e:
         logger.warning(f"Error creating indexes (may already exist): {e}")
@@ -54,21 +54,131 @@ class Settings(BaseSettings):
 
     # Timeouts (in seconds)
     YTDLP_INFO_TIMEOUT: int = 60  # seconds
-    YTDLP_DOWNLOAD_TIMEOUT: int = 300  # 5 minutes
+    YTDLP_DOWNLOAD_TIMEOUT: int = 300  # 5 minutes; capped by what is left of the task's soft time limit
+    YTDLP_STALL_TIMEOUT: int = 60  # Kill a download that makes no progress for this long (0 = off)
     STORAGE_UPLOAD_TIMEOUT: int = 180  # 3 minutes
 
+    # Streaming download-to-cloud (no local spooling)
+    STREAMING_UPLOAD_ENABLED: bool = False
+    STREAM_UPLOAD_CHUNK_SIZE: int = 8 * 1024 * 1024  # Multiple of 256 KB (GCS) and >= 5 MB (S3)
+
+    # Video metadata cache (shared via Redis)
+    VIDEO_INFO_CACHE_ENABLED: bool = True
+    VIDEO_INFO_CACHE_TTL: int = 6 * 3600  # seconds
+    VIDEO_INFO_CACHE_NEGATIVE_TTL: int = 300  # seconds to remember "Video unavailable"
+    VIDEO_INFO_CACHE_MAX_ENTRIES: int = 20000
+
+    # Single-flight coalescing of concurrent jobs for the same video
+    SINGLE_FLIGHT_ENABLED: bool = True
+    SINGLE_FLIGHT_LOCK_TTL: int = 60  # seconds; extended on every leader heartbeat, so keep it above JOB_HEARTBEAT_INTERVAL
+    SINGLE_FLIGHT_WAIT_TIMEOUT: int = 180  # seconds a follower defers before downloading uncoordinated
+    SINGLE_FLIGHT_RECHECK_INTERVAL: int = 15  # countdown before a deferred follower checks again
+
     # Celery
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/0"
+    # Per task attempt. The soft limit only interrupts the task's main thread, not a
+    # yt-dlp process or engine call running in an executor, so downloads get their
+    # own deadline ending TASK_UPLOAD_HEADROOM seconds before it.
+    CELERY_TASK_SOFT_TIME_LIMIT: int = 240
+    CELERY_TASK_TIME_LIMIT: int = 300
+    TASK_UPLOAD_HEADROOM: int = 60
 
     # Local binary paths (optional - set by setup_ffmpeg.py)
     FFMPEG_PATH: Optional[str] = None
     FFPROBE_PATH: Optional[str] = None
     YT_DLP_PATH: Optional[str] = None
 
+    # yt-dlp engine: "subprocess" spawns yt-dlp per call, "inprocess" uses a warm worker pool
+    YTDLP_ENGINE: str = "subprocess"
+    YTDLP_ENGINE_WORKERS: int = 1  # Long-lived yt-dlp worker processes (keep low on 1GB hosts)
+    YTDLP_ENGINE_MAX_TASKS_PER_WORKER: int = 50  # Recycle workers to cap memory growth (0 = never)
+    YTDLP_SINGLE_PASS: bool = True  # Extract info and download in one yt-dlp run for new videos
+    YTDLP_CONCURRENT_FRAGMENTS: int = 0  # Fixed --concurrent-fragments (0 = adaptive)
+    YTDLP_MAX_CONCURRENT_FRAGMENTS: int = 8  # Upper bound per job when adaptive
+    YTDLP_FRAGMENT_HOST_BUDGET: int = 8  # Fragments shared by all concurrent jobs on this host
+    YTDLP_FRAGMENT_BACKOFF_FREE_MEMORY: float = 0.3  # Halve fragments below this MemAvailable ratio (1 below PROCESS_LIMIT_MIN_FREE_MEMORY)
+    YTDLP_FRAGMENT_BACKOFF_LOAD: float = 1.0  # Halve fragments above this load per CPU (1 above PROCESS_LIMIT_MAX_LOAD)
+    YTDLP_CACHE_ENABLED: bool = True  # Share yt-dlp's player JS / signature cache between runs
+    YTDLP_CACHE_DIR: Optional[str] = None  # Defaults to /dev/shm/ytdl-cache (tmpfs) when available
+    YTDLP_CACHE_MAX_MB: int = 64  # Oldest entries are pruned beyond this size
+    YTDLP_CACHE_WARM_URL: Optional[str] = "https://www.youtube.com/watch?v=jNQXAC9IVRw"  # Resolved once at worker start (empty = skip)
+
+    # Progress updates from download threads: emit once progress moved this many
+    # percent and at least this many seconds after the previous update
+    PROGRESS_MIN_DELTA: int = 1
+    PROGRESS_MIN_INTERVAL: float = 0.25
+
+    # Complete requests for already-uploaded videos in the API instead of queueing them
+    DEDUP_FAST_PATH_ENABLED: bool = True
+
+    # Admission control: reject new jobs with 503 + Retry-After when their queue is this backed up
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_MAX_QUEUE_DEPTH: int = 200  # Queued jobs per queue
+    ADMISSION_MAX_DRAIN_SECONDS: int = 900  # Estimated wait before a new job would start
+    # Worker processes consuming each queue, for drain estimates; keep in step with the
+    # --concurrency of the heavy and fast workers in install-production.sh
+    ADMISSION_HEAVY_WORKER_CONCURRENCY: int = 1
+    ADMISSION_FAST_WORKER_CONCURRENCY: int = 2
+    ADMISSION_DEFAULT_JOB_SECONDS: float = 30.0  # Job duration assumed until workers have reported some
+    ADMISSION_EWMA_ALPHA: float = 0.2  # Weight of the newest job in the moving average duration
+    ADMISSION_REDIS_TIMEOUT: float = 1.0  # Seconds; admission fails open if the broker is slower
+
+    # How long a cancellation flag is kept for workers to notice (seconds)
+    JOB_CANCEL_TTL: int = 3600
+    # How often a running job's watchdog checks the flag (seconds)
+    JOB_CANCEL_POLL_INTERVAL: float = 5.0
+
+    # Running jobs refresh a Redis heartbeat; 'processing' jobs without one are reaped
+    JOB_HEARTBEAT_INTERVAL: float = 15.0  # Seconds between refreshes
+    JOB_HEARTBEAT_TTL: int = 60  # Seconds without a refresh before a job counts as orphaned
+    JOB_REAP_MAX_ATTEMPTS: int = 2  # Requeues per job before the reaper marks it failed
+
+    # Progress-only job updates are written to MongoDB at most this often (seconds);
+    # status transitions are written immediately
+    JOB_STATE_FLUSH_INTERVAL: float = 5.0
+    JOB_STATE_WRITE_RETRIES: int = 3  # Retries of a failed status transition write before the job errors
+
+    # Resumable downloads: partial files of jobs idle this long are garbage-collected
+    PARTIAL_DOWNLOAD_TTL: int = 3600
+
+    # Adaptive per-host limit on concurrent yt-dlp/ffmpeg children (AIMD)
+    PROCESS_LIMIT_ENABLED: bool = True
+    PROCESS_LIMIT_MIN: int = 1
+    PROCESS_LIMIT_MAX: int = 6
+    PROCESS_LIMIT_INITIAL: int = 2
+    PROCESS_LIMIT_WAIT_TIMEOUT: float = 120  # Seconds work may queue for a slot before failing
+    PROCESS_LIMIT_MIN_FREE_MEMORY: float = 0.15  # Halve the limit below this MemAvailable ratio
+    PROCESS_LIMIT_MAX_LOAD: float = 1.5  # Halve the limit above this 1-minute load per CPU
+    PROCESS_LIMIT_MAX_TIMEOUT_RATE: float = 0.2  # Halve the limit above this recent timeout rate
+    PROCESS_LIMIT_PRESSURE_INTERVAL: float = 2.0  # Seconds between load/memory samples while waiting for a slot
+    PROCESS_LIMIT_DIR: Optional[str] = None  # Slot lock files; defaults to /dev/shm/ytdl-slots
+
     # YouTube Account Configuration (for multi-server setup)
     YT_ACCOUNT_ID: str = "default"  # Unique identifier for this server's YouTube account
     YT_DLP_COOKIES_FILE: Optional[str] = None  # Path to cookies file for this account
+    YT_ACCOUNT_POOL: Optional[str] = None  # "id:cookies_path,id:cookies_path" - several accounts per node
+    YT_ACCOUNT_COOLDOWN: int = 300  # Seconds an account is skipped after bot detection
+    YT_ACCOUNT_MIN_HEALTH: float = 0.5  # Accounts below this health score are used only as a last resort
+    YT_ACCOUNT_MAX_ATTEMPTS: int = 3  # Accounts tried per call before giving up on bot detection
+
+    # Cluster-wide YouTube request rate governor (GCRA in Redis)
+    YOUTUBE_RATE_LIMIT_ENABLED: bool = True
+    YOUTUBE_ACCOUNT_RATE_PER_MINUTE: float = 20  # Extractions per account per minute (0 = unlimited)
+    YOUTUBE_EGRESS_RATE_PER_MINUTE: float = 40  # Extractions per egress IP per minute (0 = unlimited)
+    YOUTUBE_RATE_BURST: int = 5  # Requests allowed back-to-back before spacing applies
+    YOUTUBE_RATE_MAX_WAIT: float = 30  # Seconds a call may queue before failing with RATE_LIMIT_EXCEEDED
+    EGRESS_ID: Optional[str] = None  # Egress identity when no proxy is used (defaults to hostname)
+
+    # Egress proxy pool (falls back to the single YT_DLP_PROXY env var)
+    YT_DLP_PROXIES: Optional[str] = None  # Comma-separated proxy URLs
+    PROXY_EJECT_ERROR_RATE: float = 0.5  # Rolling error rate that ejects a proxy
+    PROXY_EJECT_SECONDS: int = 120  # How long an ejected proxy sits out before re-admission
+    PROXY_MIN_SAMPLES: int = 5  # Runs needed before a proxy can be ejected
+
+    # Frontend cookie jars shared by every yt-dlp call carrying the same cookies
+    COOKIE_JAR_DIR: Optional[str] = None  # Frontend cookie jars; defaults to /dev/shm/ytdl-cookies (tmpfs)
+    COOKIE_JAR_TTL: int = 1800  # Seconds an unused cookie jar is kept for reuse
 
     model_config = ConfigDict(
         env_file=".env",
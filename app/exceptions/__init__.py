@@ -138,6 +138,35 @@ class RateLimitError(AppException):
         )
 
 
+class ServiceOverloadedError(AppException):
+    """Raised when the download backlog is too deep to admit another job"""
+
+    def __init__(self, queue: str, queue_depth: int, eta_seconds: int, retry_after: int):
+        super().__init__(
+            message="Service is busy. Please retry your request later.",
+            error_code="SERVICE_OVERLOADED",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            details={
+                "queue": queue,
+                "queue_depth": queue_depth,
+                "eta_seconds": eta_seconds,
+                "retry_after_seconds": retry_after
+            }
+        )
+
+
+class JobCancelledError(AppException):
+    """Raised inside a worker when the user cancelled the job it is running"""
+
+    def __init__(self, job_id: str):
+        super().__init__(
+            message="Download was cancelled.",
+            error_code="JOB_CANCELLED",
+            status_code=status.HTTP_409_CONFLICT,
+            details={"job_id": job_id}
+        )
+
+
 class DatabaseError(AppException):
     """Raised when database operation fails"""
 
@@ -165,3 +194,15 @@ class CookieUnavailableError(YouTubeError):
                 "message": "This server is refreshing authentication. Your request will be automatically retried on another server."
             }
         )
+
+
+class WorkerOverloadedError(AppException):
+    """Raised when a worker host cannot admit another yt-dlp/ffmpeg process in time"""
+
+    def __init__(self, process: str, waited_seconds: float):
+        super().__init__(
+            message="Worker is overloaded. Please retry your request.",
+            error_code="WORKER_OVERLOADED",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            details={"process": process, "waited_seconds": round(waited_seconds, 1), "retry": True}
+        )
@@ -94,9 +94,16 @@ async def app_exception_handler(request: Request, exc: AppException):
         }
     )
 
+    # Tell clients when to come back from rate limiting and overload
+    headers = None
+    retry_after = exc.details.get("retry_after_seconds")
+    if retry_after is not None:
+        headers = {"Retry-After": str(retry_after)}
+
     return JSONResponse(
         status_code=exc.status_code,
-        content=exc.to_dict()
+        content=exc.to_dict(),
+        headers=headers
     )
 
 
@@ -9,6 +9,7 @@ class DownloadStatus(str, Enum):
     PROCESSING = "processing"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
 
 
 class VideoInfo(BaseModel):
@@ -20,6 +21,19 @@ class VideoInfo(BaseModel):
     quality: Optional[str] = None
 
 
+class DownloadStats(BaseModel):
+    """Live transfer telemetry reported by yt-dlp while a job downloads"""
+    downloaded_bytes: Optional[int] = Field(None, alias="downloadedBytes")
+    total_bytes: Optional[int] = Field(None, alias="totalBytes")
+    speed_bps: Optional[int] = Field(None, alias="speedBps")
+    eta_seconds: Optional[int] = Field(None, alias="etaSeconds")
+    fragment_index: Optional[int] = Field(None, alias="fragmentIndex")
+    fragment_count: Optional[int] = Field(None, alias="fragmentCount")
+
+    class Config:
+        populate_by_name = True
+
+
 class Download(BaseModel):
     job_id: str = Field(alias="jobId")
     url: str
@@ -45,6 +59,7 @@ class DownloadResponse(BaseModel):
     progress: int = 0
     video_info: Optional[VideoInfo] = Field(None, alias="videoInfo")
     download_url: Optional[str] = Field(None, alias="downloadUrl")
+    download_stats: Optional[DownloadStats] = Field(None, alias="downloadStats")
     error: Optional[str] = None
 
     class Config:
@@ -90,13 +90,146 @@ youtube_api_duration_seconds = Histogram(
     buckets=[0.5, 1, 2, 5, 10, 30, 60]
 )
 
+youtube_account_events_total = Counter(
+    'youtube_account_events_total',
+    'Outcomes of yt-dlp runs per pooled YouTube account',
+    ['account', 'event']
+)
+
+youtube_rate_limit_delay_seconds = Histogram(
+    'youtube_rate_limit_delay_seconds',
+    'Time YouTube extractions queued in the rate governor',
+    ['operation'],
+    buckets=[0, 0.1, 0.5, 1, 2, 5, 10, 20, 30]
+)
+
+youtube_rate_limit_rejections_total = Counter(
+    'youtube_rate_limit_rejections_total',
+    'Extractions rejected because the rate governor wait exceeded the maximum'
+)
+
+proxy_score = Gauge(
+    'proxy_score',
+    'Current selection score of each egress proxy (higher is better)',
+    ['proxy']
+)
+
+proxy_ejections_total = Counter(
+    'proxy_ejections_total',
+    'Times an egress proxy was ejected for its error rate',
+    ['proxy']
+)
+
+ytdlp_fragment_concurrency = Gauge(
+    'ytdlp_fragment_concurrency',
+    'Concurrent fragments chosen for the most recent download'
+)
+
+download_throughput_mbps = Histogram(
+    'download_throughput_mbps',
+    'Per-job yt-dlp download throughput in MB/s',
+    buckets=[0.25, 0.5, 1, 2, 5, 10, 20, 50, 100]
+)
+
+process_limiter_limit = Gauge(
+    'process_limiter_limit',
+    'Current AIMD limit on concurrent yt-dlp/ffmpeg processes on this host'
+)
+
+process_limiter_wait_seconds = Histogram(
+    'process_limiter_wait_seconds',
+    'Time spent queued for a yt-dlp/ffmpeg process slot',
+    ['process'],
+    buckets=[0, 0.25, 1, 5, 15, 30, 60, 120]
+)
+
+subprocess_cpu_seconds = Histogram(
+    'subprocess_cpu_seconds',
+    'User plus system CPU time of finished yt-dlp/ffmpeg processes',
+    ['operation'],
+    buckets=[0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300]
+)
+
+subprocess_max_rss_bytes = Histogram(
+    'subprocess_max_rss_bytes',
+    'Peak resident memory of finished yt-dlp/ffmpeg processes',
+    ['operation'],
+    buckets=[16e6, 32e6, 64e6, 128e6, 256e6, 512e6, 1e9, 2e9]
+)
+
+subprocess_io_bytes = Histogram(
+    'subprocess_io_bytes',
+    'Block I/O of finished yt-dlp/ffmpeg processes',
+    ['operation', 'direction'],
+    buckets=[0, 1e6, 10e6, 50e6, 100e6, 250e6, 500e6, 1e9, 5e9]
+)
+
+ytdlp_watchdog_kills_total = Counter(
+    'ytdlp_watchdog_kills_total',
+    'Downloader processes killed by the watchdog',
+    ['process', 'reason']
+)
+
+ytdlp_cache_lookups_total = Counter(
+    'ytdlp_cache_lookups_total',
+    'yt-dlp runs that reused (hit) or had to populate (miss) the shared cache dir',
+    ['operation', 'result']
+)
+
+ytdlp_cache_size_bytes = Gauge(
+    'ytdlp_cache_size_bytes',
+    'Size of the shared yt-dlp cache dir on this host'
+)
+
+partial_download_events_total = Counter(
+    'partial_download_events_total',
+    'Resumable partial downloads resumed, completed or garbage-collected',
+    ['event']
+)
+
+cookie_jar_cache_lookups_total = Counter(
+    'cookie_jar_cache_lookups_total',
+    'Cookie jar materializations served from an existing jar file',
+    ['result']
+)
+
+video_info_cache_lookups_total = Counter(
+    'video_info_cache_lookups_total',
+    'Video metadata cache lookups',
+    ['result']
+)
+
 # Queue metrics
+dedup_fast_path_total = Counter(
+    'dedup_fast_path_total',
+    'Download requests checked against earlier uploads in the API',
+    ['result']
+)
+
 celery_tasks_total = Counter(
     'celery_tasks_total',
     'Total Celery tasks',
     ['task_name', 'status']
 )
 
+job_cancellations_total = Counter(
+    'job_cancellations_total',
+    'Download jobs cancelled by users, by the stage they were in',
+    ['stage']
+)
+
+stuck_jobs_reaped_total = Counter(
+    'stuck_jobs_reaped_total',
+    'Processing jobs whose worker stopped sending heartbeats',
+    ['action']
+)
+
+celery_task_retries_total = Counter(
+    'celery_task_retries_total',
+    'Download job retries scheduled, by failure class',
+    ['error_class']
+)
+
 celery_task_duration_seconds = Histogram(
     'celery_task_duration_seconds',
     'Celery task execution time',
@@ -106,7 +239,14 @@ celery_task_duration_seconds = Histogram(
 
 celery_queue_length = Gauge(
     'celery_queue_length',
-    'Number of tasks in Celery queue'
+    'Number of tasks in Celery queue',
+    ['queue']
+)
+
+admission_rejections_total = Counter(
+    'admission_rejections_total',
+    'Download requests rejected because the queue backlog was too deep',
+    ['queue']
 )
 
 
@@ -166,6 +306,14 @@ class MetricsTracker:
 
         return YouTubeAPITracker()
 
+    @staticmethod
+    def record_process_usage(operation: str, usage):
+        """Record the resource usage of a finished yt-dlp/ffmpeg process"""
+        subprocess_cpu_seconds.labels(operation=operation).observe(usage.cpu_seconds)
+        subprocess_max_rss_bytes.labels(operation=operation).observe(usage.max_rss_bytes)
+        subprocess_io_bytes.labels(operation=operation, direction='read').observe(usage.read_bytes)
+        subprocess_io_bytes.labels(operation=operation, direction='write').observe(usage.write_bytes)
+
 
 # Singleton instance
 metrics_tracker = MetricsTracker()
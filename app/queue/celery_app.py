@@ -1,7 +1,21 @@
+import threading
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_ready
 from app.config.settings import settings
 
+# Job classes, each consumed by its own worker pool so a backlog of full
+# downloads cannot delay jobs that only re-sign or reuse an existing upload
+FAST_QUEUE = 'fast'                # cached videos: re-sign an existing upload
+HEAVY_QUEUE = 'heavy'              # download with yt-dlp and upload
+MAINTENANCE_QUEUE = 'maintenance'  # cleanup and storage sync
+
+
+def download_queue(has_upload: bool) -> str:
+    """Queue for a download job, decided by the API when it enqueues the job"""
+    return FAST_QUEUE if has_upload else HEAVY_QUEUE
+
+
 celery_app = Celery(
     "youtube_shorts_downloader",
     broker=settings.CELERY_BROKER_URL,
@@ -16,8 +30,18 @@ celery_app.conf.update(
     timezone='UTC',
     enable_utc=True,
     task_track_started=True,
-    task_time_limit=300,  # 5 minutes
-    task_soft_time_limit=240,  # 4 minutes
+    task_time_limit=settings.CELERY_TASK_TIME_LIMIT,
+    task_soft_time_limit=settings.CELERY_TASK_SOFT_TIME_LIMIT,
+
+    # Route by job class; the API overrides the download queue per job
+    task_default_queue=HEAVY_QUEUE,
+    task_routes={
+        'app.queue.tasks.process_download': {'queue': HEAVY_QUEUE},
+        'app.queue.cleanup_tasks.*': {'queue': MAINTENANCE_QUEUE},
+        'sync_storage_stats': {'queue': MAINTENANCE_QUEUE},
+    },
+    # Don't let a worker hold a second long job while fast jobs could run elsewhere
+    worker_prefetch_multiplier=1,
 
     # Redis connection pool settings to prevent "max clients reached" error
     broker_connection_max_retries=3,
@@ -48,8 +72,30 @@ celery_app.conf.beat_schedule = {
         'task': 'app.queue.cleanup_tasks.cleanup_failed_downloads',
         'schedule': crontab(hour='*/12'),  # Run every 12 hours
     },
+    'cleanup-partial-downloads': {
+        'task': 'app.queue.cleanup_tasks.cleanup_partial_downloads',
+        'schedule': crontab(minute='*/30'),  # Abandoned resumable downloads
+    },
+    'reap-stuck-jobs': {
+        'task': 'app.queue.cleanup_tasks.reap_stuck_jobs',
+        'schedule': crontab(minute='*/2'),  # Orphaned processing jobs
+    },
     'sync-storage-stats': {
         'task': 'sync_storage_stats',
         'schedule': crontab(hour=3, minute=0),  # Run daily at 3 AM UTC
     },
 }
+
+
+@worker_ready.connect
+def warm_ytdlp_cache(**kwargs):
+    """Fill the host's shared yt-dlp cache in the background once the worker is up"""
+    from app.services.youtube_service import youtube_service
+    threading.Thread(target=youtube_service.warm_cache, name="ytdlp-cache-warm", daemon=True).start()
+
+
+@worker_ready.connect
+def sweep_partial_downloads(**kwargs):
+    """Remove this host's abandoned partial downloads; the beat task only reaches one worker"""
+    from app.services.partial_downloads import partial_downloads
+    partial_downloads.gc()
@@ -4,9 +4,16 @@ Scheduled cleanup tasks for removing old files and database records.
 import asyncio
 from datetime import datetime, timedelta
 from typing import Optional
-from app.queue.celery_app import celery_app
+from app.queue.celery_app import celery_app, download_queue
+from app.queue.tasks import process_download
+from app.monitoring.metrics import stuck_jobs_reaped_total
+from app.services.dedup_service import dedup_service
+from app.services.job_heartbeat import job_heartbeat
+from app.services.partial_downloads import partial_downloads
 from app.services.storage_service import storage_service
 from app.utils.logger import logger
+from app.utils.validators import extract_video_id
+from app.websocket import manager
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.config.settings import settings
 
@@ -185,7 +192,7 @@ def _extract_filename_from_url(url: str) -> Optional[str]:
 @celery_app.task
 def cleanup_failed_downloads():
     """
-    Cleanup failed/stuck downloads that are older than 24 hours.
+    Cleanup failed/cancelled/stuck downloads that are older than 24 hours.
 
     This removes database clutter from failed download attempts.
     """
@@ -202,17 +209,17 @@ def cleanup_failed_downloads():
 
 
 async def _cleanup_failed_downloads_async():
-    """Remove old failed/queued downloads from database"""
+    """Remove old failed/cancelled/queued downloads from database"""
     try:
         logger.info("Starting failed downloads cleanup...")
 
         db = await _get_db()
         cutoff_date = datetime.utcnow() - timedelta(hours=24)
 
-        # Delete failed and stuck queued downloads older than 24 hours
+        # Delete failed, cancelled and stuck queued downloads older than 24 hours
         result = await db.downloads.delete_many({
             'createdAt': {'$lt': cutoff_date},
-            'status': {'$in': ['failed', 'queued']}
+            'status': {'$in': ['failed', 'cancelled', 'queued']}
         })
 
         logger.info(f"Cleaned up {result.deleted_count} failed/stuck download records")
@@ -222,3 +229,108 @@ async def _cleanup_failed_downloads_async():
     except Exception as e:
         logger.error(f"Failed download cleanup job failed: {str(e)}")
         raise
+
+
+@celery_app.task
+def cleanup_partial_downloads():
+    """
+    Remove resumable partial downloads left behind by jobs that will not be retried.
+
+    Partial files live on the worker host that wrote them, so every worker also
+    sweeps its own directory when it starts.
+    """
+    try:
+        removed = partial_downloads.gc()
+        return {'removed': removed}
+    except Exception as e:
+        logger.error(f"Partial download cleanup failed: {str(e)}")
+        raise
+
+
+@celery_app.task
+def reap_stuck_jobs():
+    """
+    Requeue or fail 'processing' jobs whose worker stopped sending heartbeats.
+
+    A worker that crashes, is OOM-killed or is restarted mid-job never writes a
+    final status, so without this the job's progress bar spins forever.
+    """
+    try:
+        loop = asyncio.get_event_loop()
+        if loop.is_closed():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+
+        return loop.run_until_complete(_reap_stuck_jobs_async())
+    except Exception as e:
+        logger.error(f"Stuck job reaper failed: {str(e)}")
+        raise
+
+
+async def _reap_stuck_jobs_async():
+    """Find stale processing jobs without a heartbeat and requeue or fail them"""
+    db = await _get_db()
+    # Live jobs may go a while without a status write, but never without a heartbeat
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.JOB_HEARTBEAT_TTL)
+    candidates = await db.downloads.find(
+        {'status': 'processing', 'updatedAt': {'$lt': cutoff}},
+        {'jobId': 1, 'url': 1, 'updatedAt': 1, 'reapCount': 1}
+    ).to_list(length=500)
+    if not candidates:
+        return {'requeued': 0, 'failed': 0}
+
+    alive = job_heartbeat.alive(download['jobId'] for download in candidates)
+    requeued = failed = 0
+    for download in candidates:
+        job_id = download['jobId']
+        if job_id in alive:
+            continue
+
+        reap_count = download.get('reapCount', 0)
+        # Only act if nobody touched the job since we read it
+        unchanged = {'jobId': job_id, 'status': 'processing', 'updatedAt': download['updatedAt']}
+        if reap_count < settings.JOB_REAP_MAX_ATTEMPTS:
+            result = await db.downloads.update_one(unchanged, {'$set': {
+                'status': 'queued',
+                'progress': 0,
+                'reapCount': reap_count + 1,
+                'updatedAt': datetime.utcnow()
+            }})
+            if result.modified_count:
+                await _publish_status(job_id, 'queued')
+                # Route like the API would: another job may have uploaded the video meanwhile
+                video_id = extract_video_id(download['url'])
+                existing = await dedup_service.find_completed(db, video_id) if video_id else None
+                queue = download_queue(has_upload=existing is not None)
+                # Cookies are not stored with the job, so the retry runs without them
+                process_download.apply_async(args=(download['url'], job_id, None), queue=queue, task_id=job_id)
+                stuck_jobs_reaped_total.labels(action='requeued').inc()
+                requeued += 1
+                logger.warning(f"Requeued orphaned job {job_id} (attempt {reap_count + 1}/{settings.JOB_REAP_MAX_ATTEMPTS})")
+        else:
+            result = await db.downloads.update_one(unchanged, {'$set': {
+                'status': 'failed',
+                'error': 'The worker processing this download stopped responding.',
+                'errorClass': 'unknown',
+                'updatedAt': datetime.utcnow()
+            }})
+            if result.modified_count:
+                await _publish_status(job_id, 'failed', error='The worker processing this download stopped responding.')
+                stuck_jobs_reaped_total.labels(action='failed').inc()
+                failed += 1
+                logger.warning(f"Failed orphaned job {job_id} after {reap_count} requeues")
+
+    if requeued or failed:
+        logger.info(f"Stuck job reaper: {requeued} requeued, {failed} failed")
+    return {'requeued': requeued, 'failed': failed}
+
+
+async def _publish_status(job_id: str, status: str, **fields):
+    """Tell the job's WebSocket subscribers about a status the reaper set"""
+    try:
+        await manager.send_update(job_id, {
+            "type": "status",
+            "data": {"jobId": job_id, "status": status, "progress": 0, **fields}
+        })
+    except Exception as e:
+        logger.error(f"Failed to send WebSocket update: {e}")
@@ -0,0 +1,131 @@
+"""
+Write-behind job status updates for Celery workers
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict, Optional
+from pymongo import UpdateOne
+from app.config.settings import settings
+from app.utils.logger import logger
+from app.websocket import manager
+
+# After these the job leaves this worker, so its bookkeeping can be dropped
+_RELEASING_STATUSES = {'completed', 'failed', 'queued', 'cancelled'}
+
+
+class JobStateWriter:
+    """
+    Coalesce job status updates before they reach MongoDB.
+
+    Every update is published to the job's WebSocket channel straight away.
+    Status transitions are persisted immediately, retried on failure and raised
+    if they still cannot be written. Progress-only updates are buffered per job,
+    keeping only the newest fields, and written for all jobs in one bulk_write
+    JOB_STATE_FLUSH_INTERVAL seconds after the first of them, or with the next
+    transition if that comes sooner.
+    """
+
+    def __init__(self):
+        # job_id -> $set fields not yet written
+        self._pending: Dict[str, dict] = {}
+        # job_id -> status last written to the database
+        self._persisted_status: Dict[str, str] = {}
+        self._last_flush = 0.0
+        self._flush_timer: Optional[asyncio.Task] = None
+
+    async def update(self, db, job_id: str, status: str, **fields):
+        await self._publish(job_id, status, fields)
+
+        pending = self._pending.setdefault(job_id, {})
+        pending.update(fields)
+        pending['status'] = status
+        pending['updatedAt'] = datetime.utcnow()
+
+        if self._persisted_status.get(job_id) != status:
+            await self._flush_transition(db)
+        elif time.monotonic() - self._last_flush >= settings.JOB_STATE_FLUSH_INTERVAL:
+            await self.flush(db)
+        else:
+            self._schedule_flush(db)
+        if status in _RELEASING_STATUSES and job_id not in self._pending:
+            self._persisted_status.pop(job_id, None)
+
+    async def _publish(self, job_id: str, status: str, fields: dict):
+        try:
+            progress = fields.get('progress')
+            await manager.send_update(job_id, {
+                "type": "status",
+                "data": {
+                    "jobId": job_id,
+                    "status": status,
+                    "progress": progress,
+                    **fields
+                }
+            })
+            logger.debug(f"WebSocket update sent for job {job_id}: {status} ({progress}%)")
+        except Exception as e:
+            logger.error(f"Failed to send WebSocket update: {e}")
+
+    async def _flush_transition(self, db):
+        """Flush including a status transition, retrying with backoff; raises if it cannot be written"""
+        for attempt in range(settings.JOB_STATE_WRITE_RETRIES + 1):
+            try:
+                await self.flush(db, raise_errors=True)
+                return
+            except Exception:
+                if attempt == settings.JOB_STATE_WRITE_RETRIES:
+                    raise
+                await asyncio.sleep(0.5 * 2 ** attempt)
+
+    def _schedule_flush(self, db):
+        """Make sure buffered progress is written even if no further update arrives"""
+        loop = asyncio.get_running_loop()
+        timer = self._flush_timer
+        if timer is not None and not timer.done() and timer.get_loop() is loop:
+            return
+        delay = max(0.0, settings.JOB_STATE_FLUSH_INTERVAL - (time.monotonic() - self._last_flush))
+        self._flush_timer = loop.create_task(self._flush_later(db, delay))
+
+    async def _flush_later(self, db, delay: float):
+        await asyncio.sleep(delay)
+        self._flush_timer = None
+        await self.flush(db)
+        if self._pending:
+            # The write failed; try again after another interval
+            self._schedule_flush(db)
+
+    def _cancel_flush_timer(self):
+        timer, self._flush_timer = self._flush_timer, None
+        if timer is not None and not timer.done():
+            timer.cancel()
+
+    async def flush(self, db, raise_errors: bool = False):
+        """Write every buffered update in a single bulk_write"""
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        self._last_flush = time.monotonic()
+        try:
+            await db.downloads.bulk_write(
+                # A job cancelled through the API keeps that status whatever the worker reports
+                [UpdateOne({'jobId': job_id, 'status': {'$ne': 'cancelled'}}, {'$set': fields})
+                 for job_id, fields in batch.items()],
+                ordered=False
+            )
+        except Exception as e:
+            logger.error(f"Error updating status for {len(batch)} jobs: {e}")
+            # Keep the failed fields for the next flush, under anything newer
+            for job_id, fields in batch.items():
+                self._pending[job_id] = {**fields, **self._pending.get(job_id, {})}
+            if raise_errors:
+                raise
+            return
+        for job_id, fields in batch.items():
+            self._persisted_status[job_id] = fields['status']
+        if not self._pending:
+            self._cancel_flush_timer()
+
+
+# Singleton instance
+job_state_writer = JobStateWriter()
@@ -0,0 +1,78 @@
+"""
+Event-driven progress propagation from download threads to the task's event loop
+"""
+import asyncio
+from typing import Awaitable, Callable, Optional
+from app.config.settings import settings
+from app.utils.logger import logger
+
+
+class ProgressBridge:
+    """
+    Forward progress callbacks from a worker thread into the event loop.
+
+    callback() runs on the download thread and hands each update to the loop
+    with call_soon_threadsafe. run() drains the queue, keeps only the newest
+    update, and emits it once progress has moved by at least min_delta and at
+    least min_interval seconds have passed since the last emitted update.
+    """
+
+    def __init__(self, emit: Callable[[int, Optional[dict]], Awaitable[None]], initial: int = 0,
+                 min_delta: Optional[int] = None, min_interval: Optional[float] = None):
+        self._loop = asyncio.get_event_loop()
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._emit = emit
+        self.min_delta = settings.PROGRESS_MIN_DELTA if min_delta is None else min_delta
+        self.min_interval = settings.PROGRESS_MIN_INTERVAL if min_interval is None else min_interval
+        self.last_emitted = initial
+        self._last_emit_at = 0.0
+
+    def callback(self, progress: int, stats: Optional[dict] = None):
+        """Progress callback for the download thread"""
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, (progress, stats))
+        except RuntimeError:
+            # Loop already closed: the job is over and nobody is listening
+            pass
+
+    def _wait_time(self, progress: int) -> Optional[float]:
+        """Seconds until an update to progress may be emitted, None if it is not due"""
+        if progress - self.last_emitted < self.min_delta:
+            return None
+        return max(0.0, self._last_emit_at + self.min_interval - self._loop.time())
+
+    async def run(self, work: Awaitable):
+        """Await work while emitting its progress; returns work's result"""
+        work = asyncio.ensure_future(work)
+        pending = None
+        getter = None
+        try:
+            while not work.done():
+                if getter is None:
+                    getter = asyncio.ensure_future(self._queue.get())
+                timeout = self._wait_time(pending[0]) if pending else None
+                done, _ = await asyncio.wait({work, getter}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if getter in done:
+                    pending = getter.result()
+                    getter = None
+                    while not self._queue.empty():
+                        pending = self._queue.get_nowait()
+                    if pending[0] <= self.last_emitted:
+                        pending = None
+
+                if pending and self._wait_time(pending[0]) == 0.0:
+                    progress, stats = pending
+                    pending = None
+                    self.last_emitted = progress
+                    self._last_emit_at = self._loop.time()
+                    try:
+                        await self._emit(progress, stats)
+                    except Exception as e:
+                        logger.error(f"Failed to emit progress update: {e}")
+        finally:
+            if getter is not None:
+                getter.cancel()
+            if not work.done():
+                work.cancel()
+        return work.result()
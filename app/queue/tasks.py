@@ -1,13 +1,27 @@
 import asyncio
-from app.queue.celery_app import celery_app
+import time
+from app.queue.celery_app import celery_app, HEAVY_QUEUE
+from app.queue.job_state_writer import job_state_writer
+from app.queue.progress_bridge import ProgressBridge
 from app.services.youtube_service import youtube_service
 from app.services.storage_service import storage_service
+from app.services.single_flight import single_flight
+from app.services.video_info_cache import video_info_cache
+from app.services.dedup_service import dedup_service
+from app.services.admission_control import admission_controller
+from app.services.job_cancellation import job_cancellation
+from app.services.job_heartbeat import job_heartbeat
+from app.services.partial_downloads import partial_downloads
+from app.services.error_classifier import classify_error, retry_delay, retry_policy
+from app.services.job_context import JobContext
+from app.services.proxy_pool import proxy_pool
 from app.utils.validators import extract_video_id
+from app.exceptions import InvalidVideoURLError, JobCancelledError
+from app.monitoring.metrics import celery_task_retries_total
 from app.utils.logger import logger
 from app.config.database import get_database, connect_to_mongo
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.config.settings import settings
-from app.websocket import manager
 
 # Initialize database connection for Celery worker
 _db_client = None
@@ -15,8 +29,17 @@ _db = None
 
 
 @celery_app.task(bind=True, max_retries=3)
-def process_download(self, url: str, job_id: str, cookies: dict | None = None):
-    """Process video download task"""
+def process_download(self, url: str, job_id: str, cookies: dict | None = None, waited: float = 0):
+    """
+    Process video download task.
+
+    Failures are classified; transient ones are retried with exponential backoff
+    and jitter (resuming any partial download), permanent ones fail right away.
+    waited is how long the job has deferred to another job downloading the same video.
+    """
+    context = JobContext(job_id=job_id)
+    started = time.monotonic()
+    queue = (self.request.delivery_info or {}).get('routing_key') or HEAVY_QUEUE
     try:
         # Run async functions in sync context
         loop = asyncio.get_event_loop()
@@ -24,19 +47,70 @@ def process_download(self, url: str, job_id: str, cookies: dict | None = None):
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
 
-        return loop.run_until_complete(_process_download_async(self, url, job_id, cookies))
+        # Lets the stuck-job reaper tell this job from one whose worker died
+        with job_heartbeat.running(job_id):
+            result = loop.run_until_complete(_process_download_async(self, url, job_id, cookies, context, waited))
+
+        if result['status'] == 'deferred':
+            # Wait for the single-flight leader on the queue, not in a worker slot
+            countdown = settings.SINGLE_FLIGHT_RECHECK_INTERVAL
+            process_download.apply_async(
+                args=(url, job_id, cookies),
+                kwargs={'waited': waited + countdown},
+                queue=queue,
+                countdown=countdown,
+                task_id=job_id
+            )
+            return result
+
+        # Feeds the API's drain-time estimate for this queue
+        admission_controller.record_duration(queue, time.monotonic() - started)
+        return result
+    except JobCancelledError:
+        logger.info(f"Download job cancelled while running: {job_id}")
+        # A cancelled job will not be retried, so its partial download is garbage
+        partial_downloads.complete(job_id)
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(_update_status(
+            job_id, 'cancelled', resourceUsage=context.usage_summary()
+        ))
+        return {'job_id': job_id, 'status': 'cancelled'}
     except Exception as e:
-        logger.error(f"Download job failed: {job_id} - {str(e)}")
-        # Update status to failed
         loop = asyncio.get_event_loop()
-        loop.run_until_complete(_update_status(job_id, 'failed', error=str(e)))
+        error_class = classify_error(e)
+        policy = retry_policy(error_class)
+        retries = self.request.retries
+        if retries < policy.max_retries:
+            countdown = retry_delay(e, error_class, retries)
+            logger.warning(
+                f"Download job {job_id} failed ({error_class.value}), "
+                f"retry {retries + 1}/{policy.max_retries} in {countdown:.0f}s: {str(e)}"
+            )
+            celery_task_retries_total.labels(error_class=error_class.value).inc()
+            loop.run_until_complete(_update_status(
+                job_id, 'queued', retryCount=retries + 1, lastError=str(e),
+                resourceUsage=context.usage_summary()
+            ))
+            raise self.retry(exc=e, countdown=countdown, max_retries=policy.max_retries)
+
+        logger.error(f"Download job failed: {job_id} ({error_class.value}) - {str(e)}")
+        # Update status to failed
+        loop.run_until_complete(_update_status(
+            job_id, 'failed', error=str(e), errorClass=error_class.value,
+            resourceUsage=context.usage_summary()
+        ))
         raise
 
 
-async def _process_download_async(task, url: str, job_id: str, cookies: dict | None = None):
+async def _process_download_async(task, url: str, job_id: str, cookies: dict | None = None, context: JobContext | None = None, waited: float = 0):
     """Async download processing"""
+    is_leader = False
+    video_id = None
+    context = context or JobContext(job_id=job_id)
     try:
         logger.info(f"Processing download job: {job_id}")
+        # Revoking only reaches workers that were running when the job was cancelled
+        job_cancellation.raise_if_cancelled(job_id)
 
         # Update status to processing
         await _update_status(job_id, 'processing', progress=5)
@@ -45,21 +119,42 @@ async def _process_download_async(task, url: str, job_id: str, cookies: dict | N
         # Extract video ID first
         video_id = extract_video_id(url)
         if not video_id:
-            raise Exception("Invalid video URL")
+            raise InvalidVideoURLError(url)
 
         # Check if this video was already processed BEFORE fetching info
         # This avoids unnecessary YouTube API calls and downloads for duplicate videos
         db = await _get_db()
-        existing_download = await db.downloads.find_one({
-            'videoInfo.id': video_id,
-            'status': 'completed',
-            'downloadUrl': {'$exists': True, '$ne': None}
-        })
+        existing_download = await dedup_service.find_completed(db, video_id)
 
-        # Only fetch video info if we don't have it cached
+        # Coalesce with an in-flight job for the same video instead of downloading it again
         if not existing_download:
+            role = single_flight.join(video_id, job_id, waited)
+            if role == single_flight.DEFER:
+                # Back to queued so the stuck-job reaper leaves it alone
+                await _update_status(job_id, 'queued', progress=0)
+                return {'job_id': job_id, 'status': 'deferred'}
+            is_leader = role == single_flight.LEADER
+            if is_leader:
+                # However long the download and upload take, the lock must not lapse mid-run
+                job_heartbeat.keep_alive(job_id, lambda: single_flight.refresh(video_id, job_id))
+
+            # One proxy per job so info extraction and download leave from the same IP
+            context.proxy = proxy_pool.acquire()
+
+        # ffmpeg cannot stream through every proxy the pool hands out
+        streaming = settings.STREAMING_UPLOAD_ENABLED and youtube_service.can_stream(context.proxy)
+
+        # Only fetch video info if we don't have it cached
+        if not existing_download and streaming:
+            # The stream is opened from the same extraction that yields the info
+            video_info = None
+        elif not existing_download and settings.YTDLP_SINGLE_PASS:
+            # Info is extracted by the same yt-dlp run that downloads the video,
+            # unless another job cached it; then the run only downloads
+            video_info = video_info_cache.get(video_id)
+        elif not existing_download:
             logger.info(f"Fetching video info for new video: {video_id}")
-            video_info = await youtube_service.get_video_info(url, cookies=cookies)
+            video_info = await youtube_service.get_video_info(url, cookies=cookies, context=context)
 
             await _update_status(
                 job_id,
@@ -84,33 +179,13 @@ async def _process_download_async(task, url: str, job_id: str, cookies: dict | N
 
         if existing_download:
 
-            # Progress: 30% - Extracting filename
-            await _update_status(job_id, 'processing', progress=30)
-            task.update_state(state='PROGRESS', meta={'progress': 30})
-
-            # Extract filename from existing download URL
-            old_url = existing_download.get('downloadUrl')
-            file_name = _extract_filename_from_url(old_url)
-
+            # Usually served by the API's fast path; reached when the upload
+            # finished while this job was queued or deferred to its leader
             # Progress: 50% - Generating new signed URL
             await _update_status(job_id, 'processing', progress=50)
             task.update_state(state='PROGRESS', meta={'progress': 50})
 
-            if file_name:
-                # Get provider from existing download (default to gcs for old records)
-                provider = existing_download.get('storageProvider', 'gcs')
-                # Regenerate signed URL with proper Content-Disposition header
-                # This ensures downloads work even for old files
-                download_url = await storage_service.regenerate_signed_url(file_name, provider)
-                logger.info(f"Regenerated signed URL for deduplicated video: {file_name} from {provider}")
-            else:
-                # Fallback to old URL if extraction fails
-                download_url = old_url
-                logger.warning(f"Could not extract filename from URL, using old URL")
-
-            # Progress: 70% - Retrieving file metadata
-            await _update_status(job_id, 'processing', progress=70)
-            task.update_state(state='PROGRESS', meta={'progress': 70})
+            download_url = await dedup_service.resign_url(existing_download)
 
             # Get file size and provider from existing download for reuse
             storage_provider = existing_download.get('storageProvider', 'gcs')
@@ -119,53 +194,37 @@ async def _process_download_async(task, url: str, job_id: str, cookies: dict | N
             # Progress: 90% - Preparing response
             await _update_status(job_id, 'processing', progress=90)
             task.update_state(state='PROGRESS', meta={'progress': 90})
+        elif streaming:
+            # Pipe ffmpeg output straight into a multipart/resumable upload
+            video_info, download_url, storage_provider, file_size = await _stream_to_storage(
+                task, url, job_id, video_id, cookies, context
+            )
         else:
             # Download video with real-time progress tracking
             logger.info(f"Downloading video: {video_id}")
 
-            # Create a shared progress state that can be updated from thread
-            import threading
-            progress_lock = threading.Lock()
-            current_progress = {'value': 10}
-
-            # Create progress callback that updates from worker thread
-            def progress_callback(progress: int):
-                """Callback from worker thread - just update shared state"""
-                try:
-                    with progress_lock:
-                        current_progress['value'] = progress
-                    logger.info(f"Download progress: {progress}%")
-                except Exception as e:
-                    logger.error(f"Error in progress callback: {e}", exc_info=True)
-
-            # Start download in background
-            import concurrent.futures
-            executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
-            download_future = executor.submit(
-                youtube_service.download_video_sync,
+            # The download thread pushes progress straight into this loop
+            bridge = ProgressBridge(_progress_reporter(task, job_id), initial=10)
+            loop = asyncio.get_event_loop()
+            result = await bridge.run(loop.run_in_executor(
+                None,
+                youtube_service.download_with_info_sync if video_info is None else youtube_service.download_video_sync,
                 url,
                 video_id,
-                progress_callback,
-                cookies
-            )
+                bridge.callback,
+                cookies,
+                context
+            ))
 
-            # Poll progress while download is running
-            last_reported_progress = 10
-            while not download_future.done():
-                await asyncio.sleep(0.5)  # Check every 500ms
-
-                with progress_lock:
-                    current_prog = current_progress['value']
-
-                if current_prog > last_reported_progress:
-                    logger.info(f"Progress update: {current_prog}% (job: {job_id})")
-                    await _update_status(job_id, 'processing', progress=current_prog)
-                    task.update_state(state='PROGRESS', meta={'progress': current_prog})
-                    last_reported_progress = current_prog
+            if video_info is None:
+                video_info, local_file_path = result
+            else:
+                local_file_path = result
 
-            # Get result or raise exception
-            local_file_path = download_future.result()
-            executor.shutdown(wait=False)
+            # Last chance to skip the upload (and its storage cost) for a cancelled job
+            if job_cancellation.is_cancelled(job_id):
+                await youtube_service.delete_local_file(local_file_path)
+                raise JobCancelledError(job_id)
 
             await _update_status(job_id, 'processing', progress=90)
             task.update_state(state='PROGRESS', meta={'progress': 90})
@@ -175,10 +234,7 @@ async def _process_download_async(task, url: str, job_id: str, cookies: dict | N
             await _update_status(job_id, 'processing', progress=92)
             task.update_state(state='PROGRESS', meta={'progress': 92})
 
-            # Create a safe filename from video title
-            safe_title = "".join(c for c in video_info.title if c.isalnum() or c in (' ', '-', '_')).strip()
-            safe_title = safe_title[:100]  # Limit length
-            destination_filename = f"{safe_title}.mp4" if safe_title else f"{video_id}.mp4"
+            destination_filename = _destination_filename(video_info, video_id)
 
             # Upload to cloud storage (returns url, provider, file_size)
             download_url, storage_provider, file_size = await storage_service.upload_file(local_file_path, destination_filename)
@@ -203,11 +259,15 @@ async def _process_download_async(task, url: str, job_id: str, cookies: dict | N
             downloadUrl=download_url,
             videoInfo=video_info_dict,
             storageProvider=storage_provider,
-            fileSize=file_size
+            fileSize=file_size,
+            resourceUsage=context.usage_summary()
         )
 
         logger.info(f"Download job completed: {job_id}")
 
+        if is_leader:
+            single_flight.release(video_id, job_id)
+
         return {
             'job_id': job_id,
             'status': 'completed',
@@ -215,10 +275,56 @@ async def _process_download_async(task, url: str, job_id: str, cookies: dict | N
             'video_info': video_info_dict
         }
     except Exception as e:
-        logger.error(f"Download job failed: {job_id} - {str(e)}")
-        await _update_status(job_id, 'failed', error=str(e))
+        logger.error(f"Download attempt failed: {job_id} - {str(e)}")
+        if is_leader:
+            single_flight.release(video_id, job_id)
+        # process_download decides between retrying and failing the job
+        raise
+    finally:
+        proxy_pool.release(context.proxy)
+
+
+def _progress_reporter(task, job_id: str):
+    """Emit a download progress update to the job record, WebSocket and Celery state"""
+    async def report(progress: int, stats: dict | None = None):
+        logger.debug(f"Progress update: {progress}% (job: {job_id})")
+        await _update_status(job_id, 'processing', progress=progress, downloadStats=stats)
+        task.update_state(state='PROGRESS', meta={'progress': progress})
+    return report
+
+
+def _destination_filename(video_info, video_id: str) -> str:
+    """Create a safe filename from video title"""
+    safe_title = "".join(c for c in video_info.title if c.isalnum() or c in (' ', '-', '_')).strip()
+    safe_title = safe_title[:100]  # Limit length
+    return f"{safe_title}.mp4" if safe_title else f"{video_id}.mp4"
+
+
+async def _stream_to_storage(task, url: str, job_id: str, video_id: str, cookies: dict | None, context: JobContext | None = None):
+    """
+    Stream the video from ffmpeg into cloud storage without touching local disk.
+
+    Returns (video_info, download_url, storage_provider, file_size).
+    """
+    bridge = ProgressBridge(_progress_reporter(task, job_id), initial=10)
+    loop = asyncio.get_event_loop()
+    video_info, stream = await loop.run_in_executor(
+        None, youtube_service.open_video_stream, url, video_id, bridge.callback, cookies, context
+    )
+
+    logger.info(f"Streaming video to cloud storage: {video_id}")
+    try:
+        download_url, storage_provider, file_size = await bridge.run(
+            storage_service.upload_stream(stream, _destination_filename(video_info, video_id))
+        )
+    except BaseException:
+        stream.abort()
         raise
 
+    await _update_status(job_id, 'processing', progress=98)
+    task.update_state(state='PROGRESS', meta={'progress': 98})
+    return video_info, download_url, storage_provider, file_size
+
 
 async def _get_db():
     """Get database instance for Celery worker with resource limits"""
@@ -243,62 +349,13 @@ async def _get_db():
     return _db
 
 
-def _extract_filename_from_url(url: str) -> str | None:
+async def _update_status(job_id: str, status: str, **kwargs):
     """
-    Extract filename from GCS signed URL.
+    Update download status: WebSocket subscribers see every update at once,
+    the database write is coalesced by job_state_writer.
 
-    Example:
-    https://storage.googleapis.com/bucket/My%20Video.mp4?Expires=...
-    Returns: My Video.mp4 (URL decoded)
+    Raises if a status transition cannot be persisted, so the job errors out
+    (and is retried or reaped) instead of silently keeping a stale status.
     """
-    try:
-        from urllib.parse import urlparse, unquote
-
-        # Parse URL
-        parsed = urlparse(url)
-        path = parsed.path
-
-        # Path format: /bucket_name/filename.mp4
-        # Split and get the filename (last part)
-        parts = path.split('/')
-        if len(parts) >= 2:
-            filename = parts[-1]  # Last part is the filename
-            return unquote(filename)  # URL decode
-
-        return None
-    except Exception as e:
-        logger.error(f"Error extracting filename from URL: {e}")
-        return None
-
-
-async def _update_status(job_id: str, status: str, **kwargs):
-    """Update download status in database and send WebSocket notification"""
-    try:
-        db = await _get_db()
-        update_data = {'status': status, 'updatedAt': __import__('datetime').datetime.utcnow()}
-        update_data.update(kwargs)
-
-        await db.downloads.update_one(
-            {'jobId': job_id},
-            {'$set': update_data}
-        )
-
-        # Send WebSocket update
-        try:
-            progress = kwargs.get('progress')
-            ws_data = {
-                "type": "status",
-                "data": {
-                    "jobId": job_id,
-                    "status": status,
-                    "progress": progress,
-                    **kwargs
-                }
-            }
-            await manager.send_update(job_id, ws_data)
-            logger.debug(f"WebSocket update sent for job {job_id}: {status} ({progress}%)")
-        except Exception as ws_error:
-            logger.error(f"Failed to send WebSocket update: {ws_error}")
-
-    except Exception as e:
-        logger.error(f"Error updating status: {e}")
+    db = await _get_db()
+    await job_state_writer.update(db, job_id, status, **kwargs)
@@ -1,10 +1,17 @@
 from fastapi import APIRouter, HTTPException, Request
 from app.models.download import DownloadResponse, Download, DownloadStatus
-from app.utils.validators import DownloadRequest
+from app.utils.validators import DownloadRequest, extract_video_id
+from app.queue.celery_app import celery_app, download_queue
 from app.queue.tasks import process_download
+from app.services.admission_control import admission_controller
+from app.services.dedup_service import dedup_service
+from app.services.job_cancellation import job_cancellation
 from app.config.database import get_database
 from app.middleware.rate_limit import limiter
 from app.utils.logger import logger
+from app.exceptions import AppException
+from app.monitoring.metrics import job_cancellations_total
+from app.websocket import manager
 import uuid
 from datetime import datetime
 from typing import List
@@ -15,7 +22,12 @@ router = APIRouter()
 @router.post("/", response_model=DownloadResponse)
 @limiter.limit("30/15minutes")
 async def initiate_download(request: Request, download_request: DownloadRequest):
-    """Initiate a video download"""
+    """
+    Initiate a video download.
+
+    Videos that were already uploaded complete immediately with a freshly
+    signed URL; only new videos are queued for a worker.
+    """
     try:
         url = str(download_request.url)
         job_id = str(uuid.uuid4())
@@ -37,22 +49,99 @@ async def initiate_download(request: Request, download_request: DownloadRequest)
         if user_id:
             download_doc['userId'] = user_id
 
+        video_id = extract_video_id(url)
+        existing = await dedup_service.find_completed(db, video_id) if video_id else None
+        completed = await dedup_service.completed_fields(existing)
+        if completed:
+            download_doc.update(completed)
+            await db.downloads.insert_one(download_doc)
+            logger.info(f"Download served from existing upload: {job_id} for video {video_id} (user: {user_id or 'anonymous'})")
+            return DownloadResponse(
+                jobId=job_id,
+                status=DownloadStatus.COMPLETED,
+                progress=100,
+                videoInfo=completed['videoInfo'],
+                downloadUrl=completed['downloadUrl']
+            )
+
+        # Jobs that can reuse an upload skip the download backlog
+        queue = download_queue(has_upload=existing is not None)
+        # Fail fast rather than queue a job that would not start in time
+        admission_controller.admit(queue)
+
         await db.downloads.insert_one(download_doc)
 
         # Enqueue task with optional cookies
-        process_download.delay(url, job_id, cookies)
+        # The job ID doubles as the task ID so the job can be revoked on cancel
+        process_download.apply_async(args=(url, job_id, cookies), queue=queue, task_id=job_id)
 
-        logger.info(f"Download initiated: {job_id} for URL: {url} (user: {user_id or 'anonymous'}, cookies: {'yes' if cookies else 'no'})")
+        logger.info(f"Download initiated: {job_id} for URL: {url} on queue {queue} (user: {user_id or 'anonymous'}, cookies: {'yes' if cookies else 'no'})")
 
         return DownloadResponse(
             jobId=job_id,
             status=DownloadStatus.QUEUED
         )
+    except AppException:
+        raise
     except Exception as e:
         logger.error(f"Error initiating download: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.delete("/{job_id}", response_model=DownloadResponse)
+@limiter.limit("30/minute")
+async def cancel_download(request: Request, job_id: str):
+    """
+    Cancel a queued or running download.
+
+    Queued jobs are revoked before a worker picks them up. Running jobs are
+    flagged in Redis; the worker kills yt-dlp/ffmpeg and aborts the upload
+    as soon as it notices.
+    """
+    try:
+        db = get_database()
+        download = await db.downloads.find_one({'jobId': job_id})
+
+        if not download:
+            raise HTTPException(status_code=404, detail="Download not found")
+
+        stage = download.get('status')
+        if stage not in (DownloadStatus.QUEUED.value, DownloadStatus.PROCESSING.value):
+            raise HTTPException(status_code=409, detail=f"Download is already {stage}")
+
+        if not job_cancellation.request(job_id):
+            # Without the flag a running worker would never stop; don't report it cancelled
+            raise HTTPException(status_code=503, detail="Cancellation is temporarily unavailable, please retry")
+        celery_app.control.revoke(job_id)
+
+        result = await db.downloads.update_one(
+            {'jobId': job_id, 'status': {'$in': [DownloadStatus.QUEUED.value, DownloadStatus.PROCESSING.value]}},
+            {'$set': {'status': DownloadStatus.CANCELLED.value, 'updatedAt': datetime.utcnow()}}
+        )
+        if result.modified_count == 0:
+            # Finished while we were cancelling it
+            raise HTTPException(status_code=409, detail="Download already finished")
+
+        job_cancellations_total.labels(stage=stage).inc()
+        await manager.send_update(job_id, {
+            "type": "status",
+            "data": {"jobId": job_id, "status": DownloadStatus.CANCELLED.value, "progress": download.get('progress', 0)}
+        })
+        logger.info(f"Download cancelled: {job_id} (was {stage})")
+
+        return DownloadResponse(
+            jobId=job_id,
+            status=DownloadStatus.CANCELLED,
+            progress=download.get('progress', 0),
+            videoInfo=download.get('videoInfo')
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error cancelling download {job_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/history/{user_id}", response_model=List[DownloadResponse])
 @limiter.limit("60/minute")
 async def get_user_download_history(request: Request, user_id: str, limit: int = 50):
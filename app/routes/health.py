@@ -3,6 +3,7 @@ Health check endpoints for load balancer monitoring
 """
 from fastapi import APIRouter
 from app.config.settings import settings
+from app.services.account_pool import account_pool
 from app.services.cookie_refresh_service import cookie_refresh_service
 from app.utils.logger import logger
 import os
@@ -18,26 +19,30 @@ async def health_check():
     Returns HTTP 200 if server is healthy, HTTP 503 if cookies unavailable
     """
     try:
-        # Check if cookies file exists for this account
-        cookies_available = cookie_refresh_service.check_cookies_file_exists()
+        # Check which pooled accounts have cookies and are not cooling down
+        accounts = account_pool.status()
+        usable_accounts = [a for a in accounts if a["cookies_available"] and not a["cooling_down"]]
+        cookies_available = any(a["cookies_available"] for a in accounts)
 
         # Check if refresh is in progress
         refresh_in_progress = False
         try:
             if cookie_refresh_service.redis_client:
-                refresh_key = f"cookie:refresh:{settings.YT_ACCOUNT_ID}:in_progress"
+                refresh_key = cookie_refresh_service.refresh_key(settings.YT_ACCOUNT_ID)
                 refresh_in_progress = bool(cookie_refresh_service.redis_client.get(refresh_key))
         except Exception as e:
             logger.error(f"Error checking refresh status: {e}")
 
-        # Server is healthy if cookies are available
-        is_healthy = cookies_available and not refresh_in_progress
+        # Server is healthy while at least one account can take jobs
+        is_healthy = bool(usable_accounts)
 
         response = {
             "status": "healthy" if is_healthy else "degraded",
             "cookies_available": cookies_available,
             "refresh_in_progress": refresh_in_progress,
             "account_id": settings.YT_ACCOUNT_ID,
+            "healthy_accounts": len(usable_accounts),
+            "accounts": accounts,
             "can_process_downloads": is_healthy
         }
 
@@ -91,7 +96,7 @@ async def cookies_health():
         refresh_in_progress = False
         try:
             if cookie_refresh_service.redis_client:
-                refresh_key = f"cookie:refresh:{settings.YT_ACCOUNT_ID}:in_progress"
+                refresh_key = cookie_refresh_service.refresh_key(settings.YT_ACCOUNT_ID)
                 refresh_in_progress = bool(cookie_refresh_service.redis_client.get(refresh_key))
         except Exception as e:
             logger.error(f"Error checking refresh status: {e}")
@@ -102,6 +107,7 @@ async def cookies_health():
             "account_id": settings.YT_ACCOUNT_ID,
             "refresh_in_progress": refresh_in_progress,
             "file_info": file_info if exists else None,
+            "accounts": account_pool.status(),
             "message": "Cookies available" if exists else "Cookies file missing"
         }
 
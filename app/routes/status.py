@@ -25,6 +25,7 @@ async def get_download_status(job_id: str):
             progress=download.get('progress', 0),
             videoInfo=download.get('videoInfo'),
             downloadUrl=download.get('downloadUrl'),
+            downloadStats=download.get('downloadStats'),
             error=download.get('error')
         )
     except HTTPException:
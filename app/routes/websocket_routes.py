@@ -30,6 +30,7 @@ async def websocket_download_endpoint(websocket: WebSocket, job_id: str):
                     "progress": download.get("progress", 0),
                     "videoInfo": download.get("videoInfo"),
                     "downloadUrl": download.get("downloadUrl"),
+                    "downloadStats": download.get("downloadStats"),
                     "error": download.get("error")
                 }
             })
@@ -0,0 +1,176 @@
+"""
+Pool of YouTube accounts (cookie jars) available on this node
+
+Each account has a health score and a cooldown shared through Redis. Jobs pick
+the least recently used healthy account, so one account being refreshed after
+bot detection no longer blocks the whole node.
+"""
+import os
+import time
+import redis
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+from app.config.settings import settings
+from app.monitoring.metrics import youtube_account_events_total
+from app.services.cookie_refresh_service import cookie_refresh_service
+from app.utils.logger import logger
+
+
+@dataclass(frozen=True)
+class Account:
+    id: str
+    cookies_file: str
+
+    @property
+    def has_cookies(self) -> bool:
+        return os.path.exists(self.cookies_file)
+
+
+def parse_account_pool(pool: Optional[str], default_id: str, default_cookies_file: Optional[str]) -> List[Account]:
+    """
+    Parse "id:path,id:path" into accounts.
+
+    Without a pool the node's single YT_ACCOUNT_ID / YT_DLP_COOKIES_FILE is used.
+    """
+    accounts = []
+    if pool:
+        for entry in pool.split(','):
+            entry = entry.strip()
+            if not entry:
+                continue
+            account_id, sep, path = entry.partition(':')
+            if not sep or not path:
+                logger.error(f"Ignoring malformed YT_ACCOUNT_POOL entry: {entry}")
+                continue
+            accounts.append(Account(account_id.strip(), path.strip()))
+    elif default_cookies_file:
+        accounts.append(Account(default_id, default_cookies_file))
+    return accounts
+
+
+class AccountPool:
+    """Health-scored, least-recently-used rotation over the node's cookie jars"""
+
+    KEY_PREFIX = "account:pool:"
+    COOLDOWN_PREFIX = "account:cooldown:"
+    # Weight of the newest outcome in the health EWMA
+    HEALTH_ALPHA = 0.3
+
+    def __init__(self, accounts: List[Account]):
+        self.accounts = accounts
+        try:
+            self.redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        except Exception as e:
+            logger.error(f"Failed to initialize account pool: {e}")
+            self.redis_client = None
+        # Used when Redis is unreachable
+        self._local_last_used = {}
+
+    def _state(self, account: Account) -> dict:
+        state = {'health': 1.0, 'last_used': 0.0, 'cooling_down': False}
+        if not self.redis_client:
+            state['last_used'] = self._local_last_used.get(account.id, 0.0)
+            return state
+        try:
+            pipe = self.redis_client.pipeline()
+            pipe.hmget(f"{self.KEY_PREFIX}{account.id}", 'health', 'last_used')
+            pipe.exists(f"{self.COOLDOWN_PREFIX}{account.id}")
+            (health, last_used), cooling_down = pipe.execute()
+            state['health'] = float(health) if health is not None else 1.0
+            state['last_used'] = float(last_used) if last_used is not None else 0.0
+            state['cooling_down'] = bool(cooling_down)
+        except Exception as e:
+            logger.warning(f"Account pool state read failed for {account.id}: {e}")
+            state['last_used'] = self._local_last_used.get(account.id, 0.0)
+        return state
+
+    def acquire(self, exclude: Iterable[str] = ()) -> Optional[Account]:
+        """
+        Pick an account for the next yt-dlp run.
+
+        Accounts in cooldown or without a cookies file are skipped. Healthy
+        accounts are preferred, least recently used first; if only unhealthy
+        ones remain the healthiest is used. Returns None when none are usable.
+        """
+        exclude = set(exclude)
+        candidates = []
+        for account in self.accounts:
+            if account.id in exclude or not account.has_cookies:
+                continue
+            state = self._state(account)
+            if not state['cooling_down']:
+                candidates.append((account, state))
+
+        if not candidates:
+            return None
+
+        healthy = [c for c in candidates if c[1]['health'] >= settings.YT_ACCOUNT_MIN_HEALTH]
+        if healthy:
+            account, _ = min(healthy, key=lambda c: c[1]['last_used'])
+        else:
+            account, _ = max(candidates, key=lambda c: c[1]['health'])
+
+        self._touch(account)
+        return account
+
+    def _touch(self, account: Account):
+        now = time.time()
+        self._local_last_used[account.id] = now
+        if not self.redis_client:
+            return
+        try:
+            self.redis_client.hset(f"{self.KEY_PREFIX}{account.id}", 'last_used', now)
+        except Exception as e:
+            logger.warning(f"Account pool update failed for {account.id}: {e}")
+
+    def _record_outcome(self, account: Account, success: bool):
+        if not self.redis_client:
+            return
+        key = f"{self.KEY_PREFIX}{account.id}"
+        try:
+            health = self.redis_client.hget(key, 'health')
+            health = float(health) if health is not None else 1.0
+            health = (1 - self.HEALTH_ALPHA) * health + self.HEALTH_ALPHA * (1.0 if success else 0.0)
+            self.redis_client.hset(key, 'health', round(health, 4))
+        except Exception as e:
+            logger.warning(f"Account pool update failed for {account.id}: {e}")
+
+    def report_success(self, account: Optional[Account]):
+        if account is None:
+            return
+        self._record_outcome(account, success=True)
+        youtube_account_events_total.labels(account=account.id, event='success').inc()
+
+    def report_blocked(self, account: Account, reason: str = "bot_detection"):
+        """Lower the account's health, cool it down and ask the cookie worker to refresh it"""
+        self._record_outcome(account, success=False)
+        youtube_account_events_total.labels(account=account.id, event='blocked').inc()
+        logger.warning(f"Account {account.id} blocked ({reason}), cooling down for {settings.YT_ACCOUNT_COOLDOWN}s")
+        if self.redis_client:
+            try:
+                self.redis_client.setex(f"{self.COOLDOWN_PREFIX}{account.id}", settings.YT_ACCOUNT_COOLDOWN, reason)
+            except Exception as e:
+                logger.warning(f"Account pool cooldown failed for {account.id}: {e}")
+        cookie_refresh_service.trigger_cookie_refresh(reason=reason, server_id=account.id)
+
+    def status(self) -> List[dict]:
+        """Per-account state for health endpoints"""
+        result = []
+        for account in self.accounts:
+            state = self._state(account)
+            result.append({
+                'account_id': account.id,
+                'cookies_available': account.has_cookies,
+                'health': round(state['health'], 2),
+                'cooling_down': state['cooling_down'],
+                'last_used': state['last_used'] or None,
+            })
+        return result
+
+
+# Singleton instance
+account_pool = AccountPool(parse_account_pool(
+    settings.YT_ACCOUNT_POOL,
+    settings.YT_ACCOUNT_ID,
+    settings.YT_DLP_COOKIES_FILE
+))
@@ -0,0 +1,136 @@
+"""
+Queue-depth admission control for new download jobs
+
+Before a job is enqueued the API reads the live length of its Celery queue and
+estimates how long the backlog takes to drain from a moving average of job
+durations that the workers report. Jobs that would wait longer than we are
+willing to make a user wait are rejected with a Retry-After instead of sitting
+in the queue until cleanup deletes them.
+"""
+import math
+import redis
+from dataclasses import dataclass
+from typing import Optional
+from app.config.settings import settings
+from app.exceptions import ServiceOverloadedError
+from app.monitoring.metrics import admission_rejections_total, celery_queue_length
+from app.queue.celery_app import FAST_QUEUE
+from app.utils.logger import logger
+
+
+# Exponentially weighted moving average of job durations, updated atomically
+# by every worker. ARGV[1] = field, ARGV[2] = duration, ARGV[3] = alpha
+_RECORD_DURATION_SCRIPT = """
+local old = redis.call('HGET', KEYS[1], ARGV[1])
+local value = tonumber(ARGV[2])
+if old then
+    local alpha = tonumber(ARGV[3])
+    value = alpha * value + (1 - alpha) * tonumber(old)
+end
+redis.call('HSET', KEYS[1], ARGV[1], value)
+return tostring(value)
+"""
+
+
+@dataclass
+class QueueLoad:
+    """Backlog of one queue at admission time"""
+    queue: str
+    depth: int
+    job_seconds: float
+    drain_seconds: float
+
+
+class AdmissionController:
+    """Admit or reject jobs by their queue's depth and estimated drain time"""
+
+    DURATION_KEY = "admission:job_duration"
+
+    def __init__(self):
+        try:
+            # Celery's queues are lists on the broker
+            self.redis_client = redis.from_url(
+                settings.CELERY_BROKER_URL,
+                decode_responses=True,
+                socket_timeout=settings.ADMISSION_REDIS_TIMEOUT,
+                socket_connect_timeout=settings.ADMISSION_REDIS_TIMEOUT
+            )
+            self._record_duration = self.redis_client.register_script(_RECORD_DURATION_SCRIPT)
+        except Exception as e:
+            logger.error(f"Failed to initialize admission control: {e}")
+            self.redis_client = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.ADMISSION_CONTROL_ENABLED and self.redis_client is not None
+
+    def concurrency(self, queue: str) -> int:
+        """Worker processes draining queue"""
+        if queue == FAST_QUEUE:
+            return max(1, settings.ADMISSION_FAST_WORKER_CONCURRENCY)
+        return max(1, settings.ADMISSION_HEAVY_WORKER_CONCURRENCY)
+
+    def load(self, queue: str) -> Optional[QueueLoad]:
+        """Current backlog of queue, None if Redis cannot be read"""
+        try:
+            pipe = self.redis_client.pipeline()
+            pipe.llen(queue)
+            pipe.hget(self.DURATION_KEY, queue)
+            depth, job_seconds = pipe.execute()
+        except Exception as e:
+            logger.warning(f"Could not read backlog of queue {queue}: {e}")
+            return None
+
+        job_seconds = float(job_seconds) if job_seconds else settings.ADMISSION_DEFAULT_JOB_SECONDS
+        drain_seconds = depth * job_seconds / self.concurrency(queue)
+        celery_queue_length.labels(queue=queue).set(depth)
+        return QueueLoad(queue=queue, depth=depth, job_seconds=job_seconds, drain_seconds=drain_seconds)
+
+    def admit(self, queue: str):
+        """
+        Raise ServiceOverloadedError if queue is too deep to serve another job
+        in time. Fails open when the backlog cannot be read.
+        """
+        if not self.enabled:
+            return
+        load = self.load(queue)
+        if load is None:
+            return
+
+        per_job = load.job_seconds / self.concurrency(queue)
+        excess_seconds = max(
+            (load.depth - settings.ADMISSION_MAX_QUEUE_DEPTH) * per_job,
+            load.drain_seconds - settings.ADMISSION_MAX_DRAIN_SECONDS
+        )
+        if excess_seconds < 0:
+            return
+
+        # Come back once the backlog is expected to be back under both limits
+        retry_after = max(1, math.ceil(excess_seconds))
+        admission_rejections_total.labels(queue=queue).inc()
+        logger.warning(
+            f"Rejecting job for queue {queue}: depth {load.depth}, "
+            f"estimated drain {load.drain_seconds:.0f}s, retry after {retry_after}s"
+        )
+        raise ServiceOverloadedError(
+            queue=queue,
+            queue_depth=load.depth,
+            eta_seconds=math.ceil(load.drain_seconds),
+            retry_after=retry_after
+        )
+
+    def record_duration(self, queue: str, seconds: float):
+        """Fold a finished job's duration into its queue's moving average"""
+        if self.redis_client is None:
+            return
+        try:
+            self._record_duration(
+                keys=[self.DURATION_KEY],
+                args=[queue, seconds, settings.ADMISSION_EWMA_ALPHA]
+            )
+        except Exception as e:
+            logger.debug(f"Could not record job duration for queue {queue}: {e}")
+
+
+# Singleton instance
+admission_controller = AdmissionController()
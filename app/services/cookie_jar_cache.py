@@ -0,0 +1,167 @@
+"""
+Content-addressed cache of Netscape cookie jar files for yt-dlp
+
+Frontend cookies used to be written to a fresh mkstemp file for every yt-dlp
+call. Jars are now named by a hash of their cookies, so every call in a job and
+every job carrying the same cookies share one file. yt-dlp saves refreshed
+cookies back into that jar, and the next run picks them up.
+
+Jars are shared by all worker processes on the host, so besides the in-process
+reference count every process using a jar holds a shared flock() on its lease
+file, and eviction only deletes jars whose lease it can lock exclusively.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Optional
+from app.config.settings import settings
+from app.monitoring.metrics import cookie_jar_cache_lookups_total
+from app.utils.logger import logger
+
+TMPFS_ROOT = "/dev/shm"
+
+
+class CookieJarCache:
+    """Reference-counted cookie jar files with TTL eviction"""
+
+    def __init__(self):
+        self._dir: Optional[Path] = None
+        self._refcounts: Dict[str, int] = defaultdict(int)
+        self._leases: Dict[str, int] = {}  # key -> fd holding the shared lease lock
+        self._lock = threading.Lock()
+        self._last_eviction = 0.0
+
+    @property
+    def directory(self) -> Path:
+        """Jar directory, private to this user and on tmpfs when available"""
+        if self._dir is None:
+            if settings.COOKIE_JAR_DIR:
+                root = Path(settings.COOKIE_JAR_DIR)
+            elif os.access(TMPFS_ROOT, os.W_OK):
+                root = Path(TMPFS_ROOT) / "ytdl-cookies"
+            else:
+                root = Path(tempfile.gettempdir()) / "ytdl-cookies"
+            root.mkdir(mode=0o700, parents=True, exist_ok=True)
+            self._dir = root
+        return self._dir
+
+    @staticmethod
+    def _key(cookies: Dict[str, str]) -> str:
+        payload = json.dumps(sorted(cookies.items()), separators=(',', ':'))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+    def acquire(self, cookies: Dict[str, str]) -> Optional[str]:
+        """Return the path of the jar holding these cookies, writing it if needed"""
+        try:
+            key = self._key(cookies)
+            path = self.directory / f"{key}.txt"
+            with self._lock:
+                if self._refcounts[key] == 0:
+                    self._leases[key] = self._lock_lease(key)
+                self._refcounts[key] += 1
+                if path.exists():
+                    # Touch so TTL eviction in other workers leaves it alone
+                    os.utime(path)
+                    cookie_jar_cache_lookups_total.labels(result='hit').inc()
+                else:
+                    self._write(path, cookies)
+                    cookie_jar_cache_lookups_total.labels(result='miss').inc()
+            return str(path)
+        except Exception as e:
+            logger.error(f"Error materializing cookie jar: {e}")
+            return None
+
+    def _lock_lease(self, key: str) -> int:
+        """Take a shared lock on key's lease file so no process evicts its jar"""
+        lease_path = self.directory / f"{key}.lock"
+        while True:
+            fd = os.open(lease_path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            if self._is_current(fd, lease_path):
+                return fd
+            # An eviction removed the lease file while we waited for it
+            os.close(fd)
+
+    @staticmethod
+    def _is_current(fd: int, path: Path) -> bool:
+        """Whether fd still refers to the file at path"""
+        try:
+            return os.fstat(fd).st_ino == os.stat(path).st_ino
+        except FileNotFoundError:
+            return False
+
+    def _write(self, path: Path, cookies: Dict[str, str]):
+        """Write atomically so concurrent workers never read a partial jar"""
+        fd, temp_path = tempfile.mkstemp(suffix='.tmp', prefix='jar_', dir=str(path.parent))
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write("# Netscape HTTP Cookie File\n")
+                for name, value in cookies.items():
+                    f.write(f".youtube.com\tTRUE\t/\tTRUE\t0\t{name}\t{value}\n")
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def release(self, path: Optional[str]):
+        """Drop a reference taken by acquire() and occasionally evict idle jars"""
+        if not path:
+            return
+        key = Path(path).stem
+        with self._lock:
+            if self._refcounts.get(key, 0) > 1:
+                self._refcounts[key] -= 1
+            else:
+                self._refcounts.pop(key, None)
+                lease = self._leases.pop(key, None)
+                if lease is not None:
+                    os.close(lease)
+        self.evict_expired()
+
+    def evict_expired(self, force: bool = False):
+        """Remove jars untouched for COOKIE_JAR_TTL seconds that no call on this host holds"""
+        now = time.time()
+        ttl = settings.COOKIE_JAR_TTL
+        if not force and now - self._last_eviction < min(ttl, 60):
+            return
+        self._last_eviction = now
+
+        with self._lock:
+            in_use = set(self._refcounts)
+        for path in self.directory.glob("*.txt"):
+            if path.stem in in_use:
+                continue
+            try:
+                if now - path.stat().st_mtime > ttl:
+                    self._evict(path, ttl)
+            except FileNotFoundError:
+                continue
+
+    def _evict(self, path: Path, ttl: float):
+        """Delete an idle jar and its lease unless another worker process holds the lease"""
+        lease_path = path.with_suffix('.lock')
+        fd = os.open(lease_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+            if not self._is_current(fd, lease_path):
+                return
+            # Recheck under the lock: the last holder may have just touched it
+            if time.time() - path.stat().st_mtime > ttl:
+                path.unlink()
+                lease_path.unlink()
+        finally:
+            os.close(fd)
+
+
+# Singleton instance
+cookie_jar_cache = CookieJarCache()
@@ -39,26 +39,24 @@ class CookieRefreshService:
             logger.error("Redis client not available, cannot trigger cookie refresh")
             return False
 
-        try:
-            # Check if refresh already in progress
-            refresh_key = f"cookie:refresh:in_progress"
-
-            if self.redis_client.get(refresh_key):
-                logger.info(f"Cookie refresh already in progress, skipping")
-                return True
-
-            # Set refresh flag with 5-minute expiry (TTL)
-            self.redis_client.setex(refresh_key, 300, "1")
+        # Create job data matching cookie-worker.js expected format
+        import time
+        import uuid
 
-            # Create job data matching cookie-worker.js expected format
-            import time
-            import uuid
-
-            # Server IDs from servers.json
-            server_ids = ["backend-1", "backend-2", "backend-3"] if not server_id else [server_id]
+        # Server IDs from servers.json
+        server_ids = ["backend-1", "backend-2", "backend-3"] if not server_id else [server_id]
 
+        try:
             jobs_queued = 0
             for sid in server_ids:
+                # Check if refresh already in progress for this account
+                refresh_key = self.refresh_key(sid)
+                # Set refresh flag with 5-minute expiry (TTL); skip if one is already set
+                if not self.redis_client.set(refresh_key, "1", ex=300, nx=True):
+                    logger.info(f"Cookie refresh already in progress for {sid}, skipping")
+                    jobs_queued += 1
+                    continue
+
                 job_data = {
                     "serverId": sid,
                     "requestId": str(uuid.uuid4()),
@@ -78,13 +76,18 @@ class CookieRefreshService:
 
         except Exception as e:
             logger.error(f"Failed to trigger cookie refresh: {e}")
-            # Clear the refresh flag on error
+            # Clear the refresh flags on error
             try:
-                self.redis_client.delete(f"cookie:refresh:in_progress")
+                self.redis_client.delete(*[self.refresh_key(sid) for sid in server_ids])
             except:
                 pass
             return False
 
+    @staticmethod
+    def refresh_key(server_id: str) -> str:
+        """Redis flag set while a refresh for this account/server is pending"""
+        return f"cookie:refresh:{server_id}:in_progress"
+
     def is_cookie_refresh_needed(self, error_message: str) -> bool:
         """
         Determine if a cookie refresh is needed based on error message
@@ -95,25 +98,46 @@ class CookieRefreshService:
         Returns:
             bool: True if cookie refresh should be triggered
         """
-        # Patterns that indicate cookie/authentication issues
+        # Patterns that indicate YouTube distrusts the session itself. Content
+        # restrictions and 403s on expired media URLs are not among them: they
+        # fail the same way on every account.
         cookie_error_patterns = [
             "sign in to confirm you're not a bot",
             "sign in to confirm that you",
             "this helps protect our community",
             "confirm you're not a bot",
+            "not a bot",
             "sign-in required",
             "login required",
             "please sign in",
+            "http error 429",
+        ]
+
+        if self.is_content_restricted(error_message):
+            return False
+
+        error_lower = error_message.lower()
+        return any(pattern in error_lower for pattern in cookie_error_patterns)
+
+    def is_content_restricted(self, error_message: str) -> bool:
+        """
+        Determine if yt-dlp failed because of who may watch the video
+
+        Private, age-restricted and members-only videos fail the same way for
+        every account, so neither a cookie refresh nor a retry helps.
+        """
+        restriction_patterns = [
+            "private video",
             "age-restricted",
+            "age restricted",
+            "confirm your age",
             "members-only",
-            "private video",
-            "http error 403",
-            "forbidden",
-            "request blocked",
+            "members only",
+            "join this channel",
         ]
 
         error_lower = error_message.lower()
-        return any(pattern in error_lower for pattern in cookie_error_patterns)
+        return any(pattern in error_lower for pattern in restriction_patterns)
 
     def check_cookies_file_exists(self) -> bool:
         """Check if cookies file exists"""
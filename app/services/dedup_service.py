@@ -0,0 +1,97 @@
+"""
+Reuse of earlier uploads for videos that were already downloaded
+
+Most requests are for videos some earlier job already uploaded. Those only need
+a freshly signed URL, which the API can produce directly instead of routing the
+request through the broker and a worker.
+"""
+from typing import Optional
+from urllib.parse import unquote, urlparse
+from app.config.settings import settings
+from app.monitoring.metrics import dedup_fast_path_total
+from app.services.storage_service import storage_service
+from app.utils.logger import logger
+
+
+def extract_filename_from_url(url: str) -> Optional[str]:
+    """
+    Extract filename from a signed storage URL.
+
+    Example:
+    https://storage.googleapis.com/bucket/My%20Video.mp4?Expires=...
+    Returns: My Video.mp4 (URL decoded)
+    """
+    try:
+        # Path format: /bucket_name/filename.mp4
+        parts = urlparse(url).path.split('/')
+        if len(parts) >= 2:
+            return unquote(parts[-1])
+        return None
+    except Exception as e:
+        logger.error(f"Error extracting filename from URL: {e}")
+        return None
+
+
+class DedupService:
+    """Find completed uploads of a video and re-sign their URLs"""
+
+    async def find_completed(self, db, video_id: str) -> Optional[dict]:
+        """Latest completed, unexpired download of video_id (served by the videoInfo.id/status index)"""
+        return await db.downloads.find_one(
+            {
+                'videoInfo.id': video_id,
+                'status': 'completed',
+                'downloadUrl': {'$exists': True, '$ne': None}
+            },
+            sort=[('createdAt', -1)]
+        )
+
+    async def resign_url(self, existing: dict) -> str:
+        """Fresh signed URL for an earlier upload, or its stored URL if the file name is unknown"""
+        old_url = existing.get('downloadUrl')
+        file_name = extract_filename_from_url(old_url)
+        if not file_name:
+            logger.warning("Could not extract filename from URL, using old URL")
+            return old_url
+
+        # Default to gcs for old records
+        provider = existing.get('storageProvider', 'gcs')
+        # Regenerate signed URL with proper Content-Disposition header
+        download_url = await storage_service.regenerate_signed_url(file_name, provider)
+        logger.info(f"Regenerated signed URL for deduplicated video: {file_name} from {provider}")
+        return download_url
+
+    async def completed_fields(self, existing: Optional[dict]) -> Optional[dict]:
+        """
+        Fields of a completed job record reusing existing, an earlier upload
+        found by find_completed().
+
+        Returns None when the video has to be downloaded, or when re-signing
+        fails and the request should take the normal queued path.
+        """
+        if not settings.DEDUP_FAST_PATH_ENABLED:
+            return None
+        if not existing:
+            dedup_fast_path_total.labels(result='miss').inc()
+            return None
+        try:
+            download_url = await self.resign_url(existing)
+        except Exception as e:
+            logger.warning(f"Could not re-sign existing upload of {existing.get('jobId')}, queueing instead: {e}")
+            dedup_fast_path_total.labels(result='error').inc()
+            return None
+
+        dedup_fast_path_total.labels(result='hit').inc()
+        return {
+            'status': 'completed',
+            'progress': 100,
+            'downloadUrl': download_url,
+            'videoInfo': existing.get('videoInfo'),
+            'storageProvider': existing.get('storageProvider', 'gcs'),
+            'fileSize': existing.get('fileSize', 0),
+            'dedupedFrom': existing.get('jobId'),
+        }
+
+
+# Singleton instance
+dedup_service = DedupService()
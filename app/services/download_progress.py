@@ -0,0 +1,79 @@
+"""
+Machine-readable yt-dlp progress
+
+yt-dlp prints one JSON object per progress event through --progress-template,
+so the download loop parses lines with json.loads instead of regex-scraping the
+human-readable progress bar.
+"""
+import json
+from typing import Optional
+
+PROGRESS_PREFIX = "__ytdl_progress__ "
+
+# Missing fields default to the literal null so every line is valid JSON
+PROGRESS_TEMPLATE = "download:" + PROGRESS_PREFIX + (
+    '{"status": "%(progress.status)s", '
+    '"downloaded_bytes": %(progress.downloaded_bytes|null)s, '
+    '"total_bytes": %(progress.total_bytes|null)s, '
+    '"total_bytes_estimate": %(progress.total_bytes_estimate|null)s, '
+    '"speed": %(progress.speed|null)s, '
+    '"eta": %(progress.eta|null)s, '
+    '"fragment_index": %(progress.fragment_index|null)s, '
+    '"fragment_count": %(progress.fragment_count|null)s}'
+)
+
+# Download phase occupies 20-80% of overall job progress
+PROGRESS_START = 20
+PROGRESS_SPAN = 60
+
+
+def parse_progress_line(line: str) -> Optional[dict]:
+    """Return the progress event carried by a yt-dlp output line, or None"""
+    if not line.startswith(PROGRESS_PREFIX):
+        return None
+    try:
+        return json.loads(line[len(PROGRESS_PREFIX):])
+    except ValueError:
+        return None
+
+
+def build_progress_stats(event: dict) -> dict:
+    """Normalize a yt-dlp progress event (template line or progress hook) for job documents"""
+    total = event.get('total_bytes') or event.get('total_bytes_estimate')
+    return {
+        'downloadedBytes': event.get('downloaded_bytes'),
+        'totalBytes': int(total) if total else None,
+        'speedBps': round(event['speed']) if event.get('speed') else None,
+        'etaSeconds': event.get('eta'),
+        'fragmentIndex': event.get('fragment_index'),
+        'fragmentCount': event.get('fragment_count'),
+    }
+
+
+def scaled_progress(stats: dict) -> Optional[int]:
+    """Map download completion onto overall job progress, or None if the total is unknown"""
+    if not stats.get('totalBytes'):
+        if stats.get('fragmentIndex') and stats.get('fragmentCount'):
+            percentage = stats['fragmentIndex'] * 100 / stats['fragmentCount']
+        else:
+            return None
+    else:
+        percentage = min(100.0, (stats.get('downloadedBytes') or 0) * 100 / stats['totalBytes'])
+    return int(PROGRESS_START + (percentage * PROGRESS_SPAN / 100))
+
+
+class ProgressReporter:
+    """Forward progress events to a callback(progress, stats) whenever overall progress advances"""
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.last_progress = 0
+
+    def report(self, event: dict):
+        if not self.callback or event.get('status') != 'downloading':
+            return
+        stats = build_progress_stats(event)
+        progress = scaled_progress(stats)
+        if progress is not None and progress > self.last_progress:
+            self.callback(progress, stats)
+            self.last_progress = progress
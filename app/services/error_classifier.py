@@ -0,0 +1,133 @@
+"""
+Classify download job failures to decide whether and when to retry them
+
+yt-dlp reports most failures as a line of stderr wrapped in VideoDownloadError,
+so classification looks at exception types first and then at the message text.
+Permanent messages win over the type: a restricted video stays restricted
+whichever exception carried the message.
+"""
+import asyncio
+import random
+import re
+import subprocess
+from dataclasses import dataclass
+from enum import Enum
+from typing import List, Tuple
+from app.exceptions import (
+    CookieUnavailableError,
+    FileUploadError,
+    InvalidVideoURLError,
+    JobCancelledError,
+    RateLimitError,
+    StorageProviderNotAvailableError,
+    VideoNotFoundError,
+    WorkerOverloadedError,
+)
+
+
+class ErrorClass(str, Enum):
+    PERMANENT = "permanent"
+    RATE_LIMITED = "rate_limited"
+    AUTH = "auth"
+    NETWORK = "network"
+    STORAGE = "storage"
+    OVERLOADED = "overloaded"
+    UNKNOWN = "unknown"
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_retries: int
+    base_delay: float
+    max_delay: float
+
+
+RETRY_POLICIES = {
+    ErrorClass.PERMANENT: RetryPolicy(max_retries=0, base_delay=0, max_delay=0),
+    ErrorClass.RATE_LIMITED: RetryPolicy(max_retries=3, base_delay=30, max_delay=300),
+    # Gives the cookie refresh time to finish, or another account time to cool down
+    ErrorClass.AUTH: RetryPolicy(max_retries=2, base_delay=60, max_delay=300),
+    ErrorClass.NETWORK: RetryPolicy(max_retries=3, base_delay=5, max_delay=120),
+    ErrorClass.STORAGE: RetryPolicy(max_retries=3, base_delay=10, max_delay=180),
+    ErrorClass.OVERLOADED: RetryPolicy(max_retries=3, base_delay=15, max_delay=240),
+    ErrorClass.UNKNOWN: RetryPolicy(max_retries=1, base_delay=10, max_delay=60),
+}
+
+# Checked against the lower-cased error message before the exception type
+_PERMANENT_PATTERN = re.compile(
+    r"video unavailable|private video|has been removed|account .* terminated|copyright"
+    r"|members[- ]only|join this channel|confirm your age|age[- ]restricted"
+    r"|unsupported url|invalid (youtube|video) url|not a valid url"
+    r"|requested format is not available|premieres in|live event will begin"
+)
+
+# Checked in order against the lower-cased error message, after the exception type
+_MESSAGE_PATTERNS: List[Tuple[ErrorClass, re.Pattern]] = [
+    (ErrorClass.RATE_LIMITED, re.compile(r"http error 429|too many requests|rate limit")),
+    (ErrorClass.AUTH, re.compile(r"not a bot|sign in to confirm|cookies")),
+    (ErrorClass.NETWORK, re.compile(
+        r"timed out|stalled|connection (reset|refused|aborted)|broken pipe|remote end closed"
+        r"|name resolution|network is unreachable|http error 5\d\d|\b50[234]\b"
+        r"|unable to download|incomplete|did not exit"
+    )),
+]
+
+_NETWORK_ERRORS = (TimeoutError, asyncio.TimeoutError, subprocess.TimeoutExpired, ConnectionError)
+
+
+def _error_text(error: BaseException) -> str:
+    """The error's message plus the reason an application error keeps in its details"""
+    text = str(error)
+    details = getattr(error, 'details', None)
+    if isinstance(details, dict) and details.get('reason'):
+        text = f"{text} {details['reason']}"
+    return text.lower()
+
+
+def classify_error(error: BaseException) -> ErrorClass:
+    """Map a job failure to the class that decides its retry policy"""
+    message = _error_text(error)
+    if _PERMANENT_PATTERN.search(message):
+        return ErrorClass.PERMANENT
+
+    if isinstance(error, (VideoNotFoundError, InvalidVideoURLError, JobCancelledError)):
+        return ErrorClass.PERMANENT
+    if isinstance(error, RateLimitError):
+        return ErrorClass.RATE_LIMITED
+    if isinstance(error, CookieUnavailableError):
+        return ErrorClass.AUTH
+    if isinstance(error, WorkerOverloadedError):
+        return ErrorClass.OVERLOADED
+    if isinstance(error, StorageProviderNotAvailableError):
+        return ErrorClass.STORAGE
+    if isinstance(error, FileUploadError):
+        reason = str(error.details.get("reason", "")).lower()
+        # Misconfiguration will not fix itself between attempts
+        if "not configured" in reason or "unknown provider" in reason:
+            return ErrorClass.PERMANENT
+        return ErrorClass.STORAGE
+    if isinstance(error, _NETWORK_ERRORS):
+        return ErrorClass.NETWORK
+
+    for error_class, pattern in _MESSAGE_PATTERNS:
+        if pattern.search(message):
+            return error_class
+    return ErrorClass.UNKNOWN
+
+
+def retry_policy(error_class: ErrorClass) -> RetryPolicy:
+    return RETRY_POLICIES[error_class]
+
+
+def retry_delay(error: BaseException, error_class: ErrorClass, retries: int) -> float:
+    """
+    Seconds to wait before retry number retries + 1.
+
+    Exponential backoff with full jitter, so jobs that failed together do not
+    retry together. A server-provided retry-after is a lower bound.
+    """
+    policy = retry_policy(error_class)
+    delay = random.uniform(0, min(policy.max_delay, policy.base_delay * (2 ** retries)))
+    if isinstance(error, RateLimitError):
+        delay = max(delay, float(error.details.get("retry_after_seconds") or 0))
+    return delay
@@ -0,0 +1,181 @@
+"""
+Adaptive concurrent fragment downloading for yt-dlp
+
+Picks --concurrent-fragments per job from host pressure (load, memory, active
+jobs) and hill-climbs on the throughput observed at each concurrency level.
+
+Active jobs are counted host-wide: every running download holds a flock()ed
+lease file next to the process limiter's slots, so Celery prefork children
+share the fragment budget and a crashed worker's lease is dropped by the kernel.
+"""
+import fcntl
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+from app.config.settings import settings
+from app.monitoring.metrics import ytdlp_fragment_concurrency, download_throughput_mbps
+from app.services.process_limiter import process_limiter
+from app.utils.host_stats import load_per_cpu, memory_available_ratio, pressure_reason
+from app.utils.logger import logger
+
+# Weight of the newest sample in the per-concurrency throughput average
+EWMA_ALPHA = 0.3
+# Relative gain needed to keep climbing in the same direction
+IMPROVEMENT_THRESHOLD = 1.05
+
+
+class FragmentLease:
+    """Fragment concurrency granted to one download, counted host-wide until released"""
+
+    def __init__(self, concurrency: int, fd: Optional[int] = None, path: Optional[Path] = None):
+        self.concurrency = concurrency
+        self.fd = fd
+        self.path = path
+        self.download_started: Optional[float] = None
+
+    def watch(self, callback=None):
+        """
+        Wrap an attempt's progress callback to time its download phase. The
+        first progress event marks the end of extraction and queueing.
+        """
+        self.download_started = None
+
+        def report(progress, stats=None):
+            if self.download_started is None:
+                self.download_started = time.monotonic()
+            if callback:
+                callback(progress, stats)
+        return report
+
+    def download_seconds(self) -> float:
+        """Seconds since the current attempt started transferring, 0 if it never did"""
+        if self.download_started is None:
+            return 0.0
+        return time.monotonic() - self.download_started
+
+
+class FragmentConcurrencyTuner:
+    """Choose yt-dlp fragment concurrency per job and learn from its throughput"""
+
+    def __init__(self, directory: Optional[Path] = None):
+        self._lock = threading.Lock()
+        self._dir = directory
+        self._throughput: Dict[int, float] = {}  # concurrency -> EWMA MB/s
+        self._current = 2
+        self._direction = 1
+
+    @property
+    def directory(self) -> Path:
+        return self._dir if self._dir is not None else process_limiter.directory
+
+    def acquire(self) -> FragmentLease:
+        """Concurrency for a job that is about to start"""
+        fd, path = self._open_lease()
+        active = max(1, self._active_jobs())
+        with self._lock:
+            concurrency = self._choose(active)
+        ytdlp_fragment_concurrency.set(concurrency)
+        return FragmentLease(concurrency, fd, path)
+
+    def release(self, lease: FragmentLease, bytes_downloaded: int):
+        """Record the outcome of a job started with acquire()"""
+        self._close_lease(lease)
+        seconds = lease.download_seconds()
+        if bytes_downloaded <= 0 or seconds <= 0:
+            return
+
+        concurrency = lease.concurrency
+        mbps = bytes_downloaded / (1024 * 1024) / seconds
+        with self._lock:
+            previous = self._throughput.get(concurrency)
+            self._throughput[concurrency] = mbps if previous is None else (EWMA_ALPHA * mbps + (1 - EWMA_ALPHA) * previous)
+            if concurrency == self._current:
+                self._climb()
+
+        download_throughput_mbps.observe(mbps)
+        logger.info(f"Download throughput {mbps:.2f} MB/s at {concurrency} concurrent fragment(s)")
+
+    # --- host-wide lease files ------------------------------------------------
+
+    def _open_lease(self):
+        """Lock a lease file for a new job; (None, None) if the directory is unusable"""
+        try:
+            directory = self.directory
+            # Locked before it gets a name the counter looks at, so it is never mistaken for stale
+            fd, tmp = tempfile.mkstemp(prefix=".fragments-", suffix=".lock", dir=directory)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            path = directory / os.path.basename(tmp).lstrip('.')
+            os.rename(tmp, path)
+            return fd, path
+        except OSError as e:
+            logger.warning(f"Could not take a fragment lease, counting this process only: {e}")
+            return None, None
+
+    def _close_lease(self, lease: FragmentLease):
+        if lease.fd is None:
+            return
+        try:
+            lease.path.unlink(missing_ok=True)
+        finally:
+            os.close(lease.fd)
+            lease.fd = None
+
+    def _active_jobs(self) -> int:
+        """Downloads holding a lease on this host, across all worker processes"""
+        active = 0
+        try:
+            paths = list(self.directory.glob("fragments-*.lock"))
+        except OSError:
+            return 0
+        for path in paths:
+            try:
+                fd = os.open(path, os.O_RDWR)
+            except FileNotFoundError:
+                continue
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                active += 1
+            else:
+                # Its holder died without releasing and the kernel dropped the lock
+                path.unlink(missing_ok=True)
+            finally:
+                os.close(fd)
+        return active
+
+    # --- tuning ---------------------------------------------------------------
+
+    def _choose(self, active_jobs: int) -> int:
+        if settings.YTDLP_CONCURRENT_FRAGMENTS > 0:
+            return settings.YTDLP_CONCURRENT_FRAGMENTS
+
+        ceiling = settings.YTDLP_MAX_CONCURRENT_FRAGMENTS
+
+        # Back off under CPU or memory pressure; where the process limiter
+        # starts shedding processes, drop to a single fragment
+        load = load_per_cpu()
+        memory = memory_available_ratio()
+        if pressure_reason(memory, load, settings.PROCESS_LIMIT_MIN_FREE_MEMORY, settings.PROCESS_LIMIT_MAX_LOAD):
+            ceiling = 1
+        elif pressure_reason(memory, load, settings.YTDLP_FRAGMENT_BACKOFF_FREE_MEMORY, settings.YTDLP_FRAGMENT_BACKOFF_LOAD):
+            ceiling = max(1, ceiling // 2)
+
+        # Share the host-wide fragment budget between running jobs
+        ceiling = min(ceiling, max(1, settings.YTDLP_FRAGMENT_HOST_BUDGET // active_jobs))
+        return max(1, min(self._current, ceiling))
+
+    def _climb(self):
+        """Keep moving while throughput improves, reverse when it stops improving"""
+        current = self._throughput[self._current]
+        neighbour = self._throughput.get(self._current - self._direction)
+        if neighbour is not None and current < neighbour * IMPROVEMENT_THRESHOLD:
+            self._direction = -self._direction
+
+        self._current = max(1, min(settings.YTDLP_MAX_CONCURRENT_FRAGMENTS, self._current + self._direction))
+
+
+# Global singleton instance
+fragment_tuner = FragmentConcurrencyTuner()
@@ -0,0 +1,79 @@
+"""
+Cancellation signal for download jobs
+
+The API marks a job cancelled in Redis and revokes its Celery task. Revoking
+only stops tasks that have not started, so workers also poll the flag from
+their process watchdogs and between job stages, kill yt-dlp/ffmpeg and abort
+the upload as soon as it is set.
+"""
+import time
+import redis
+from typing import Callable, Optional
+from app.config.settings import settings
+from app.exceptions import JobCancelledError
+from app.utils.logger import logger
+
+
+class JobCancellation:
+    """Redis flag per cancelled job, shared by the API and every worker"""
+
+    KEY_PREFIX = "job:cancel:"
+
+    def __init__(self):
+        try:
+            self.redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        except Exception as e:
+            logger.error(f"Failed to initialize job cancellation: {e}")
+            self.redis_client = None
+
+    def request(self, job_id: str) -> bool:
+        """Flag job_id as cancelled. Returns False if the flag could not be stored."""
+        if self.redis_client is None:
+            return False
+        try:
+            self.redis_client.setex(f"{self.KEY_PREFIX}{job_id}", settings.JOB_CANCEL_TTL, 1)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to flag job {job_id} as cancelled: {e}")
+            return False
+
+    def is_cancelled(self, job_id: Optional[str]) -> bool:
+        """Whether job_id was cancelled; False if Redis is unavailable"""
+        if not job_id or self.redis_client is None:
+            return False
+        try:
+            return bool(self.redis_client.exists(f"{self.KEY_PREFIX}{job_id}"))
+        except Exception as e:
+            logger.debug(f"Could not check cancellation of job {job_id}: {e}")
+            return False
+
+    def checker(self, job_id: Optional[str]) -> Optional[Callable[[], bool]]:
+        """
+        Polling callback for watchdogs, None for jobs that cannot be cancelled.
+
+        Watchdogs call it every second; a negative answer is reused for
+        JOB_CANCEL_POLL_INTERVAL seconds so each job costs Redis one lookup
+        per interval rather than one per tick.
+        """
+        if not job_id:
+            return None
+        checked_at = None
+        cancelled = False
+
+        def check() -> bool:
+            nonlocal checked_at, cancelled
+            now = time.monotonic()
+            if not cancelled and (checked_at is None or now - checked_at >= settings.JOB_CANCEL_POLL_INTERVAL):
+                checked_at = now
+                cancelled = self.is_cancelled(job_id)
+            return cancelled
+        return check
+
+    def raise_if_cancelled(self, job_id: Optional[str]):
+        """Checkpoint between job stages"""
+        if self.is_cancelled(job_id):
+            raise JobCancelledError(job_id)
+
+
+# Singleton instance
+job_cancellation = JobCancellation()
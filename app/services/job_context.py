@@ -0,0 +1,39 @@
+"""
+Per-job context shared by every yt-dlp/ffmpeg run of one download job
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+from app.config.settings import settings
+from app.utils.process_usage import ProcessUsage
+
+
+@dataclass
+class JobContext:
+    """
+    State chosen once per job and reused by info extraction and download.
+
+    Keeping the proxy fixed per job matters because YouTube media URLs are bound
+    to the IP that resolved them.
+    """
+    job_id: Optional[str] = None
+    proxy: Optional[str] = None
+    # Resources used by the job's child processes, per operation
+    resource_usage: Dict[str, ProcessUsage] = field(default_factory=dict)
+    # When the task attempt running the job started
+    started_at: float = field(default_factory=time.monotonic)
+
+    def download_timeout(self) -> float:
+        """
+        Seconds the job's download may run: YTDLP_DOWNLOAD_TIMEOUT, cut short so
+        it ends TASK_UPLOAD_HEADROOM before Celery's soft time limit would.
+        """
+        remaining = settings.CELERY_TASK_SOFT_TIME_LIMIT - settings.TASK_UPLOAD_HEADROOM - (time.monotonic() - self.started_at)
+        return max(1.0, min(settings.YTDLP_DOWNLOAD_TIMEOUT, remaining))
+
+    def add_usage(self, operation: str, usage: ProcessUsage):
+        self.resource_usage.setdefault(operation, ProcessUsage()).add(usage)
+
+    def usage_summary(self) -> Dict[str, dict]:
+        """resourceUsage document for the job, keyed by operation"""
+        return {operation: usage.to_dict() for operation, usage in self.resource_usage.items()}
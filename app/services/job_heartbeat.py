@@ -0,0 +1,103 @@
+"""
+Liveness heartbeats for running download jobs
+
+While a worker runs a job, a background thread refreshes an expiring Redis key
+for it. A worker that crashes, is OOM-killed or is stopped by a deploy stops
+refreshing, the key expires, and the stuck-job reaper can tell the job's
+'processing' status is stale. Other expiring state owned by the job, such as
+a single-flight lock, can ride on the same beat via keep_alive().
+"""
+import os
+import socket
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Set
+import redis
+from app.config.settings import settings
+from app.utils.logger import logger
+
+
+class JobHeartbeat:
+    """Expiring Redis key per running job, refreshed from a daemon thread"""
+
+    KEY_PREFIX = "job:heartbeat:"
+
+    def __init__(self):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._lock = threading.Lock()
+        # job_id -> callbacks run on each of the job's beats
+        self._keep_alive: Dict[str, List[Callable[[], object]]] = {}
+        try:
+            self.redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        except Exception as e:
+            logger.error(f"Failed to initialize job heartbeats: {e}")
+            self.redis_client = None
+
+    def beat(self, job_id: str):
+        try:
+            self.redis_client.setex(f"{self.KEY_PREFIX}{job_id}", settings.JOB_HEARTBEAT_TTL, self.owner)
+        except Exception as e:
+            logger.warning(f"Heartbeat for job {job_id} failed: {e}")
+        with self._lock:
+            callbacks = list(self._keep_alive.get(job_id, ()))
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Keep-alive for job {job_id} failed: {e}")
+
+    def keep_alive(self, job_id: str, callback: Callable[[], object]):
+        """Run callback on every beat of job_id until its running() block ends"""
+        if self.redis_client is None:
+            # running() does not beat without Redis
+            return
+        with self._lock:
+            self._keep_alive.setdefault(job_id, []).append(callback)
+
+    def clear(self, job_id: str):
+        try:
+            self.redis_client.delete(f"{self.KEY_PREFIX}{job_id}")
+        except Exception as e:
+            logger.debug(f"Could not clear heartbeat for job {job_id}: {e}")
+
+    @contextmanager
+    def running(self, job_id: str):
+        """Keep job_id's heartbeat fresh for the duration of the block"""
+        if self.redis_client is None:
+            yield
+            return
+        stopped = threading.Event()
+
+        def refresh():
+            while not stopped.wait(settings.JOB_HEARTBEAT_INTERVAL):
+                self.beat(job_id)
+
+        self.beat(job_id)
+        thread = threading.Thread(target=refresh, name=f"heartbeat-{job_id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stopped.set()
+            # A beat still in flight would recreate the key after we clear it
+            thread.join()
+            with self._lock:
+                self._keep_alive.pop(job_id, None)
+            self.clear(job_id)
+
+    def alive(self, job_ids: Iterable[str]) -> Set[str]:
+        """
+        Jobs among job_ids with a live heartbeat. Raises if Redis cannot be
+        read, so callers never mistake an outage for dead workers.
+        """
+        job_ids = list(job_ids)
+        if not job_ids:
+            return set()
+        if self.redis_client is None:
+            raise RuntimeError("Heartbeat store is not available")
+        values = self.redis_client.mget([f"{self.KEY_PREFIX}{job_id}" for job_id in job_ids])
+        return {job_id for job_id, value in zip(job_ids, values) if value is not None}
+
+
+# Singleton instance
+job_heartbeat = JobHeartbeat()
@@ -0,0 +1,133 @@
+"""
+Registry of resumable partial downloads
+
+Every attempt of a download job writes into downloads/partial/{job_id}/ under
+the same file name and keeps yt-dlp's .part files, so a retried attempt resumes
+where the previous one stopped instead of starting from byte zero. A Redis key
+per job marks its directory as live; directories whose key has expired belong to
+abandoned jobs and are removed by gc().
+"""
+import hashlib
+import json
+import re
+import shutil
+import socket
+import time
+import redis
+from pathlib import Path
+from typing import Optional
+from app.config.settings import settings
+from app.monitoring.metrics import partial_download_events_total
+from app.utils.logger import logger
+
+
+class PartialDownloadRegistry:
+    """Per-job partial download directories with a shared liveness registry"""
+
+    KEY_PREFIX = "download:partial:"
+    # Never collect a directory written to this recently, registered or not
+    GRACE_SECONDS = 300
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.host = socket.gethostname()
+        try:
+            self.redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        except Exception as e:
+            logger.error(f"Failed to initialize partial download registry: {e}")
+            self.redis_client = None
+
+    @staticmethod
+    def _name(job_id: str) -> str:
+        """Directory and registry name for a job, safe to use as a path component"""
+        if re.fullmatch(r'[\w-]+', job_id):
+            return job_id
+        return hashlib.sha256(job_id.encode('utf-8')).hexdigest()[:32]
+
+    def claim(self, job_id: str, video_id: str) -> Path:
+        """Directory for the job's download; files left by an earlier attempt are kept"""
+        name = self._name(job_id)
+        directory = self.root / name
+        self._register(name, video_id, directory)
+        if directory.exists() and any(directory.iterdir()):
+            logger.info(f"Resuming partial download for job {job_id}")
+            partial_download_events_total.labels(event='resumed').inc()
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory
+
+    def _register(self, name: str, video_id: str, directory: Path):
+        if self.redis_client is None:
+            return
+        try:
+            self.redis_client.setex(
+                f"{self.KEY_PREFIX}{name}",
+                settings.PARTIAL_DOWNLOAD_TTL,
+                json.dumps({'videoId': video_id, 'host': self.host, 'path': str(directory), 'updatedAt': time.time()})
+            )
+        except Exception as e:
+            logger.warning(f"Partial download registry update failed for {name}: {e}")
+
+    def complete(self, job_id: str):
+        """Drop the job's partial files once the finished file has been moved out"""
+        name = self._name(job_id)
+        shutil.rmtree(self.root / name, ignore_errors=True)
+        partial_download_events_total.labels(event='completed').inc()
+        if self.redis_client is None:
+            return
+        try:
+            self.redis_client.delete(f"{self.KEY_PREFIX}{name}")
+        except Exception as e:
+            logger.warning(f"Partial download registry cleanup failed for {job_id}: {e}")
+
+    def _is_registered(self, name: str) -> Optional[bool]:
+        """Whether the job is still live, or None when the registry is unreachable"""
+        if self.redis_client is None:
+            return None
+        try:
+            return bool(self.redis_client.exists(f"{self.KEY_PREFIX}{name}"))
+        except Exception:
+            return None
+
+    @staticmethod
+    def _last_modified(directory: Path) -> float:
+        latest = directory.stat().st_mtime
+        for path in directory.iterdir():
+            try:
+                latest = max(latest, path.stat().st_mtime)
+            except OSError:
+                continue
+        return latest
+
+    def gc(self) -> int:
+        """
+        Remove this host's abandoned partial directories.
+
+        A directory goes once its job has left the registry, or once it has been
+        idle for PARTIAL_DOWNLOAD_TTL when the registry cannot be reached.
+        """
+        if not self.root.exists():
+            return 0
+        now = time.time()
+        removed = 0
+        for directory in self.root.iterdir():
+            if not directory.is_dir():
+                continue
+            try:
+                idle = now - self._last_modified(directory)
+            except OSError:
+                continue
+            if idle < self.GRACE_SECONDS:
+                continue
+            registered = self._is_registered(directory.name)
+            if registered or (registered is None and idle < settings.PARTIAL_DOWNLOAD_TTL):
+                continue
+            shutil.rmtree(directory, ignore_errors=True)
+            partial_download_events_total.labels(event='collected').inc()
+            removed += 1
+        if removed:
+            logger.info(f"Removed {removed} abandoned partial downloads")
+        return removed
+
+
+# Singleton instance
+partial_downloads = PartialDownloadRegistry(Path("downloads") / "partial")
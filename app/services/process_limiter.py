@@ -0,0 +1,253 @@
+"""
+Adaptive per-host admission control for yt-dlp and ffmpeg child processes
+
+Every spawn on a host takes one of `limit` slots. Slots are flock()ed files
+under tmpfs, so all worker processes on the host share them and a crashed
+worker's slot is freed by the kernel. The limit follows AIMD: it grows by one
+after each healthy run and halves when memory runs low, load climbs or runs
+start timing out. Work beyond the limit waits for a slot instead of spawning.
+"""
+import asyncio
+import fcntl
+import json
+import os
+import signal
+import subprocess
+import tempfile
+import time
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import Optional
+from app.config.settings import settings
+from app.exceptions import WorkerOverloadedError
+from app.monitoring.metrics import process_limiter_limit, process_limiter_wait_seconds
+from app.utils.host_stats import load_per_cpu, memory_available_ratio, pressure_reason
+from app.utils.logger import logger
+
+TMPFS_ROOT = "/dev/shm"
+POLL_INTERVAL = 0.25
+# Weight of the newest run in the timeout-rate average
+TIMEOUT_ALPHA = 0.2
+# Minimum spacing between multiplicative decreases, so one burst halves once
+DECREASE_COOLDOWN = 5.0
+
+_TIMEOUT_ERRORS = (TimeoutError, asyncio.TimeoutError, subprocess.TimeoutExpired)
+
+
+class ProcessSlot:
+    """A held slot; set timed_out when the child was killed for running too long"""
+
+    def __init__(self, name: str, fd: int):
+        self.name = name
+        self.fd = fd
+        self.timed_out = False
+        self.failed = False
+        self.oom_killed = False
+
+    def record_exit(self, returncode: Optional[int], killed: bool = False):
+        """
+        Note how the child ended, before the slot is released. A nonzero exit
+        keeps the limit from growing; a SIGKILL that we did not send (killed is
+        False) can only have come from the kernel's OOM killer.
+        """
+        self.failed = returncode != 0
+        self.oom_killed = returncode == -signal.SIGKILL and not killed
+
+
+class ProcessLimiter:
+    """Host-wide AIMD limit on concurrently running yt-dlp/ffmpeg children"""
+
+    def __init__(self):
+        self._dir: Optional[Path] = None
+        self._limit: Optional[int] = None
+        self._pressure_checked_at = 0.0
+
+    @property
+    def directory(self) -> Path:
+        if self._dir is None:
+            if settings.PROCESS_LIMIT_DIR:
+                root = Path(settings.PROCESS_LIMIT_DIR)
+            elif os.access(TMPFS_ROOT, os.W_OK):
+                root = Path(TMPFS_ROOT) / "ytdl-slots"
+            else:
+                root = Path(tempfile.gettempdir()) / "ytdl-slots"
+            root.mkdir(parents=True, exist_ok=True)
+            self._dir = root
+        return self._dir
+
+    @property
+    def enabled(self) -> bool:
+        return settings.PROCESS_LIMIT_ENABLED
+
+    # --- shared limit state -------------------------------------------------
+
+    def _update_state(self, mutate) -> dict:
+        """Read-modify-write the host's limit state under an exclusive lock"""
+        path = self.directory / "state.json"
+        with open(path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                raw = f.read()
+                try:
+                    state = json.loads(raw) if raw else {}
+                except ValueError:
+                    state = {}
+                state.setdefault('limit', float(settings.PROCESS_LIMIT_INITIAL))
+                state.setdefault('timeout_rate', 0.0)
+                state.setdefault('last_decrease', 0.0)
+                mutate(state)
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        self._limit = int(state['limit'])
+        process_limiter_limit.set(self._limit)
+        return state
+
+    def _overloaded(self, timeout_rate: float) -> Optional[str]:
+        reason = pressure_reason(
+            memory_available_ratio(), load_per_cpu(),
+            settings.PROCESS_LIMIT_MIN_FREE_MEMORY, settings.PROCESS_LIMIT_MAX_LOAD
+        )
+        if reason:
+            return reason
+        if timeout_rate > settings.PROCESS_LIMIT_MAX_TIMEOUT_RATE:
+            return f"timeout rate {timeout_rate:.0%}"
+        return None
+
+    def _decrease(self, state: dict, reason: str):
+        now = time.time()
+        if now - state['last_decrease'] < DECREASE_COOLDOWN:
+            return
+        previous = state['limit']
+        state['limit'] = max(float(settings.PROCESS_LIMIT_MIN), previous / 2)
+        state['last_decrease'] = now
+        if int(state['limit']) != int(previous):
+            logger.warning(f"Process limit lowered to {int(state['limit'])} ({reason})")
+
+    def _check_pressure(self) -> int:
+        """
+        Current limit, halved first if the host is already under pressure.
+
+        Load and memory are sampled at most every PROCESS_LIMIT_PRESSURE_INTERVAL
+        seconds per process; waiters polling for a slot reuse the last limit.
+        """
+        now = time.monotonic()
+        if self._limit is not None and now - self._pressure_checked_at < settings.PROCESS_LIMIT_PRESSURE_INTERVAL:
+            return self._limit
+        self._pressure_checked_at = now
+
+        def mutate(state):
+            reason = self._overloaded(state['timeout_rate'])
+            if reason:
+                self._decrease(state, reason)
+        return int(self._update_state(mutate)['limit'])
+
+    def _record(self, timed_out: bool, oom_killed: bool = False):
+        def mutate(state):
+            state['timeout_rate'] = (1 - TIMEOUT_ALPHA) * state['timeout_rate'] + TIMEOUT_ALPHA * (1.0 if timed_out else 0.0)
+            reason = "child OOM-killed" if oom_killed else self._overloaded(state['timeout_rate'])
+            if reason:
+                self._decrease(state, reason)
+            elif not timed_out:
+                state['limit'] = min(float(settings.PROCESS_LIMIT_MAX), state['limit'] + 1)
+        self._update_state(mutate)
+
+    # --- slots --------------------------------------------------------------
+
+    def _try_acquire(self, name: str) -> Optional[ProcessSlot]:
+        limit = self._check_pressure()
+        for index in range(limit):
+            fd = os.open(self.directory / f"slot-{index}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            return ProcessSlot(name, fd)
+        return None
+
+    def _release(self, slot: ProcessSlot, error: Optional[BaseException]):
+        try:
+            fcntl.flock(slot.fd, fcntl.LOCK_UN)
+        finally:
+            os.close(slot.fd)
+        if isinstance(error, _TIMEOUT_ERRORS):
+            slot.timed_out = True
+        if slot.timed_out or slot.oom_killed:
+            self._record(slot.timed_out, slot.oom_killed)
+        elif error is None and not slot.failed:
+            self._record(False)
+        # Failures unrelated to host pressure (bad URL, bot detection) neither grow nor shrink the limit
+
+    def acquire(self, name: str) -> Optional[ProcessSlot]:
+        """
+        Block until a slot is free and return it (None when the limiter is disabled).
+
+        Raises WorkerOverloadedError after PROCESS_LIMIT_WAIT_TIMEOUT seconds.
+        """
+        if not self.enabled:
+            return None
+        started = time.monotonic()
+        while True:
+            slot = self._try_acquire(name)
+            if slot:
+                process_limiter_wait_seconds.labels(process=name).observe(time.monotonic() - started)
+                return slot
+            waited = time.monotonic() - started
+            if waited > settings.PROCESS_LIMIT_WAIT_TIMEOUT:
+                raise WorkerOverloadedError(name, waited)
+            time.sleep(POLL_INTERVAL)
+
+    async def acquire_async(self, name: str) -> Optional[ProcessSlot]:
+        """Event-loop friendly acquire()"""
+        if not self.enabled:
+            return None
+        started = time.monotonic()
+        while True:
+            slot = self._try_acquire(name)
+            if slot:
+                process_limiter_wait_seconds.labels(process=name).observe(time.monotonic() - started)
+                return slot
+            waited = time.monotonic() - started
+            if waited > settings.PROCESS_LIMIT_WAIT_TIMEOUT:
+                raise WorkerOverloadedError(name, waited)
+            await asyncio.sleep(POLL_INTERVAL)
+
+    def release(self, slot: Optional[ProcessSlot], error: Optional[BaseException] = None):
+        """Give back a slot from acquire(); error is the exception the run ended with, if any"""
+        if slot is None:
+            return
+        try:
+            self._release(slot, error)
+        except Exception as e:
+            logger.warning(f"Process limiter release failed: {e}")
+
+    @contextmanager
+    def slot(self, name: str):
+        """Hold a slot for the duration of the block"""
+        held = self.acquire(name)
+        try:
+            yield held
+        except BaseException as e:
+            self.release(held, e)
+            raise
+        self.release(held)
+
+    @asynccontextmanager
+    async def slot_async(self, name: str):
+        """Async variant of slot()"""
+        held = await self.acquire_async(name)
+        try:
+            yield held
+        except BaseException as e:
+            self.release(held, e)
+            raise
+        self.release(held)
+
+
+# Singleton instance
+process_limiter = ProcessLimiter()
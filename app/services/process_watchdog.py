@@ -0,0 +1,91 @@
+"""
+Watchdog for yt-dlp/ffmpeg children - enforces a total deadline and a stall timeout,
+and stops children whose job was cancelled
+"""
+import os
+import signal
+import subprocess
+import threading
+import time
+from typing import Callable, Optional
+from app.monitoring.metrics import ytdlp_watchdog_kills_total
+from app.utils.logger import logger
+from app.utils.process_usage import has_exited
+
+
+class ProcessWatchdog:
+    """
+    Kill a child's process group when it runs past its deadline, stops making
+    progress, or when `cancelled` (polled every check) returns True.
+
+    The child must be started with start_new_session=True so that the kill also
+    reaches ffmpeg/node helpers spawned by yt-dlp. Call touch() whenever the child
+    shows progress.
+    """
+
+    CHECK_INTERVAL = 1.0
+
+    def __init__(self, process: subprocess.Popen, total_timeout: float, stall_timeout: float, name: str = "yt-dlp",
+                 cancelled: Optional[Callable[[], bool]] = None):
+        self.process = process
+        self.total_timeout = total_timeout
+        self.stall_timeout = stall_timeout
+        self.name = name
+        self.cancelled = cancelled
+        self.reason: Optional[str] = None
+        self.kind: Optional[str] = None
+        self._started_at = time.monotonic()
+        self._last_activity = self._started_at
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"{name}-watchdog", daemon=True)
+
+    def start(self) -> "ProcessWatchdog":
+        self._thread.start()
+        return self
+
+    def touch(self):
+        """Record progress from the child"""
+        self._last_activity = time.monotonic()
+
+    def stop(self):
+        self._stopped.set()
+
+    @property
+    def fired(self) -> bool:
+        return self.reason is not None
+
+    @property
+    def was_cancelled(self) -> bool:
+        return self.kind == "cancelled"
+
+    def _run(self):
+        while not self._stopped.wait(self.CHECK_INTERVAL):
+            # Never reap here: the owner collects the child's rusage when it waits
+            if has_exited(self.process):
+                return
+
+            if self.cancelled and self.cancelled():
+                self.kill("cancelled by user", kind="cancelled")
+                return
+            now = time.monotonic()
+            if self.total_timeout and now - self._started_at > self.total_timeout:
+                self.kill(f"timed out after {int(self.total_timeout)}s", kind="timeout")
+                return
+            if self.stall_timeout and now - self._last_activity > self.stall_timeout:
+                self.kill(f"stalled with no progress for {int(self.stall_timeout)}s", kind="stall")
+                return
+
+    def kill(self, reason: str, kind: str):
+        """Kill the whole process group and remember why"""
+        self.reason = reason
+        self.kind = kind
+        logger.warning(f"Watchdog killing {self.name} (pid {self.process.pid}): {reason}")
+        record_watchdog_kill(self.name, kind)
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+
+def record_watchdog_kill(name: str, kind: str):
+    ytdlp_watchdog_kills_total.labels(process=name, reason=kind).inc()
@@ -0,0 +1,240 @@
+"""
+Egress proxy pool with rolling latency, throughput and error-rate scores
+
+Scores are kept in Redis so every worker sees the same picture. A proxy whose
+error rate crosses PROXY_EJECT_ERROR_RATE is ejected for PROXY_EJECT_SECONDS and
+re-admitted on probation once the ejection key expires.
+"""
+import os
+import random
+import time
+import redis
+from contextlib import contextmanager
+from typing import List, Optional
+from app.config.settings import settings
+from app.exceptions import (
+    CookieUnavailableError,
+    InvalidVideoURLError,
+    JobCancelledError,
+    RateLimitError,
+    VideoNotFoundError,
+    WorkerOverloadedError
+)
+from app.monitoring.metrics import proxy_ejections_total, proxy_score
+from app.services.rate_governor import RateGovernor
+from app.utils.logger import logger
+
+# Failures that say nothing about the proxy's health: the video itself, a
+# cancelled job, or caller-side limits (rate governor, cookie pool, process
+# slot wait timeouts)
+_NEUTRAL_ERRORS = (
+    VideoNotFoundError,
+    InvalidVideoURLError,
+    JobCancelledError,
+    RateLimitError,
+    CookieUnavailableError,
+    WorkerOverloadedError
+)
+
+
+def parse_proxies(proxies: Optional[str], single_proxy: Optional[str]) -> List[str]:
+    """Comma-separated YT_DLP_PROXIES, falling back to the legacy single YT_DLP_PROXY"""
+    if proxies:
+        return [p.strip() for p in proxies.split(',') if p.strip()]
+    return [single_proxy] if single_proxy else []
+
+
+class ProxyProbe:
+    """Collects what a single run learned about its proxy"""
+
+    def __init__(self):
+        self.started_at: Optional[float] = None
+        self.bytes_transferred = 0
+
+    def start(self):
+        """
+        Mark the start of the yt-dlp run. Rate-governor and process-slot waits
+        before it are not the proxy's latency; a later attempt restarts the clock.
+        """
+        self.started_at = time.monotonic()
+
+    @property
+    def started(self) -> bool:
+        return self.started_at is not None
+
+
+class ProxyPool:
+    """Score-ranked proxy selection with automatic ejection and re-admission"""
+
+    KEY_PREFIX = "proxy:pool:"
+    EJECT_PREFIX = "proxy:eject:"
+    INFLIGHT_PREFIX = "proxy:inflight:"
+    # Weight of the newest sample in the rolling averages
+    ALPHA = 0.2
+
+    def __init__(self, proxies: List[str]):
+        self.proxies = proxies
+        try:
+            self.redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        except Exception as e:
+            logger.error(f"Failed to initialize proxy pool: {e}")
+            self.redis_client = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.proxies)
+
+    @staticmethod
+    def label(proxy: str) -> str:
+        """host:port of a proxy URL, without credentials"""
+        return RateGovernor.egress_id(proxy)
+
+    def _stats(self) -> List[dict]:
+        pipe = self.redis_client.pipeline()
+        for proxy in self.proxies:
+            label = self.label(proxy)
+            pipe.hgetall(f"{self.KEY_PREFIX}{label}")
+            pipe.exists(f"{self.EJECT_PREFIX}{label}")
+            pipe.get(f"{self.INFLIGHT_PREFIX}{label}")
+        results = pipe.execute()
+
+        stats = []
+        for index, proxy in enumerate(self.proxies):
+            raw, ejected, inflight = results[index * 3:index * 3 + 3]
+            stats.append({
+                'proxy': proxy,
+                'latency': float(raw.get('latency', 0)) or None,
+                'throughput': float(raw.get('throughput', 0)) or None,
+                'error_rate': float(raw.get('error_rate', 0)),
+                'ejected': bool(ejected),
+                'inflight': max(int(inflight or 0), 0),
+            })
+        return stats
+
+    @staticmethod
+    def _score(stats: dict, reference_throughput: float) -> float:
+        """Higher is better. Unmeasured proxies get neutral values so they are tried."""
+        latency = stats['latency'] or 1.0
+        throughput = stats['throughput'] or reference_throughput
+        return (1 - stats['error_rate']) * throughput / (latency * (1 + stats['inflight']))
+
+    def _pick(self) -> Optional[str]:
+        if not self.proxies:
+            return None
+        if self.redis_client is None:
+            return random.choice(self.proxies)
+        try:
+            stats = self._stats()
+        except Exception as e:
+            logger.warning(f"Proxy pool stats unavailable, picking at random: {e}")
+            return random.choice(self.proxies)
+
+        candidates = [s for s in stats if not s['ejected']]
+        if not candidates:
+            logger.warning("All proxies are ejected - using the best of them anyway")
+            candidates = stats
+
+        measured = [s['throughput'] for s in stats if s['throughput']]
+        reference = sum(measured) / len(measured) if measured else 1.0
+        best = max(candidates, key=lambda s: self._score(s, reference))
+        for s in stats:
+            proxy_score.labels(proxy=self.label(s['proxy'])).set(self._score(s, reference))
+        return best['proxy']
+
+    def acquire(self) -> Optional[str]:
+        """Pick the best proxy for a job and count it as in flight until release()"""
+        proxy = self._pick()
+        if proxy and self.redis_client is not None:
+            try:
+                key = f"{self.INFLIGHT_PREFIX}{self.label(proxy)}"
+                pipe = self.redis_client.pipeline()
+                pipe.incr(key)
+                # Safety net for workers that die without releasing
+                pipe.expire(key, 3600)
+                pipe.execute()
+            except Exception as e:
+                logger.warning(f"Proxy pool in-flight update failed: {e}")
+        return proxy
+
+    def release(self, proxy: Optional[str]):
+        if not proxy or self.redis_client is None:
+            return
+        try:
+            key = f"{self.INFLIGHT_PREFIX}{self.label(proxy)}"
+            if self.redis_client.decr(key) < 0:
+                self.redis_client.set(key, 0)
+        except Exception as e:
+            logger.warning(f"Proxy pool in-flight update failed: {e}")
+
+    def best(self) -> Optional[str]:
+        """Best proxy for a one-off call outside a job"""
+        return self._pick()
+
+    def record(self, proxy: str, success: bool, latency: Optional[float] = None, throughput: Optional[float] = None):
+        """Fold one run's outcome into the proxy's rolling scores, ejecting it if it keeps failing"""
+        if self.redis_client is None:
+            return
+        label = self.label(proxy)
+        key = f"{self.KEY_PREFIX}{label}"
+        try:
+            raw = self.redis_client.hgetall(key)
+            updates = {}
+
+            def ewma(field: str, value: float) -> float:
+                previous = raw.get(field)
+                if previous is None:
+                    return value
+                return (1 - self.ALPHA) * float(previous) + self.ALPHA * value
+
+            updates['error_rate'] = round(ewma('error_rate', 0.0 if success else 1.0), 4)
+            if latency is not None:
+                updates['latency'] = round(ewma('latency', latency), 4)
+            if throughput:
+                updates['throughput'] = round(ewma('throughput', throughput), 4)
+            samples = int(raw.get('samples', 0)) + 1
+            updates['samples'] = samples
+
+            if samples >= settings.PROXY_MIN_SAMPLES and updates['error_rate'] >= settings.PROXY_EJECT_ERROR_RATE:
+                logger.warning(f"Ejecting proxy {label} for {settings.PROXY_EJECT_SECONDS}s (error rate {updates['error_rate']:.2f})")
+                self.redis_client.setex(f"{self.EJECT_PREFIX}{label}", settings.PROXY_EJECT_SECONDS, "1")
+                proxy_ejections_total.labels(proxy=label).inc()
+                # Re-admitted on probation: a couple more failures eject it again
+                updates['error_rate'] = settings.PROXY_EJECT_ERROR_RATE / 2
+                updates['samples'] = 0
+
+            self.redis_client.hset(key, mapping=updates)
+        except Exception as e:
+            logger.warning(f"Proxy pool score update failed for {label}: {e}")
+
+    @contextmanager
+    def measure(self, proxy: Optional[str]):
+        """
+        Time a yt-dlp run through proxy and record its outcome.
+
+        Call probe.start() when the run spawns; nothing is recorded for blocks
+        that never got that far or failed for reasons unrelated to the proxy.
+        Set probe.bytes_transferred for downloads so throughput is scored too.
+        """
+        probe = ProxyProbe()
+        if not proxy:
+            yield probe
+            return
+        try:
+            yield probe
+        except _NEUTRAL_ERRORS:
+            raise
+        except Exception:
+            if probe.started:
+                self.record(proxy, success=False)
+            raise
+        if not probe.started:
+            return
+        elapsed = time.monotonic() - probe.started_at
+        if probe.bytes_transferred and elapsed > 0:
+            self.record(proxy, success=True, throughput=probe.bytes_transferred / elapsed / (1024 * 1024))
+        else:
+            self.record(proxy, success=True, latency=elapsed)
+
+
+# Singleton instance
+proxy_pool = ProxyPool(parse_proxies(settings.YT_DLP_PROXIES, os.getenv('YT_DLP_PROXY')))
@@ -0,0 +1,133 @@
+"""
+Cluster-wide rate governor for YouTube extractions
+
+A GCRA limiter in Redis spaces out requests per YouTube account and per egress
+IP across every worker and API node. Callers reserve a slot, sleep until it
+comes up, and only then start yt-dlp, so bursts are smoothed out before they
+turn into "confirm you're not a bot" blocks.
+"""
+import asyncio
+import socket
+import time
+import redis
+from typing import List, Optional, Tuple
+from urllib.parse import urlparse
+from app.config.settings import settings
+from app.exceptions import RateLimitError
+from app.monitoring.metrics import youtube_rate_limit_delay_seconds, youtube_rate_limit_rejections_total
+from app.utils.logger import logger
+
+
+# GCRA over several keys at once: find the earliest time every limit allows a
+# request, and reserve it on all of them only if that is within max_wait.
+# ARGV[1] = max_wait_ms, then (interval_ms, tolerance_ms) per key.
+_RESERVE_SCRIPT = """
+local now_t = redis.call('TIME')
+local now = tonumber(now_t[1]) * 1000 + math.floor(tonumber(now_t[2]) / 1000)
+local max_wait = tonumber(ARGV[1])
+local start = now
+local tats = {}
+for i = 1, #KEYS do
+    local tolerance = tonumber(ARGV[i * 2 + 1])
+    local tat = tonumber(redis.call('GET', KEYS[i]) or now)
+    if tat < now then tat = now end
+    tats[i] = tat
+    if tat - tolerance > start then start = tat - tolerance end
+end
+local delay = start - now
+if delay > max_wait then
+    return {0, delay}
+end
+for i = 1, #KEYS do
+    local interval = tonumber(ARGV[i * 2])
+    local tolerance = tonumber(ARGV[i * 2 + 1])
+    local new_tat = math.max(tats[i], start) + interval
+    redis.call('SET', KEYS[i], new_tat, 'PX', new_tat - now + tolerance + 1000)
+end
+return {1, delay}
+"""
+
+
+class RateGovernor:
+    """Distributed per-account and per-egress request spacing"""
+
+    KEY_PREFIX = "ratelimit:youtube:"
+
+    def __init__(self):
+        try:
+            self.redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+            self._reserve = self.redis_client.register_script(_RESERVE_SCRIPT)
+        except Exception as e:
+            logger.error(f"Failed to initialize YouTube rate governor: {e}")
+            self.redis_client = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.YOUTUBE_RATE_LIMIT_ENABLED and self.redis_client is not None
+
+    @staticmethod
+    def egress_id(proxy: Optional[str] = None) -> str:
+        """Identity of the IP YouTube sees: the proxy endpoint, or this host"""
+        if proxy:
+            parsed = urlparse(proxy)
+            return f"{parsed.hostname}:{parsed.port}" if parsed.port else (parsed.hostname or proxy)
+        return settings.EGRESS_ID or socket.gethostname()
+
+    def _limits(self, account_id: Optional[str], egress: str) -> List[Tuple[str, int, int]]:
+        """(key, emission interval ms, burst tolerance ms) for every limit that applies"""
+        limits = []
+        burst = max(settings.YOUTUBE_RATE_BURST, 1)
+        if account_id and settings.YOUTUBE_ACCOUNT_RATE_PER_MINUTE > 0:
+            interval = int(60000 / settings.YOUTUBE_ACCOUNT_RATE_PER_MINUTE)
+            limits.append((f"{self.KEY_PREFIX}account:{account_id}", interval, interval * (burst - 1)))
+        if settings.YOUTUBE_EGRESS_RATE_PER_MINUTE > 0:
+            interval = int(60000 / settings.YOUTUBE_EGRESS_RATE_PER_MINUTE)
+            limits.append((f"{self.KEY_PREFIX}egress:{egress}", interval, interval * (burst - 1)))
+        return limits
+
+    def reserve(self, account_id: Optional[str], egress: str) -> float:
+        """
+        Reserve the next request slot and return how many seconds to wait for it.
+
+        Raises RateLimitError when the wait would exceed YOUTUBE_RATE_MAX_WAIT.
+        Fails open (no wait) if Redis is unavailable.
+        """
+        if not self.enabled:
+            return 0.0
+        limits = self._limits(account_id, egress)
+        if not limits:
+            return 0.0
+
+        args = [int(settings.YOUTUBE_RATE_MAX_WAIT * 1000)]
+        for _, interval, tolerance in limits:
+            args.extend([interval, tolerance])
+        try:
+            granted, delay_ms = self._reserve(keys=[key for key, _, _ in limits], args=args)
+        except Exception as e:
+            logger.warning(f"Rate governor unavailable, proceeding without limit: {e}")
+            return 0.0
+
+        if not granted:
+            youtube_rate_limit_rejections_total.inc()
+            raise RateLimitError(retry_after=int(delay_ms / 1000) + 1)
+        return delay_ms / 1000
+
+    def acquire(self, account_id: Optional[str], egress: str, operation: str):
+        """Block until this host may send the next request to YouTube"""
+        delay = self.reserve(account_id, egress)
+        youtube_rate_limit_delay_seconds.labels(operation=operation).observe(delay)
+        if delay > 0:
+            logger.debug(f"Rate governor delaying {operation} by {delay:.2f}s (account={account_id}, egress={egress})")
+            time.sleep(delay)
+
+    async def acquire_async(self, account_id: Optional[str], egress: str, operation: str):
+        """Event-loop friendly acquire()"""
+        delay = self.reserve(account_id, egress)
+        youtube_rate_limit_delay_seconds.labels(operation=operation).observe(delay)
+        if delay > 0:
+            logger.debug(f"Rate governor delaying {operation} by {delay:.2f}s (account={account_id}, egress={egress})")
+            await asyncio.sleep(delay)
+
+
+# Singleton instance
+rate_governor = RateGovernor()
@@ -0,0 +1,122 @@
+"""
+Cross-worker single-flight coordination for downloads of the same video
+
+The first job for a video takes a Redis lock and becomes the leader. Jobs that
+arrive while the lock is held are followers: rather than holding a worker slot
+while the leader downloads, they go back on the queue with a countdown and
+check again. Once the leader has uploaded the video, a follower finds the
+completed upload and reuses it; if the leader failed, the lock is gone and the
+follower becomes the leader itself. So the video is downloaded and uploaded
+once no matter how many users requested it.
+
+The lock only lives for SINGLE_FLIGHT_LOCK_TTL seconds. The leader's job
+heartbeat keeps extending it while the job runs, so a slow download never
+loses the lock, and a leader that died frees it soon after.
+"""
+import redis
+from app.config.settings import settings
+from app.utils.logger import logger
+
+
+# Release the lock only if we still own it
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Extend the lock only if we still own it
+_REFRESH_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """Redis lock keyed by video ID"""
+
+    LOCK_PREFIX = "singleflight:lock:"
+
+    # Outcomes of join()
+    LEADER = "leader"
+    DEFER = "defer"
+    UNCOORDINATED = "uncoordinated"
+
+    def __init__(self):
+        try:
+            self.redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+            self._release = self.redis_client.register_script(_RELEASE_SCRIPT)
+            self._refresh = self.redis_client.register_script(_REFRESH_SCRIPT)
+        except Exception as e:
+            logger.error(f"Failed to initialize single-flight coordinator: {e}")
+            self.redis_client = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.SINGLE_FLIGHT_ENABLED and self.redis_client is not None
+
+    def try_acquire(self, video_id: str, job_id: str) -> bool:
+        """
+        Try to become the leader for video_id. A job that already holds the lock
+        (a retried or requeued leader) keeps it. Fails open if Redis is unavailable.
+        """
+        if not self.enabled:
+            return True
+        key = f"{self.LOCK_PREFIX}{video_id}"
+        try:
+            if self.redis_client.set(key, job_id, nx=True, ex=settings.SINGLE_FLIGHT_LOCK_TTL):
+                return True
+            if self.redis_client.get(key) == job_id:
+                self.redis_client.expire(key, settings.SINGLE_FLIGHT_LOCK_TTL)
+                return True
+            return False
+        except Exception as e:
+            logger.warning(f"Single-flight lock failed for {video_id}, proceeding uncoordinated: {e}")
+            return True
+
+    def join(self, video_id: str, job_id: str, waited: float = 0) -> str:
+        """
+        Decide how job_id handles video_id, having already deferred for waited seconds.
+
+        LEADER: the job downloads the video and must release() afterwards.
+        DEFER: another job is downloading it; check again after
+        SINGLE_FLIGHT_RECHECK_INTERVAL seconds.
+        UNCOORDINATED: the leader has taken longer than SINGLE_FLIGHT_WAIT_TIMEOUT;
+        the job downloads the video without holding the lock.
+        """
+        if self.try_acquire(video_id, job_id):
+            return self.LEADER if self.enabled else self.UNCOORDINATED
+        if waited < settings.SINGLE_FLIGHT_WAIT_TIMEOUT:
+            logger.info(f"Video {video_id} is already being processed - job {job_id} checks again later")
+            return self.DEFER
+        logger.warning(f"Giving up on single-flight for {video_id}, job {job_id} proceeds uncoordinated")
+        return self.UNCOORDINATED
+
+    def refresh(self, video_id: str, leader_job_id: str) -> bool:
+        """Extend the lock while leader_job_id still owns it; called from the job's heartbeat"""
+        if not self.enabled:
+            return False
+        try:
+            return bool(self._refresh(
+                keys=[f"{self.LOCK_PREFIX}{video_id}"],
+                args=[leader_job_id, settings.SINGLE_FLIGHT_LOCK_TTL * 1000]
+            ))
+        except Exception as e:
+            logger.warning(f"Single-flight lock refresh failed for {video_id}: {e}")
+            return False
+
+    def release(self, video_id: str, leader_job_id: str):
+        """Release the lock if leader_job_id still owns it, letting followers proceed"""
+        if not self.enabled:
+            return
+        try:
+            self._release(keys=[f"{self.LOCK_PREFIX}{video_id}"], args=[leader_job_id])
+        except Exception as e:
+            logger.error(f"Single-flight release failed for {video_id}: {e}")
+
+
+# Global singleton instance
+single_flight = SingleFlight()
@@ -1,6 +1,8 @@
 """
 Multi-cloud storage service with random distribution across GCS, Azure, and AWS S3
 """
+import asyncio
+import base64
 import os
 import random
 import uuid
@@ -10,7 +12,9 @@ from typing import Tuple, Optional
 from app.config.multi_storage import multi_storage
 from app.services.storage_tracker import storage_tracker
 from app.utils.logger import logger
+from app.config.settings import settings
 from app.exceptions import (
+    AppException,
     StorageProviderNotAvailableError,
     FileUploadError,
     FileNotFoundError as StorageFileNotFoundError
@@ -73,6 +77,157 @@ class MultiStorageService:
         logger.info(f"File uploaded to {provider}: {file_name} ({file_size} bytes)")
         return url, provider, file_size
 
+    async def upload_stream(self, stream, destination_file_name: str = None) -> Tuple[str, str, int]:
+        """
+        Upload a non-seekable stream to a randomly selected provider without spooling to disk.
+
+        The stream must offer read(size) and close(); close() is called at end of
+        stream and must raise if the data was incomplete, which aborts the upload
+        before the object is committed.
+
+        Returns:
+            Tuple[url, provider, file_size]: Download URL, provider name, and file size in bytes
+        """
+        provider = await self.select_random_provider()
+        file_name = self._generate_filename(destination_file_name)
+
+        stream_uploaders = {
+            "gcs": self._stream_to_gcs,
+            "azure": self._stream_to_azure,
+            "s3": self._stream_to_s3,
+        }
+        if provider not in stream_uploaders:
+            raise FileUploadError(provider, f"Unknown provider: {provider}")
+
+        # Provider SDKs block, so the whole read/upload loop runs off the event loop
+        loop = asyncio.get_event_loop()
+        with metrics_tracker.track_upload(provider):
+            try:
+                file_size = await loop.run_in_executor(None, stream_uploaders[provider], stream, file_name)
+            except AppException:
+                raise
+            except Exception as e:
+                raise FileUploadError(provider, str(e))
+
+        url = await self.regenerate_signed_url(file_name, provider)
+        await storage_tracker.add_file_usage(provider, file_size, file_name)
+
+        logger.info(f"Stream uploaded to {provider}: {file_name} ({file_size} bytes)")
+        return url, provider, file_size
+
+    def _read_chunk(self, stream, size: int) -> bytes:
+        """Read exactly size bytes unless the stream ends first (pipes return short reads)"""
+        buffer = bytearray()
+        while len(buffer) < size:
+            data = stream.read(size - len(buffer))
+            if not data:
+                break
+            buffer.extend(data)
+        return bytes(buffer)
+
+    def _stream_to_gcs(self, stream, file_name: str) -> int:
+        """Stream to GCS through a resumable upload session"""
+        bucket = multi_storage.get_gcs_bucket()
+        if not bucket:
+            raise FileUploadError("gcs", "GCS not configured")
+
+        blob = bucket.blob(file_name)
+        # chunk_size must be a multiple of 256 KB for resumable uploads
+        writer = blob.open("wb", chunk_size=settings.STREAM_UPLOAD_CHUNK_SIZE, content_type="video/mp4", ignore_flush=True)
+        file_size = 0
+        while True:
+            chunk = self._read_chunk(stream, settings.STREAM_UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            writer.write(chunk)
+            file_size += len(chunk)
+
+        # Raises on an incomplete stream; the unfinalized session never becomes an object
+        stream.close()
+        if not file_size:
+            raise FileUploadError("gcs", "Stream produced no data")
+        writer.close()
+        return file_size
+
+    def _stream_to_azure(self, stream, file_name: str) -> int:
+        """Stream to Azure as staged blocks committed at the end"""
+        from azure.storage.blob import ContentSettings
+
+        container_client = multi_storage.get_azure_container_client()
+        if not container_client:
+            raise FileUploadError("azure", "Azure not configured")
+
+        blob_client = container_client.get_blob_client(file_name)
+        block_ids = []
+        file_size = 0
+        while True:
+            chunk = self._read_chunk(stream, settings.STREAM_UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            # Block IDs must all have the same length
+            block_id = base64.b64encode(f"{len(block_ids):08d}".encode()).decode()
+            blob_client.stage_block(block_id, chunk)
+            block_ids.append(block_id)
+            file_size += len(chunk)
+
+        # Uncommitted blocks are garbage collected by Azure if this raises
+        stream.close()
+        if not block_ids:
+            raise FileUploadError("azure", "Stream produced no data")
+        blob_client.commit_block_list(
+            block_ids,
+            content_settings=ContentSettings(content_type="video/mp4")
+        )
+        return file_size
+
+    def _stream_to_s3(self, stream, file_name: str) -> int:
+        """Stream to S3 with a multipart upload, aborted on any failure"""
+        s3_client = multi_storage.get_s3_client()
+        bucket_name = multi_storage.get_s3_bucket_name()
+        if not s3_client or not bucket_name:
+            raise FileUploadError("s3", "S3 not configured")
+
+        upload = s3_client.create_multipart_upload(
+            Bucket=bucket_name,
+            Key=file_name,
+            ContentType='video/mp4',
+            ContentDisposition=f'attachment; filename="{file_name}"'
+        )
+        upload_id = upload['UploadId']
+        parts = []
+        file_size = 0
+        try:
+            while True:
+                # Every part but the last must be at least 5 MB
+                chunk = self._read_chunk(stream, settings.STREAM_UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                part_number = len(parts) + 1
+                response = s3_client.upload_part(
+                    Bucket=bucket_name,
+                    Key=file_name,
+                    PartNumber=part_number,
+                    UploadId=upload_id,
+                    Body=chunk
+                )
+                parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+                file_size += len(chunk)
+
+            stream.close()
+            if not parts:
+                raise FileUploadError("s3", "Stream produced no data")
+
+            s3_client.complete_multipart_upload(
+                Bucket=bucket_name,
+                Key=file_name,
+                UploadId=upload_id,
+                MultipartUpload={'Parts': parts}
+            )
+            return file_size
+        except Exception:
+            s3_client.abort_multipart_upload(Bucket=bucket_name, Key=file_name, UploadId=upload_id)
+            raise
+
     def _generate_filename(self, destination_file_name: str = None) -> str:
         """Generate a unique filename"""
         if destination_file_name:
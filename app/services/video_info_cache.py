@@ -0,0 +1,108 @@
+"""
+Redis-backed video metadata cache shared by API nodes and Celery workers
+"""
+import json
+import time
+import redis
+from typing import Optional
+from app.config.settings import settings
+from app.models.download import VideoInfo
+from app.monitoring.metrics import video_info_cache_lookups_total
+from app.utils.logger import logger
+
+
+class VideoInfoCache:
+    """Cache VideoInfo by video ID with TTL, size-bounded eviction and negative entries"""
+
+    KEY_PREFIX = "video:info:"
+    NEGATIVE_KEY_PREFIX = "video:info:neg:"
+    # Sorted set of cached video IDs scored by insert time, used for eviction
+    INDEX_KEY = "video:info:index"
+
+    def __init__(self):
+        try:
+            self.redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        except Exception as e:
+            logger.error(f"Failed to initialize video info cache: {e}")
+            self.redis_client = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.VIDEO_INFO_CACHE_ENABLED and self.redis_client is not None
+
+    def get(self, video_id: str) -> Optional[VideoInfo]:
+        """Return cached VideoInfo or None on miss"""
+        if not self.enabled:
+            return None
+        try:
+            raw = self.redis_client.get(f"{self.KEY_PREFIX}{video_id}")
+        except Exception as e:
+            logger.warning(f"Video info cache read failed for {video_id}: {e}")
+            return None
+
+        if raw is None:
+            video_info_cache_lookups_total.labels(result='miss').inc()
+            return None
+
+        video_info_cache_lookups_total.labels(result='hit').inc()
+        return VideoInfo(**json.loads(raw))
+
+    def get_negative(self, video_id: str) -> Optional[str]:
+        """Return the cached unavailability reason if the video recently failed as unavailable"""
+        if not self.enabled:
+            return None
+        try:
+            reason = self.redis_client.get(f"{self.NEGATIVE_KEY_PREFIX}{video_id}")
+        except Exception as e:
+            logger.warning(f"Video info cache read failed for {video_id}: {e}")
+            return None
+
+        if reason is not None:
+            video_info_cache_lookups_total.labels(result='negative_hit').inc()
+        return reason
+
+    def set(self, video_info: VideoInfo):
+        """Cache VideoInfo and evict the oldest entries beyond VIDEO_INFO_CACHE_MAX_ENTRIES"""
+        if not self.enabled:
+            return
+        try:
+            pipe = self.redis_client.pipeline()
+            pipe.setex(
+                f"{self.KEY_PREFIX}{video_info.id}",
+                settings.VIDEO_INFO_CACHE_TTL,
+                video_info.model_dump_json()
+            )
+            pipe.delete(f"{self.NEGATIVE_KEY_PREFIX}{video_info.id}")
+            pipe.zadd(self.INDEX_KEY, {video_info.id: time.time()})
+            pipe.zcard(self.INDEX_KEY)
+            size = pipe.execute()[-1]
+
+            overflow = size - settings.VIDEO_INFO_CACHE_MAX_ENTRIES
+            if overflow > 0:
+                self._evict(overflow)
+        except Exception as e:
+            logger.warning(f"Video info cache write failed for {video_info.id}: {e}")
+
+    def set_negative(self, video_id: str, reason: str):
+        """Remember that a video is unavailable for VIDEO_INFO_CACHE_NEGATIVE_TTL seconds"""
+        if not self.enabled:
+            return
+        try:
+            self.redis_client.setex(
+                f"{self.NEGATIVE_KEY_PREFIX}{video_id}",
+                settings.VIDEO_INFO_CACHE_NEGATIVE_TTL,
+                reason or "unavailable"
+            )
+        except Exception as e:
+            logger.warning(f"Video info cache write failed for {video_id}: {e}")
+
+    def _evict(self, count: int):
+        """Drop the oldest entries; TTL-expired IDs still in the index are pruned the same way"""
+        evicted = self.redis_client.zpopmin(self.INDEX_KEY, count)
+        if evicted:
+            self.redis_client.delete(*[f"{self.KEY_PREFIX}{video_id}" for video_id, _ in evicted])
+            logger.debug(f"Evicted {len(evicted)} entries from video info cache")
+
+
+# Global singleton instance
+video_info_cache = VideoInfoCache()
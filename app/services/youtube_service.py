@@ -1,23 +1,124 @@
 import os
 import subprocess
 import json
-import tempfile
 import uuid
 import re
 import asyncio
+import signal
+import time
+from collections import deque
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 from app.utils.logger import logger
+from app.utils.process_usage import ProcessUsage, run_with_usage, run_with_usage_async, wait_with_usage
 from app.models.download import VideoInfo
 from app.config.settings import settings
 from app.exceptions import (
     InvalidVideoURLError,
     VideoNotFoundError,
     VideoDownloadError,
-    CookieUnavailableError
+    CookieUnavailableError,
+    RateLimitError,
+    WorkerOverloadedError,
+    JobCancelledError
 )
 from app.monitoring.metrics import metrics_tracker
+from app.services.account_pool import Account, account_pool
+from app.services.cookie_jar_cache import cookie_jar_cache
 from app.services.cookie_refresh_service import cookie_refresh_service
+from app.services.download_progress import PROGRESS_TEMPLATE, ProgressReporter, parse_progress_line
+from app.services.fragment_tuner import fragment_tuner
+from app.services.job_cancellation import job_cancellation
+from app.services.job_context import JobContext
+from app.services.proxy_pool import ProxyProbe, proxy_pool
+from app.services.partial_downloads import partial_downloads
+from app.services.process_limiter import ProcessSlot, process_limiter
+from app.services.rate_governor import rate_governor
+from app.services.process_watchdog import ProcessWatchdog, record_watchdog_kill
+from app.services.video_info_cache import video_info_cache
+from app.services.ytdlp_cache import ytdlp_cache
+from app.services.ytdlp_engine import ytdlp_engine, EngineCancelled, EngineStalled, YtDlpEngineError, YtDlpEngineUnavailable
+
+# Limit resolution to 720p to prevent FFmpeg from crashing 1GB RAM
+DOWNLOAD_FORMAT = 'bestvideo[height<=720][ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best'
+
+class VideoStream:
+    """Fragmented MP4 written by ffmpeg to a pipe, consumed by streaming uploads"""
+
+    def __init__(self, process: subprocess.Popen, video_id: str, expected_size: Optional[int] = None, progress_callback=None, watchdog: Optional[ProcessWatchdog] = None, slot: Optional[ProcessSlot] = None, on_usage=None, job_id: Optional[str] = None):
+        self.process = process
+        self.video_id = video_id
+        self.job_id = job_id
+        self.watchdog = watchdog
+        self.slot = slot
+        self.on_usage = on_usage
+        self.started_at = time.monotonic()
+        self.expected_size = expected_size
+        self.progress_callback = progress_callback
+        self.bytes_read = 0
+        self._last_progress = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self.process.stdout.read(size)
+        self.bytes_read += len(chunk)
+        if chunk and self.watchdog:
+            self.watchdog.touch()
+        if self.expected_size and self.progress_callback:
+            percentage = min(100.0, self.bytes_read * 100 / self.expected_size)
+            scaled = int(20 + (percentage * 0.7))
+            if scaled > self._last_progress:
+                self.progress_callback(scaled, {'downloadedBytes': self.bytes_read, 'totalBytes': self.expected_size})
+                self._last_progress = scaled
+        return chunk
+
+    def close(self):
+        """Wait for ffmpeg to finish and raise if the stream is incomplete"""
+        try:
+            usage = wait_with_usage(self.process, self.started_at, timeout=30)
+        except subprocess.TimeoutExpired:
+            self.abort()
+            raise VideoDownloadError(self.video_id, "ffmpeg did not exit after end of stream.")
+        finally:
+            if self.watchdog:
+                self.watchdog.stop()
+        if usage and self.on_usage:
+            self.on_usage(usage)
+        returncode = self.process.returncode
+        if self.slot:
+            self.slot.record_exit(returncode, killed=bool(self.watchdog and self.watchdog.fired))
+        if self.watchdog and self.watchdog.fired:
+            self._release_slot()
+            if self.watchdog.was_cancelled:
+                # Raising here aborts the upload before the object is committed
+                raise JobCancelledError(self.job_id)
+            raise VideoDownloadError(self.video_id, f"Stream {self.watchdog.reason}.")
+        if returncode != 0:
+            stderr = self.process.stderr.read().decode('utf-8', errors='replace') if self.process.stderr else ''
+            error = VideoDownloadError(self.video_id, f"ffmpeg: {stderr.strip().splitlines()[-1] if stderr.strip() else 'stream failed'}")
+            self._release_slot(error)
+            raise error
+        self._release_slot()
+
+    def abort(self):
+        if self.watchdog:
+            self.watchdog.stop()
+        if self.process.poll() is None:
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+            self.process.wait()
+        self._release_slot(VideoDownloadError(self.video_id, "Stream aborted."))
+
+    def _release_slot(self, error: Optional[BaseException] = None):
+        """Hand the ffmpeg process slot back once, counting watchdog kills as timeouts"""
+        if self.slot is None:
+            return
+        if self.watchdog and self.watchdog.fired and not self.watchdog.was_cancelled:
+            self.slot.timed_out = True
+        process_limiter.release(self.slot, error)
+        self.slot = None
+
 
 class YouTubeService:
     def __init__(self):
@@ -26,9 +127,7 @@ class YouTubeService:
         self.yt_dlp_path = settings.YT_DLP_PATH or os.getenv('YT_DLP_PATH', 'yt-dlp')
         self.ffmpeg_path = settings.FFMPEG_PATH or os.getenv('FFMPEG_PATH', 'ffmpeg')
         self.ffprobe_path = settings.FFPROBE_PATH or os.getenv('FFPROBE_PATH', 'ffprobe')
-        self.cookies_file = settings.YT_DLP_COOKIES_FILE
         self.account_id = settings.YT_ACCOUNT_ID
-        self.proxy = os.getenv('YT_DLP_PROXY')
 
     def _extract_video_id(self, url: str) -> str:
         patterns = [
@@ -41,17 +140,39 @@ class YouTubeService:
             if match: return match.group(1)
         raise InvalidVideoURLError(url)
 
-    def _create_temp_cookies_file(self, cookies: Dict[str, str]) -> Optional[str]:
-        try:
-            fd, temp_path = tempfile.mkstemp(suffix='.txt', prefix='yt_cookies_')
-            with os.fdopen(fd, 'w') as f:
-                f.write("# Netscape HTTP Cookie File\n")
-                for name, value in cookies.items():
-                    f.write(f".youtube.com\tTRUE\t/\tTRUE\t0\t{name}\t{value}\n")
-            return temp_path
-        except Exception as e:
-            logger.error(f"Error creating temp cookies: {e}")
-            return None
+    def _proxy_for(self, context: Optional[JobContext]) -> Optional[str]:
+        """The job's proxy, or the best-scoring proxy for a call made outside a job"""
+        if context is not None:
+            return context.proxy
+        return proxy_pool.best()
+
+    def _download_timeout(self, context: Optional[JobContext]) -> float:
+        """Deadline for a download or stream; inside a job it must fire before Celery's soft limit"""
+        if context is not None:
+            return context.download_timeout()
+        return settings.YTDLP_DOWNLOAD_TIMEOUT
+
+    def _record_usage(self, context: Optional[JobContext], operation: str, usage: Optional[ProcessUsage]):
+        """Export a finished child's resource usage and add it to the job's totals"""
+        if usage is None:
+            return
+        metrics_tracker.record_process_usage(operation, usage)
+        if context is not None:
+            context.add_usage(operation, usage)
+
+    def _acquire_cookies_file(self, cookies: Optional[Dict[str, str]], account: Optional[Account] = None) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Pick the cookie file for a yt-dlp run: the pooled account's file if one
+        was assigned, otherwise the shared jar for the frontend cookies.
+
+        Returns (cookies_file, jar); pass jar to cookie_jar_cache.release() when done.
+        """
+        if account is not None:
+            return account.cookies_file, None
+        if cookies:
+            jar = cookie_jar_cache.acquire(cookies)
+            return jar, jar
+        return None, None
 
     def _handle_cookie_error(self, error_message: str, video_id: str):
         """Enhanced error handler to bubble up specific cookie issues"""
@@ -61,117 +182,341 @@ class YouTubeService:
             return
 
         if cookie_refresh_service.is_cookie_refresh_needed(error_message):
-            logger.warning(f"🔄 Cookie refresh required for {self.account_id}: {error_message[:150]}")
-            cookie_refresh_service.trigger_cookie_refresh(reason="bot_detection")
-            # This specific message will now be returned to the frontend
+            logger.warning(f"🔄 Cookie refresh required: {error_message[:150]}")
+            # _with_accounts cools the account down and retries on the next one;
+            # this message reaches the frontend only when none are left
             raise CookieUnavailableError(self.account_id, reason=f"YouTube blocked session: {error_message[:50]}")
 
-    async def get_video_info(self, url: str, cookies: Optional[Dict[str, str]] = None) -> VideoInfo:
-        """Optimized for 1GB RAM and multi-server cookie stability"""
-        with metrics_tracker.track_youtube_api('get_video_info'):
-            video_id = self._extract_video_id(url)
-            temp_cookies_file = None
+    def _rotate_account(self, account: Optional[Account], tried: List[str], error: CookieUnavailableError) -> Account:
+        """Cool down the blocked account and return the next one to try, or raise"""
+        reason = error.details.get("reason")
+        if account is None:
+            # Frontend cookies (or none) were blocked - nothing to rotate to
+            cookie_refresh_service.trigger_cookie_refresh(reason="bot_detection", server_id=self.account_id)
+            raise error
 
+        account_pool.report_blocked(account)
+        tried.append(account.id)
+        next_account = None
+        if len(tried) < settings.YT_ACCOUNT_MAX_ATTEMPTS:
+            next_account = account_pool.acquire(exclude=tried)
+        if next_account is None:
+            raise CookieUnavailableError(account.id, reason=reason)
+
+        logger.info(f"Account {account.id} blocked, retrying on {next_account.id}")
+        return next_account
+
+    def _with_accounts(self, operation):
+        """Run operation(account) on pooled accounts, moving on when one hits bot detection"""
+        tried: List[str] = []
+        account = account_pool.acquire()
+        while True:
             try:
-                # 'nice' gives the OS/Redis priority over yt-dlp
-                cmd = ['nice', '-n', '10', self.yt_dlp_path, '--dump-json', '--no-playlist', '--flat-playlist']
-                cmd.extend(["--js-runtimes", "node", "--remote-components", "ejs:github"])
-
-                if self.ffmpeg_path != 'ffmpeg':
-                    cmd.extend(['--ffmpeg-location', os.path.dirname(self.ffmpeg_path)])
-
-                # Determine which cookie file to use
-                use_cookies_file = None
-                if self.cookies_file and os.path.exists(self.cookies_file):
-                    use_cookies_file = self.cookies_file
-                elif cookies:
-                    temp_cookies_file = self._create_temp_cookies_file(cookies)
-                    use_cookies_file = temp_cookies_file
-
-                if use_cookies_file:
-                    cmd.extend(['--cookies', use_cookies_file])
-                    # Force web client when using cookies for consistency
-                    cmd.extend(['--extractor-args', 'youtube:player_client=web'])
-                else:
-                    cmd.extend(['--extractor-args', 'youtube:player_client=android,ios'])
-
-                if self.proxy:
-                    cmd.extend(['--proxy', self.proxy])
-
-                # Add the video URL to the command
-                cmd.append(url)
-
-                # Use Popen to capture everything manually to avoid hidden failures
-                process = subprocess.Popen(
-                    cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    # Limit threads to prevent 1GB RAM OOM during n-sig calculation
-                    env={**os.environ, "UV_THREADPOOL_SIZE": "1", "OPENBLAS_NUM_THREADS": "1"}
+                result = operation(account)
+            except CookieUnavailableError as e:
+                account = self._rotate_account(account, tried, e)
+                continue
+            account_pool.report_success(account)
+            return result
+
+    async def _with_accounts_async(self, operation):
+        """Async variant of _with_accounts for coroutine operations"""
+        tried: List[str] = []
+        account = account_pool.acquire()
+        while True:
+            try:
+                result = await operation(account)
+            except CookieUnavailableError as e:
+                account = self._rotate_account(account, tried, e)
+                continue
+            account_pool.report_success(account)
+            return result
+
+    def _raise_for_ytdlp_error(self, error_message: str, video_id: str):
+        """Map a yt-dlp error message (stderr or engine exception) to an application error"""
+        logger.error(f"yt-dlp error output: {error_message}")
+        # Restricted videos are checked first: their messages also ask to sign in
+        if not cookie_refresh_service.is_content_restricted(error_message):
+            self._handle_cookie_error(error_message, video_id)
+
+        if "Video unavailable" in error_message:
+            raise VideoNotFoundError(video_id, "Video is unavailable")
+        # Return the actual yt-dlp error so we can see it on frontend
+        raise VideoDownloadError(video_id, f"YT-DLP: {error_message.splitlines()[-1] if error_message else 'Unknown Error'}")
+
+    async def _run_command(self, cmd: List[str], timeout: float, env: Optional[Dict[str, str]] = None, probe: Optional[ProxyProbe] = None) -> Tuple[int, str, str, Optional[ProcessUsage]]:
+        """
+        Run a command without blocking the event loop.
+
+        Returns the exit code, stdout, stderr and the child's resource usage. The
+        child gets its own process group so a timeout or cancellation kills yt-dlp
+        together with any node/ffmpeg helpers it spawned. It only starts once the
+        host-wide process limiter grants a slot.
+        """
+        def on_start(process):
+            if probe is not None:
+                probe.start()
+
+        async with process_limiter.slot_async('yt-dlp') as slot:
+            result, usage = await run_with_usage_async(cmd, timeout, env, on_start=on_start)
+            if slot:
+                slot.record_exit(result.returncode)
+
+        return result.returncode, result.stdout, result.stderr, usage
+
+    def _kill_process_group(self, pid: int):
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def _use_engine(self) -> bool:
+        return settings.YTDLP_ENGINE == "inprocess" and ytdlp_engine.available
+
+    def _build_ydl_opts(self, cookies_file: Optional[str]) -> dict:
+        """YoutubeDL options mirroring the CLI flags used by the subprocess path"""
+        opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'noplaylist': True,
+            'js_runtimes': {'node': {}},
+            'remote_components': ['ejs:github'],
+            **ytdlp_cache.ydl_opts(),
+        }
+        if self.ffmpeg_path != 'ffmpeg':
+            opts['ffmpeg_location'] = os.path.dirname(self.ffmpeg_path)
+        if cookies_file:
+            opts['cookiefile'] = cookies_file
+            opts['extractor_args'] = {'youtube': {'player_client': ['web']}}
+        else:
+            opts['extractor_args'] = {'youtube': {'player_client': ['android', 'ios']}}
+        return opts
+
+    def _build_video_info(self, info: dict) -> VideoInfo:
+        return VideoInfo(
+            id=info['id'],
+            title=info['title'],
+            thumbnail=info['thumbnail'],
+            duration=info.get('duration', 0),
+            quality=f"{info.get('height', 'N/A')}p" if info.get('height') else None,
+            file_size=self._format_file_size(info.get('filesize')) if info.get('filesize') else None
+        )
+
+    async def _get_video_info_inprocess(self, url: str, video_id: str, cookies_file: Optional[str], proxy: Optional[str] = None, context: Optional[JobContext] = None, probe: Optional[ProxyProbe] = None) -> VideoInfo:
+        opts = self._build_ydl_opts(cookies_file)
+        opts['extract_flat'] = 'in_playlist'
+        if proxy:
+            opts['proxy'] = proxy
+
+        loop = asyncio.get_event_loop()
+        try:
+            # Engine workers count against the same host limit as yt-dlp children
+            async with process_limiter.slot_async('yt-dlp'):
+                if probe is not None:
+                    probe.start()
+                info = await loop.run_in_executor(
+                    None,
+                    lambda: ytdlp_engine.extract_info(
+                        url, opts, timeout=settings.YTDLP_INFO_TIMEOUT,
+                        on_usage=lambda usage: self._record_usage(context, 'get_video_info', usage)
+                    )
                 )
+        except TimeoutError:
+            raise VideoDownloadError(video_id, "Metadata fetch timed out. CPU or Network saturated.")
+        except YtDlpEngineError as e:
+            self._raise_for_ytdlp_error(e.message, video_id)
+        return self._build_video_info(info)
+
+    async def get_video_info(self, url: str, cookies: Optional[Dict[str, str]] = None, context: Optional[JobContext] = None) -> VideoInfo:
+        """Return video metadata, served from the shared cache when possible"""
+        video_id = self._extract_video_id(url)
+
+        cached = video_info_cache.get(video_id)
+        if cached:
+            return cached
+
+        unavailable_reason = video_info_cache.get_negative(video_id)
+        if unavailable_reason:
+            raise VideoNotFoundError(video_id, unavailable_reason)
+
+        try:
+            video_info = await self._fetch_video_info(url, video_id, cookies, context)
+        except VideoNotFoundError as e:
+            video_info_cache.set_negative(video_id, e.details.get("reason"))
+            raise
+
+        video_info_cache.set(video_info)
+        return video_info
+
+    async def _fetch_video_info(self, url: str, video_id: str, cookies: Optional[Dict[str, str]] = None, context: Optional[JobContext] = None) -> VideoInfo:
+        """Optimized for 1GB RAM and multi-server cookie stability"""
+        proxy = self._proxy_for(context)
+        with metrics_tracker.track_youtube_api('get_video_info'):
+            return await self._with_accounts_async(
+                lambda account: self._fetch_video_info_with_account(url, video_id, cookies, account, proxy, context)
+            )
+
+    async def _fetch_video_info_with_account(self, url: str, video_id: str, cookies: Optional[Dict[str, str]], account: Optional[Account], proxy: Optional[str] = None, context: Optional[JobContext] = None) -> VideoInfo:
+        cookie_jar = None
+
+        try:
+            # 'nice' gives the OS/Redis priority over yt-dlp
+            cmd = ['nice', '-n', '10', self.yt_dlp_path, '--dump-json', '--no-playlist', '--flat-playlist']
+            cmd.extend(["--js-runtimes", "node", "--remote-components", "ejs:github"])
+            cmd.extend(ytdlp_cache.cli_args())
+
+            if self.ffmpeg_path != 'ffmpeg':
+                cmd.extend(['--ffmpeg-location', os.path.dirname(self.ffmpeg_path)])
+
+            # Determine which cookie file to use
+            use_cookies_file, cookie_jar = self._acquire_cookies_file(cookies, account)
+
+            if use_cookies_file:
+                cmd.extend(['--cookies', use_cookies_file])
+                # Force web client when using cookies for consistency
+                cmd.extend(['--extractor-args', 'youtube:player_client=web'])
+            else:
+                cmd.extend(['--extractor-args', 'youtube:player_client=android,ios'])
+
+            if proxy:
+                cmd.extend(['--proxy', proxy])
+
+            # Add the video URL to the command
+            cmd.append(url)
+
+            await rate_governor.acquire_async(
+                account.id if account else None, rate_governor.egress_id(proxy), 'get_video_info'
+            )
+
+            with proxy_pool.measure(proxy) as probe, ytdlp_cache.track('get_video_info'):
+                if self._use_engine():
+                    try:
+                        return await self._get_video_info_inprocess(url, video_id, use_cookies_file, proxy, context, probe)
+                    except YtDlpEngineUnavailable as e:
+                        logger.warning(f"yt-dlp engine unavailable, falling back to subprocess: {e}")
 
                 try:
-                    stdout, stderr = process.communicate(timeout=settings.YTDLP_INFO_TIMEOUT)
-                except subprocess.TimeoutExpired:
-                    process.kill()
-                    stdout, stderr = process.communicate()
+                    returncode, stdout, stderr, usage = await self._run_command(
+                        cmd,
+                        timeout=settings.YTDLP_INFO_TIMEOUT,
+                        # Limit threads to prevent 1GB RAM OOM during n-sig calculation
+                        env={**os.environ, "UV_THREADPOOL_SIZE": "1", "OPENBLAS_NUM_THREADS": "1"},
+                        probe=probe
+                    )
+                except asyncio.TimeoutError:
                     raise VideoDownloadError(video_id, "Metadata fetch timed out. CPU or Network saturated.")
+                self._record_usage(context, 'get_video_info', usage)
 
-                if process.returncode != 0:
-                    logger.error(f"yt-dlp error output: {stderr}")
-                    self._handle_cookie_error(stderr, video_id)
-                    
-                    if "Video unavailable" in stderr:
-                        raise VideoNotFoundError(video_id, "Video is unavailable")
-                    # Return the actual yt-dlp error so we can see it on frontend
-                    raise VideoDownloadError(video_id, f"YT-DLP: {stderr.splitlines()[-1] if stderr else 'Unknown Error'}")
-
-                info = json.loads(stdout)
-                return VideoInfo(
-                    id=info['id'],
-                    title=info['title'],
-                    thumbnail=info['thumbnail'],
-                    duration=info.get('duration', 0),
-                    quality=f"{info.get('height', 'N/A')}p" if info.get('height') else None,
-                    file_size=self._format_file_size(info.get('filesize')) if info.get('filesize') else None
-                )
+                if returncode != 0:
+                    self._raise_for_ytdlp_error(stderr, video_id)
 
-            except Exception as e:
-                logger.error(f"Error in get_video_info: {str(e)}")
-                raise
-            finally:
-                if temp_cookies_file and os.path.exists(temp_cookies_file):
-                    os.remove(temp_cookies_file)
+            return self._build_video_info(json.loads(stdout))
+
+        except Exception as e:
+            logger.error(f"Error in get_video_info: {str(e)}")
+            raise
+        finally:
+            cookie_jar_cache.release(cookie_jar)
 
-    def download_video_sync(self, url: str, video_id: str, progress_callback=None, cookies: Optional[Dict[str, str]] = None) -> str:
+    def download_video_sync(self, url: str, video_id: str, progress_callback=None, cookies: Optional[Dict[str, str]] = None, context: Optional[JobContext] = None) -> str:
         """Prioritized download to prevent Redis heartbeats from timing out"""
         with metrics_tracker.track_youtube_api('download_video'):
-            temp_cookies_file = None
+            _, file_path = self._download(url, video_id, progress_callback, cookies, with_info=False, context=context)
+            return file_path
+
+    def download_with_info_sync(self, url: str, video_id: str, progress_callback=None, cookies: Optional[Dict[str, str]] = None, context: Optional[JobContext] = None) -> Tuple[VideoInfo, str]:
+        """
+        Single-pass extraction and download.
+
+        One yt-dlp run emits the info JSON and downloads the file, so the webpage,
+        player JS and n-sig work is done once per job instead of twice.
+        """
+        unavailable_reason = video_info_cache.get_negative(video_id)
+        if unavailable_reason:
+            raise VideoNotFoundError(video_id, unavailable_reason)
+
+        with metrics_tracker.track_youtube_api('download_with_info'):
             try:
-                file_name = f"{video_id}_{uuid.uuid4().hex[:8]}.mp4"
+                video_info, file_path = self._download(url, video_id, progress_callback, cookies, with_info=True, context=context)
+            except VideoNotFoundError as e:
+                video_info_cache.set_negative(video_id, e.details.get("reason"))
+                raise
+
+        video_info_cache.set(video_info)
+        return video_info, file_path
+
+    def _download(self, url: str, video_id: str, progress_callback, cookies: Optional[Dict[str, str]], with_info: bool, context: Optional[JobContext] = None) -> Tuple[Optional[VideoInfo], str]:
+        lease = fragment_tuner.acquire()
+        proxy = self._proxy_for(context)
+        file_path = None
+        try:
+            with proxy_pool.measure(proxy) as probe, ytdlp_cache.track('download'):
+                result = self._with_accounts(
+                    # Throughput is timed per attempt from its first progress event
+                    lambda account: self._run_download(url, video_id, lease.watch(progress_callback), cookies, with_info, lease.concurrency, account, proxy, context, probe)
+                )
+                file_path = result[1]
+                probe.bytes_transferred = os.path.getsize(file_path)
+            return result
+        finally:
+            downloaded = os.path.getsize(file_path) if file_path and os.path.exists(file_path) else 0
+            fragment_tuner.release(lease, downloaded)
+
+    def _run_download(self, url: str, video_id: str, progress_callback, cookies: Optional[Dict[str, str]], with_info: bool, fragments: int, account: Optional[Account] = None, proxy: Optional[str] = None, context: Optional[JobContext] = None, probe: Optional[ProxyProbe] = None) -> Tuple[Optional[VideoInfo], str]:
+        cookie_jar = None
+        job_id = context.job_id if context is not None else None
+        try:
+            file_name = f"{video_id}_{uuid.uuid4().hex[:8]}.mp4"
+            partial_dir = None
+            if context is not None and context.job_id:
+                # Same path on every attempt of the job, so yt-dlp resumes its .part files
+                partial_dir = partial_downloads.claim(context.job_id, video_id)
+                output_path = partial_dir / f"{video_id}.mp4"
+            else:
                 output_path = self.download_dir / file_name
 
-                # Limit resolution to 720p to prevent FFmpeg from crashing 1GB RAM
-                cmd = ['nice', '-n', '15', self.yt_dlp_path]
-                cmd.extend([
-                    '--js-runtimes', 'node',
-                    '-f', 'bestvideo[height<=720][ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
-                    '--merge-output-format', 'mp4',
-                    '--newline', '--no-part',
-                    '-o', str(output_path),
-                    url
-                ])
-
-                # Cookie Handling (Mirroring get_video_info)
-                if self.cookies_file and os.path.exists(self.cookies_file):
-                    cmd.extend(['--cookies', self.cookies_file, '--extractor-args', 'youtube:player_client=web'])
-                elif cookies:
-                    temp_cookies_file = self._create_temp_cookies_file(cookies)
-                    cmd.extend(['--cookies', temp_cookies_file, '--extractor-args', 'youtube:player_client=web'])
-                else:
-                    cmd.extend(['--extractor-args', 'youtube:player_client=android,ios'])
+            # Cookie Handling (Mirroring get_video_info)
+            use_cookies_file, cookie_jar = self._acquire_cookies_file(cookies, account)
+
+            rate_governor.acquire(account.id if account else None, rate_governor.egress_id(proxy), 'download')
+
+            if self._use_engine():
+                try:
+                    video_info, file_path = self._download_inprocess(url, video_id, output_path, use_cookies_file, progress_callback, with_info, fragments, proxy, resumable=partial_dir is not None, context=context, probe=probe)
+                    return video_info, self._finish_partial(context, file_path, file_name)
+                except YtDlpEngineUnavailable as e:
+                    logger.warning(f"yt-dlp engine unavailable, falling back to subprocess: {e}")
+
+            cmd = ['nice', '-n', '15', self.yt_dlp_path]
+            cmd.extend([
+                '--js-runtimes', 'node',
+                '-f', DOWNLOAD_FORMAT,
+                '--merge-output-format', 'mp4',
+                '--newline',
+                '--progress-template', PROGRESS_TEMPLATE,
+                '--concurrent-fragments', str(fragments),
+                *ytdlp_cache.cli_args(),
+                '-o', str(output_path),
+                url
+            ])
+            if with_info:
+                # -j is quiet by default; --progress keeps the progress lines coming
+                cmd.extend(['--dump-json', '--no-simulate', '--progress'])
+            if partial_dir is None:
+                # Nothing would resume a one-off download, so skip the .part files
+                cmd.append('--no-part')
 
+            if use_cookies_file:
+                cmd.extend(['--cookies', use_cookies_file, '--extractor-args', 'youtube:player_client=web'])
+            else:
+                cmd.extend(['--extractor-args', 'youtube:player_client=android,ios'])
+            if proxy:
+                cmd.extend(['--proxy', proxy])
+
+            with process_limiter.slot('yt-dlp') as slot:
+                if probe is not None:
+                    probe.start()
+                started_at = time.monotonic()
                 process = subprocess.Popen(
                     cmd,
                     stdout=subprocess.PIPE,
@@ -179,36 +524,307 @@ class YouTubeService:
                     text=True,
                     bufsize=1,
                     universal_newlines=True,
-                    env={**os.environ, "FFMPEG_THREADS": "1"} # Prevent FFmpeg CPU spike
+                    env={**os.environ, "FFMPEG_THREADS": "1"}, # Prevent FFmpeg CPU spike
+                    start_new_session=True  # Lets the watchdog kill yt-dlp together with its ffmpeg
                 )
+                watchdog = ProcessWatchdog(
+                    process,
+                    total_timeout=self._download_timeout(context),
+                    stall_timeout=settings.YTDLP_STALL_TIMEOUT,
+                    cancelled=job_cancellation.checker(job_id)
+                ).start()
+
+                info = None
+                # Keep the tail of non-progress output to explain failures
+                output_tail = deque(maxlen=20)
+                reporter = ProgressReporter(progress_callback)
+                try:
+                    if process.stdout:
+                        for line in process.stdout:
+                            # Any output (progress, merger, info JSON) counts as activity
+                            watchdog.touch()
+                            event = parse_progress_line(line)
+                            if event is not None:
+                                reporter.report(event)
+                                continue
+                            if with_info and info is None and line.startswith('{'):
+                                info = json.loads(line)
+                                continue
+                            output_tail.append(line.rstrip())
+                    usage = wait_with_usage(process, started_at)
+                except BaseException:
+                    # Progress callback failures and worker shutdown must not leave yt-dlp running
+                    self._kill_process_group(process.pid)
+                    process.wait()
+                    raise
+                finally:
+                    watchdog.stop()
+                if slot:
+                    slot.timed_out = watchdog.fired and not watchdog.was_cancelled
+                    # Checked here, not after the block, so failures and OOM kills never grow the limit
+                    slot.record_exit(process.returncode, killed=watchdog.fired)
+            self._record_usage(context, 'download', usage)
+
+            if watchdog.was_cancelled:
+                raise JobCancelledError(job_id)
+            if watchdog.fired:
+                output_path.unlink(missing_ok=True)
+                raise VideoDownloadError(video_id, f"Download {watchdog.reason}.")
+            if process.returncode != 0:
+                self._raise_for_ytdlp_error("\n".join(output_tail), video_id)
+
+            if not output_path.exists():
+                raise VideoDownloadError(video_id, "Downloaded file not found.")
+
+            if with_info and info is None:
+                raise VideoDownloadError(video_id, "yt-dlp did not emit video info.")
+
+            return (self._build_video_info(info) if info else None), self._finish_partial(context, str(output_path), file_name)
+
+        except Exception as e:
+            logger.error(f"Download Error: {e}")
+            raise
+        finally:
+            cookie_jar_cache.release(cookie_jar)
+
+    def _finish_partial(self, context: Optional[JobContext], file_path: str, file_name: str) -> str:
+        """Move a finished resumable download out of the job's partial directory"""
+        if context is None or not context.job_id:
+            return file_path
+        final_path = self.download_dir / file_name
+        os.replace(file_path, final_path)
+        partial_downloads.complete(context.job_id)
+        return str(final_path)
+
+    def _download_inprocess(self, url: str, video_id: str, output_path: Path, cookies_file: Optional[str], progress_callback=None, with_info: bool = False, fragments: int = 1, proxy: Optional[str] = None, resumable: bool = False, context: Optional[JobContext] = None, probe: Optional[ProxyProbe] = None) -> Tuple[Optional[VideoInfo], str]:
+        opts = self._build_ydl_opts(cookies_file)
+        opts.update({
+            'format': DOWNLOAD_FORMAT,
+            'merge_output_format': 'mp4',
+            'nopart': not resumable,
+            'concurrent_fragment_downloads': fragments,
+            'outtmpl': str(output_path),
+        })
+        if proxy:
+            opts['proxy'] = proxy
+
+        reporter = ProgressReporter(progress_callback)
+        job_id = context.job_id if context is not None else None
+        timeout = None
+
+        try:
+            with process_limiter.slot('yt-dlp') as slot:
+                if probe is not None:
+                    probe.start()
+                # Measured after the slot wait, which also counts against the task's limit
+                timeout = self._download_timeout(context)
+                try:
+                    info = ytdlp_engine.download(
+                        url, opts, reporter.report,
+                        timeout=timeout,
+                        stall_timeout=settings.YTDLP_STALL_TIMEOUT,
+                        cancelled=job_cancellation.checker(job_id),
+                        on_usage=lambda usage: self._record_usage(context, 'download', usage)
+                    )
+                except EngineStalled:
+                    # Same treatment as a watchdog stall kill on the subprocess path
+                    if slot:
+                        slot.timed_out = True
+                    raise
+        except EngineCancelled:
+            record_watchdog_kill("yt-dlp-engine", "cancelled")
+            raise JobCancelledError(job_id)
+        except TimeoutError:
+            record_watchdog_kill("yt-dlp-engine", "timeout")
+            output_path.unlink(missing_ok=True)
+            raise VideoDownloadError(video_id, f"Download timed out after {int(timeout or 0)}s.")
+        except EngineStalled:
+            record_watchdog_kill("yt-dlp-engine", "stall")
+            output_path.unlink(missing_ok=True)
+            raise VideoDownloadError(video_id, f"Download stalled with no progress for {settings.YTDLP_STALL_TIMEOUT}s.")
+        except YtDlpEngineError as e:
+            self._raise_for_ytdlp_error(e.message, video_id)
+
+        if not output_path.exists():
+            raise VideoDownloadError(video_id, "Downloaded file not found.")
+
+        return (self._build_video_info(info) if with_info else None), str(output_path)
+
+    def can_stream(self, proxy: Optional[str]) -> bool:
+        """
+        Whether ffmpeg can fetch the media through proxy. Media URLs are bound
+        to the IP that resolved them and ffmpeg only speaks plain HTTP proxies,
+        so jobs on a SOCKS proxy must download through yt-dlp instead.
+        """
+        return proxy is None or proxy.lower().startswith('http://')
 
-                last_progress = 0
-                if process.stdout:
-                    for line in process.stdout:
-                        if '[download]' in line and '%' in line:
-                            match = re.search(r'(\d+\.?\d*)%', line)
-                            if match:
-                                percentage = float(match.group(1))
-                                scaled = int(20 + (percentage * 0.6))
-                                if scaled > last_progress and progress_callback:
-                                    progress_callback(scaled)
-                                    last_progress = scaled
-
-                process.wait()
-                if process.returncode != 0:
-                    raise VideoDownloadError(video_id, "Download failed after starting.")
-
-                if not output_path.exists():
-                    raise VideoDownloadError(video_id, "Downloaded file not found.")
-
-                return str(output_path)
-
-            except Exception as e:
-                logger.error(f"Download Error: {e}")
+    def open_video_stream(self, url: str, video_id: str, progress_callback=None, cookies: Optional[Dict[str, str]] = None, context: Optional[JobContext] = None) -> Tuple[VideoInfo, VideoStream]:
+        """
+        Resolve the selected formats once, then let ffmpeg mux them into a
+        fragmented MP4 on stdout. Nothing is written to local disk.
+        """
+        proxy = self._proxy_for(context)
+        if not self.can_stream(proxy):
+            # Without the proxy ffmpeg would fetch from this host's IP and be rejected
+            raise VideoDownloadError(video_id, "Streaming is not supported through this proxy.")
+        with metrics_tracker.track_youtube_api('open_video_stream'):
+            info = self._extract_stream_info(url, video_id, cookies, proxy, context)
+            video_info = self._build_video_info(info)
+            video_info_cache.set(video_info)
+
+            formats = info.get('requested_formats') or [info]
+            cmd = ['nice', '-n', '15', self.ffmpeg_path, '-hide_banner', '-loglevel', 'error']
+            for fmt in formats:
+                headers = fmt.get('http_headers') or {}
+                if headers:
+                    cmd.extend(['-headers', ''.join(f"{key}: {value}\r\n" for key, value in headers.items())])
+                if proxy:
+                    # Media URLs are bound to the IP that resolved them
+                    cmd.extend(['-http_proxy', proxy])
+                cmd.extend(['-i', fmt['url']])
+            for index in range(len(formats)):
+                cmd.extend(['-map', str(index)])
+            # Fragmented MP4 needs no seekable output, so it can go straight to a pipe
+            cmd.extend([
+                '-c', 'copy',
+                '-movflags', 'frag_keyframe+empty_moov+default_base_moof',
+                '-f', 'mp4', 'pipe:1'
+            ])
+
+            slot = process_limiter.acquire('ffmpeg')
+            try:
+                process = subprocess.Popen(
+                    cmd,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    env={**os.environ, "FFMPEG_THREADS": "1"},
+                    start_new_session=True
+                )
+            except BaseException as e:
+                process_limiter.release(slot, e)
                 raise
-            finally:
-                if temp_cookies_file and os.path.exists(temp_cookies_file):
-                    os.remove(temp_cookies_file)
+            watchdog = ProcessWatchdog(
+                process,
+                total_timeout=self._download_timeout(context),
+                stall_timeout=settings.YTDLP_STALL_TIMEOUT,
+                name="ffmpeg",
+                cancelled=job_cancellation.checker(context.job_id if context is not None else None)
+            ).start()
+            expected_size = sum((fmt.get('filesize') or fmt.get('filesize_approx') or 0) for fmt in formats) or None
+            return video_info, VideoStream(
+                process, video_id, expected_size, progress_callback, watchdog, slot,
+                on_usage=lambda usage: self._record_usage(context, 'stream', usage),
+                job_id=context.job_id if context is not None else None
+            )
+
+    def _extract_stream_info(self, url: str, video_id: str, cookies: Optional[Dict[str, str]], proxy: Optional[str] = None, context: Optional[JobContext] = None) -> dict:
+        """Info dict with resolved media URLs for DOWNLOAD_FORMAT"""
+        with proxy_pool.measure(proxy) as probe, ytdlp_cache.track('open_video_stream'):
+            return self._with_accounts(
+                lambda account: self._run_extract_stream_info(url, video_id, cookies, account, proxy, context, probe)
+            )
+
+    def _run_extract_stream_info(self, url: str, video_id: str, cookies: Optional[Dict[str, str]], account: Optional[Account] = None, proxy: Optional[str] = None, context: Optional[JobContext] = None, probe: Optional[ProxyProbe] = None) -> dict:
+        cookie_jar = None
+        try:
+            use_cookies_file, cookie_jar = self._acquire_cookies_file(cookies, account)
+
+            rate_governor.acquire(account.id if account else None, rate_governor.egress_id(proxy), 'open_video_stream')
+
+            if self._use_engine():
+                opts = self._build_ydl_opts(use_cookies_file)
+                opts['format'] = DOWNLOAD_FORMAT
+                if proxy:
+                    opts['proxy'] = proxy
+                try:
+                    with process_limiter.slot('yt-dlp'):
+                        if probe is not None:
+                            probe.start()
+                        return ytdlp_engine.extract_info(
+                            url, opts, timeout=settings.YTDLP_INFO_TIMEOUT,
+                            on_usage=lambda usage: self._record_usage(context, 'open_video_stream', usage)
+                        )
+                except YtDlpEngineUnavailable as e:
+                    logger.warning(f"yt-dlp engine unavailable, falling back to subprocess: {e}")
+                except TimeoutError:
+                    raise VideoDownloadError(video_id, "Metadata fetch timed out. CPU or Network saturated.")
+                except YtDlpEngineError as e:
+                    self._raise_for_ytdlp_error(e.message, video_id)
+
+            cmd = ['nice', '-n', '10', self.yt_dlp_path, '--dump-json', '--no-playlist', '-f', DOWNLOAD_FORMAT]
+            cmd.extend(["--js-runtimes", "node", "--remote-components", "ejs:github"])
+            cmd.extend(ytdlp_cache.cli_args())
+            if use_cookies_file:
+                cmd.extend(['--cookies', use_cookies_file, '--extractor-args', 'youtube:player_client=web'])
+            else:
+                cmd.extend(['--extractor-args', 'youtube:player_client=android,ios'])
+            if proxy:
+                cmd.extend(['--proxy', proxy])
+            cmd.append(url)
+
+            try:
+                with process_limiter.slot('yt-dlp') as slot:
+                    result, usage = run_with_usage(
+                        cmd,
+                        timeout=settings.YTDLP_INFO_TIMEOUT,
+                        env={**os.environ, "UV_THREADPOOL_SIZE": "1", "OPENBLAS_NUM_THREADS": "1"},
+                        on_start=(lambda process: probe.start()) if probe is not None else None
+                    )
+                    if slot:
+                        slot.record_exit(result.returncode)
+            except subprocess.TimeoutExpired:
+                raise VideoDownloadError(video_id, "Metadata fetch timed out. CPU or Network saturated.")
+            self._record_usage(context, 'open_video_stream', usage)
+
+            if result.returncode != 0:
+                self._raise_for_ytdlp_error(result.stderr, video_id)
+            return json.loads(result.stdout)
+        finally:
+            cookie_jar_cache.release(cookie_jar)
+
+    def warm_cache(self):
+        """
+        Resolve one known video so player JS and n-sig solutions land in the
+        shared cache before the first job needs them
+        """
+        if not ytdlp_cache.enabled:
+            return
+        ytdlp_cache.prune()
+        if not settings.YTDLP_CACHE_WARM_URL:
+            return
+
+        cmd = ['nice', '-n', '15', self.yt_dlp_path, '--simulate', '--quiet', '--no-playlist', '-f', DOWNLOAD_FORMAT]
+        cmd.extend(["--js-runtimes", "node", "--remote-components", "ejs:github"])
+        cmd.extend(ytdlp_cache.cli_args())
+        account = account_pool.acquire()
+        if account is not None:
+            cmd.extend(['--cookies', account.cookies_file, '--extractor-args', 'youtube:player_client=web'])
+        proxy = proxy_pool.best()
+        if proxy:
+            cmd.extend(['--proxy', proxy])
+        cmd.append(settings.YTDLP_CACHE_WARM_URL)
+
+        try:
+            rate_governor.acquire(account.id if account else None, rate_governor.egress_id(proxy), 'warm')
+            with ytdlp_cache.track('warm'), process_limiter.slot('yt-dlp') as slot:
+                result, usage = run_with_usage(
+                    cmd,
+                    timeout=settings.YTDLP_INFO_TIMEOUT,
+                    env={**os.environ, "UV_THREADPOOL_SIZE": "1", "OPENBLAS_NUM_THREADS": "1"}
+                )
+                if slot:
+                    slot.record_exit(result.returncode)
+            self._record_usage(None, 'warm', usage)
+            if result.returncode != 0:
+                logger.warning(f"yt-dlp cache warm-up failed: {result.stderr.strip()[-200:]}")
+            else:
+                logger.info(f"yt-dlp cache warmed at {ytdlp_cache.path}")
+        except subprocess.TimeoutExpired:
+            logger.warning("yt-dlp cache warm-up timed out")
+        except RateLimitError:
+            logger.info("Skipping yt-dlp cache warm-up, YouTube rate limit reached")
+        except WorkerOverloadedError:
+            logger.info("Skipping yt-dlp cache warm-up, no process slot free")
 
     async def download_video(self, url: str, video_id: str, progress_callback=None) -> str:
         loop = asyncio.get_event_loop()
@@ -0,0 +1,168 @@
+"""
+Managed yt-dlp cache directory shared by every yt-dlp run on this host
+
+yt-dlp caches player JS, signature functions and n-sig solutions under its
+--cache-dir. Pointing all runs (subprocess and in-process engine) at one
+per-host directory means the expensive node-based n-sig computation happens
+once per player version instead of once per call.
+"""
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from app.config.settings import settings
+from app.monitoring.metrics import ytdlp_cache_lookups_total, ytdlp_cache_size_bytes
+from app.utils.logger import logger
+
+TMPFS_ROOT = "/dev/shm"
+# Entries already counted as a miss, shared by all runs on the host
+INDEX_FILE = ".lookups.json"
+
+
+class YtDlpCache:
+    """Per-host yt-dlp cache directory with size-bounded pruning and hit/miss accounting"""
+
+    def __init__(self):
+        self._path: Optional[Path] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return settings.YTDLP_CACHE_ENABLED
+
+    @property
+    def path(self) -> Path:
+        """Cache directory, created on first use (tmpfs when available)"""
+        with self._lock:
+            if self._path is None:
+                if settings.YTDLP_CACHE_DIR:
+                    root = Path(settings.YTDLP_CACHE_DIR)
+                elif os.access(TMPFS_ROOT, os.W_OK):
+                    root = Path(TMPFS_ROOT) / "ytdl-cache"
+                else:
+                    root = Path(tempfile.gettempdir()) / "ytdl-cache"
+                root.mkdir(parents=True, exist_ok=True)
+                self._path = root
+            return self._path
+
+    def cli_args(self) -> List[str]:
+        """yt-dlp command line flags selecting the shared cache"""
+        if not self.enabled:
+            return ['--no-cache-dir']
+        return ['--cache-dir', str(self.path)]
+
+    def ydl_opts(self) -> dict:
+        """YoutubeDL options selecting the shared cache"""
+        if not self.enabled:
+            return {'cachedir': False}
+        return {'cachedir': str(self.path)}
+
+    def _snapshot(self) -> Dict[str, Tuple[float, int]]:
+        """Map of relative path -> (mtime, size) for every cache file"""
+        entries = {}
+        root = self.path
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                if name.startswith('.'):
+                    # Our own bookkeeping, never pruned
+                    continue
+                full = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(full)
+                except FileNotFoundError:
+                    continue
+                entries[os.path.relpath(full, root)] = (stat.st_mtime, stat.st_size)
+        return entries
+
+    def _claim_writes(self, snapshot: Dict[str, Tuple[float, int]], since: float) -> List[str]:
+        """
+        Cache entries written since `since` that no other run has accounted for yet.
+
+        The index of accounted (entry, mtime) pairs is shared by every run on the
+        host under a file lock, so an entry written while runs overlap counts
+        as a miss for exactly one of them.
+        """
+        with open(self.path / INDEX_FILE, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                raw = f.read()
+                try:
+                    index = json.loads(raw) if raw else {}
+                except ValueError:
+                    index = {}
+                claimed = [
+                    name for name, (mtime, _) in snapshot.items()
+                    if mtime >= since and index.get(name) != mtime
+                ]
+                # Forget pruned entries so the index stays as small as the cache
+                index = {name: index[name] for name in snapshot if name in index}
+                index.update({name: snapshot[name][0] for name in claimed})
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(index))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return claimed
+
+    @contextmanager
+    def track(self, operation: str):
+        """
+        Count one cache lookup around a yt-dlp run.
+
+        yt-dlp only writes cache entries for data it had to compute, so a run
+        during which an entry was (re)written is a miss and a run that leaves
+        the cache untouched is a hit. Entries are matched by mtime after the
+        run, with no snapshot taken before it.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        started = time.time()
+        try:
+            yield
+        finally:
+            try:
+                snapshot = self._snapshot()
+                written = self._claim_writes(snapshot, started)
+                ytdlp_cache_lookups_total.labels(
+                    operation=operation,
+                    result='miss' if written else 'hit'
+                ).inc()
+                if written:
+                    self.prune(snapshot)
+            except Exception as e:
+                logger.warning(f"yt-dlp cache accounting failed: {e}")
+
+    def prune(self, snapshot: Optional[Dict[str, Tuple[float, int]]] = None) -> int:
+        """Delete least recently written entries until the cache fits YTDLP_CACHE_MAX_MB"""
+        snapshot = snapshot if snapshot is not None else self._snapshot()
+        total = sum(size for _, size in snapshot.values())
+        limit = settings.YTDLP_CACHE_MAX_MB * 1024 * 1024
+        removed = 0
+
+        if total > limit:
+            for name, (_, size) in sorted(snapshot.items(), key=lambda item: item[1][0]):
+                if total <= limit:
+                    break
+                try:
+                    os.remove(self.path / name)
+                    total -= size
+                    removed += 1
+                except FileNotFoundError:
+                    total -= size
+            logger.info(f"Pruned {removed} yt-dlp cache entries")
+
+        ytdlp_cache_size_bytes.set(total)
+        return removed
+
+
+# Singleton instance
+ytdlp_cache = YtDlpCache()
@@ -0,0 +1,352 @@
+"""
+In-process yt-dlp engine - drives yt_dlp.YoutubeDL from a small pool of long-lived worker processes
+
+Spawning `yt-dlp` per call pays interpreter startup, extractor import and player JS
+setup every time. The pool keeps those warm; YouTubeService falls back to the
+subprocess path whenever the engine is unavailable.
+
+Each worker serves one call at a time over its own pipe, so a hung, stalled or
+cancelled call is ended by killing just its worker; calls running in the other
+workers carry on and the pool replaces the killed one on demand.
+"""
+import multiprocessing
+import resource
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+from app.config.settings import settings
+from app.utils.logger import logger
+from app.utils.process_usage import BLOCK_SIZE, ProcessUsage
+
+# Set inside pool workers by _worker_main
+_worker_progress_queue = None
+
+
+class YtDlpEngineError(Exception):
+    """yt-dlp reported an error while extracting or downloading (message mirrors stderr)"""
+
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(message)
+
+
+class YtDlpEngineUnavailable(Exception):
+    """Engine cannot serve the call - caller should fall back to the subprocess path"""
+    pass
+
+
+class EngineStalled(Exception):
+    """A download made no progress within its stall timeout and its worker was killed"""
+    pass
+
+
+class EngineCancelled(Exception):
+    """The download's job was cancelled and its worker was killed"""
+    pass
+
+
+def _usage_since(self_before, children_before, started: float) -> ProcessUsage:
+    """
+    Resources a worker used for one call, including the ffmpeg merges yt-dlp ran.
+
+    Peak memory is the worker's lifetime peak; getrusage() has no per-call value.
+    """
+    self_after = resource.getrusage(resource.RUSAGE_SELF)
+    children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    def delta(field: str):
+        return (getattr(self_after, field) - getattr(self_before, field)
+                + getattr(children_after, field) - getattr(children_before, field))
+
+    return ProcessUsage(
+        cpu_user_seconds=delta('ru_utime'),
+        cpu_system_seconds=delta('ru_stime'),
+        max_rss_bytes=max(self_after.ru_maxrss, children_after.ru_maxrss) * 1024,
+        read_bytes=delta('ru_inblock') * BLOCK_SIZE,
+        write_bytes=delta('ru_oublock') * BLOCK_SIZE,
+        wall_seconds=time.monotonic() - started,
+        processes=1,
+    )
+
+
+def _worker_main(conn, progress_queue):
+    """Pool worker: pay the yt_dlp import once, then serve calls from the pipe until told to stop"""
+    global _worker_progress_queue
+    _worker_progress_queue = progress_queue
+    try:
+        import yt_dlp  # noqa: F401
+    except ImportError:
+        pass
+    while True:
+        try:
+            call = conn.recv()
+        except (EOFError, OSError):
+            return
+        if call is None:
+            return
+        fn, args = call
+        self_before = resource.getrusage(resource.RUSAGE_SELF)
+        children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        started = time.monotonic()
+        try:
+            status, payload = 'ok', fn(*args)
+        except YtDlpEngineError as e:
+            status, payload = 'error', e.message
+        except Exception as e:
+            status, payload = 'error', str(e)
+        conn.send((status, payload, _usage_since(self_before, children_before, started)))
+
+
+def _run_extract_info(url: str, ydl_opts: dict) -> dict:
+    import yt_dlp
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+            return ydl.sanitize_info(info)
+    except Exception as e:
+        raise YtDlpEngineError(str(e))
+
+
+def _run_download(url: str, ydl_opts: dict, token: Optional[str]) -> dict:
+    import yt_dlp
+
+    def progress_hook(d):
+        if token and _worker_progress_queue is not None:
+            _worker_progress_queue.put((token, {
+                key: d.get(key) for key in (
+                    'status', 'downloaded_bytes', 'total_bytes', 'total_bytes_estimate',
+                    'speed', 'eta', 'fragment_index', 'fragment_count'
+                )
+            }))
+
+    def postprocessor_hook(d):
+        # Merging emits no download progress; report it so stall detection sees activity
+        if token and _worker_progress_queue is not None:
+            _worker_progress_queue.put((token, {'status': 'postprocessing'}))
+
+    try:
+        with yt_dlp.YoutubeDL({
+            **ydl_opts,
+            'progress_hooks': [progress_hook],
+            'postprocessor_hooks': [postprocessor_hook]
+        }) as ydl:
+            info = ydl.extract_info(url, download=True)
+            return ydl.sanitize_info(info)
+    except Exception as e:
+        raise YtDlpEngineError(str(e))
+
+
+class _Worker:
+    """One engine process and the parent's end of its pipe"""
+
+    def __init__(self, ctx, progress_queue):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, progress_queue), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.calls = 0
+
+    def stop(self):
+        """Let the worker exit after its current state is clean"""
+        try:
+            self.conn.send(None)
+            self.process.join(timeout=5)
+        except Exception:
+            pass
+        if self.process.is_alive():
+            self.kill()
+        else:
+            self.conn.close()
+
+    def kill(self):
+        """End the worker and whatever call it is running"""
+        try:
+            self.process.kill()
+            self.process.join(timeout=5)
+        except Exception:
+            pass
+        self.conn.close()
+
+
+class YtDlpEngine:
+    """Pool of long-lived processes running yt_dlp.YoutubeDL in-process"""
+
+    # How often a running call is checked for cancellation, stalls and its deadline
+    POLL_INTERVAL = 1.0
+
+    def __init__(self, max_workers: int = 1, max_tasks_per_worker: int = 0, start_method: str = 'spawn'):
+        self.max_workers = max_workers
+        self.max_tasks_per_worker = max_tasks_per_worker
+        # spawn avoids inheriting Celery/Redis sockets and threads from the parent
+        self.start_method = start_method
+        self._ctx = None
+        self._progress_queue = None
+        self._progress_callbacks: Dict[str, Callable[[dict], None]] = {}
+        self._idle: List[_Worker] = []
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._lock = threading.Lock()
+        self._available: Optional[bool] = None
+
+    @property
+    def available(self) -> bool:
+        """True when the yt_dlp package can be imported in this environment"""
+        if self._available is None:
+            try:
+                import yt_dlp  # noqa: F401
+                self._available = True
+            except ImportError:
+                logger.warning("yt_dlp package not importable - in-process engine disabled")
+                self._available = False
+        return self._available
+
+    def _start(self):
+        """Create the progress queue and its dispatcher on first use (call with _lock held)"""
+        if self._ctx is not None:
+            return
+        self._ctx = multiprocessing.get_context(self.start_method)
+        self._progress_queue = self._ctx.Queue()
+        threading.Thread(
+            target=self._dispatch_progress,
+            args=(self._progress_queue,),
+            name="ytdlp-engine-progress",
+            daemon=True
+        ).start()
+        logger.info(f"yt-dlp engine started with up to {self.max_workers} worker process(es)")
+
+    def _dispatch_progress(self, progress_queue):
+        """Route progress events from pool workers to the registered callbacks"""
+        while True:
+            try:
+                item = progress_queue.get()
+            except (EOFError, OSError):
+                return
+            if item is None:
+                return
+            token, data = item
+            callback = self._progress_callbacks.get(token)
+            if callback:
+                try:
+                    callback(data)
+                except Exception as e:
+                    logger.error(f"Error in engine progress callback: {e}")
+
+    def _checkout(self, timeout: Optional[float]) -> _Worker:
+        """Take an idle worker, or start one, once fewer than max_workers calls are running"""
+        if not self._slots.acquire(timeout=timeout if timeout else -1):
+            raise YtDlpEngineUnavailable("all engine workers busy")
+        try:
+            with self._lock:
+                self._start()
+                while self._idle:
+                    worker = self._idle.pop()
+                    if worker.process.is_alive():
+                        return worker
+                    worker.kill()
+            return _Worker(self._ctx, self._progress_queue)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _checkin(self, worker: _Worker, healthy: bool):
+        try:
+            if not healthy:
+                worker.kill()
+            elif self.max_tasks_per_worker and worker.calls >= self.max_tasks_per_worker:
+                # Recycle to cap memory growth
+                worker.stop()
+            else:
+                with self._lock:
+                    self._idle.append(worker)
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        """Stop the idle workers; busy ones are stopped when their calls return"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.stop()
+
+    def _run(self, fn, *args, timeout: Optional[float] = None, stalled: Optional[Callable[[], bool]] = None,
+             cancelled: Optional[Callable[[], bool]] = None,
+             on_usage: Optional[Callable[[ProcessUsage], None]] = None) -> Any:
+        if not self.available:
+            raise YtDlpEngineUnavailable("yt_dlp not installed")
+        worker = self._checkout(timeout)
+        healthy = False
+        try:
+            deadline = time.monotonic() + timeout if timeout else None
+            try:
+                worker.conn.send((fn, args))
+                while not worker.conn.poll(self.POLL_INTERVAL):
+                    if cancelled and cancelled():
+                        raise EngineCancelled()
+                    if stalled and stalled():
+                        raise EngineStalled()
+                    if deadline and time.monotonic() > deadline:
+                        raise TimeoutError()
+                    if not worker.process.is_alive():
+                        raise EOFError()
+                status, payload, usage = worker.conn.recv()
+            except (EOFError, ConnectionError) as e:
+                # The worker died under the call (OOM kill, crash); the caller can use the subprocess path
+                logger.error(f"yt-dlp engine worker exited (code {worker.process.exitcode}): {e!r}")
+                raise YtDlpEngineUnavailable(f"engine worker exited with code {worker.process.exitcode}")
+            healthy = True
+            worker.calls += 1
+        finally:
+            self._checkin(worker, healthy)
+
+        if on_usage and usage:
+            on_usage(usage)
+        if status == 'error':
+            raise YtDlpEngineError(payload)
+        return payload
+
+    def extract_info(self, url: str, ydl_opts: dict, timeout: Optional[float] = None,
+                     on_usage: Optional[Callable[[ProcessUsage], None]] = None) -> dict:
+        """Run metadata extraction in a pool worker and return the sanitized info dict"""
+        return self._run(_run_extract_info, url, ydl_opts, timeout=timeout, on_usage=on_usage)
+
+    def download(
+        self,
+        url: str,
+        ydl_opts: dict,
+        progress_callback: Optional[Callable[[dict], None]] = None,
+        timeout: Optional[float] = None,
+        stall_timeout: Optional[float] = None,
+        cancelled: Optional[Callable[[], bool]] = None,
+        on_usage: Optional[Callable[[ProcessUsage], None]] = None
+    ) -> dict:
+        """
+        Download in a pool worker, forwarding progress hook events to progress_callback.
+
+        Raises TimeoutError after `timeout` seconds, EngineStalled when no progress
+        event arrives for `stall_timeout` seconds and EngineCancelled once `cancelled`
+        returns True; in each case only this call's worker is killed.
+        """
+        last_activity = [time.monotonic()]
+
+        def on_progress(data: dict):
+            last_activity[0] = time.monotonic()
+            if progress_callback:
+                progress_callback(data)
+
+        stalled = None
+        if stall_timeout:
+            stalled = lambda: time.monotonic() - last_activity[0] > stall_timeout  # noqa: E731
+
+        token = uuid.uuid4().hex
+        self._progress_callbacks[token] = on_progress
+        try:
+            return self._run(_run_download, url, ydl_opts, token, timeout=timeout, stalled=stalled,
+                             cancelled=cancelled, on_usage=on_usage)
+        finally:
+            self._progress_callbacks.pop(token, None)
+
+
+ytdlp_engine = YtDlpEngine(
+    max_workers=settings.YTDLP_ENGINE_WORKERS,
+    max_tasks_per_worker=settings.YTDLP_ENGINE_MAX_TASKS_PER_WORKER
+)
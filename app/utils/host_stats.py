@@ -0,0 +1,46 @@
+"""
+Lightweight host load readings (load average, memory) without extra dependencies
+"""
+import os
+from typing import Optional
+
+
+def cpu_count() -> int:
+    """Number of CPUs available to this process"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
+
+def load_per_cpu() -> Optional[float]:
+    """1-minute load average divided by CPU count, or None if unavailable"""
+    try:
+        return os.getloadavg()[0] / cpu_count()
+    except (AttributeError, OSError):
+        return None
+
+
+def memory_available_ratio() -> Optional[float]:
+    """MemAvailable / MemTotal from /proc/meminfo, or None if unavailable"""
+    try:
+        meminfo = {}
+        with open('/proc/meminfo') as f:
+            for line in f:
+                key, value = line.split(':', 1)
+                meminfo[key] = int(value.split()[0])
+        return meminfo['MemAvailable'] / meminfo['MemTotal']
+    except (OSError, KeyError, ValueError, ZeroDivisionError):
+        return None
+
+
+def pressure_reason(memory: Optional[float], load: Optional[float], min_free_memory: float, max_load: float) -> Optional[str]:
+    """
+    Why readings from memory_available_ratio() and load_per_cpu() cross the
+    given thresholds, or None. Missing readings never count as pressure.
+    """
+    if memory is not None and memory < min_free_memory:
+        return f"memory available {memory:.0%}"
+    if load is not None and load > max_load:
+        return f"load {load:.2f} per CPU"
+    return None
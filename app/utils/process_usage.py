@@ -0,0 +1,211 @@
+"""
+Resource usage (CPU, peak memory, block I/O) of finished child processes
+
+Children are reaped with wait4() so the kernel hands back their rusage, which
+also covers the grandchildren they reaped themselves (ffmpeg, node). Unlike
+RUSAGE_CHILDREN deltas this stays correct when several children run at once.
+"""
+import asyncio
+import os
+import signal
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+# ru_inblock/ru_oublock count 512-byte blocks, ru_maxrss is in KiB (Linux)
+BLOCK_SIZE = 512
+POLL_INTERVAL = 0.1
+
+
+@dataclass
+class ProcessUsage:
+    """Resources consumed by one or more finished child processes"""
+    cpu_user_seconds: float = 0.0
+    cpu_system_seconds: float = 0.0
+    max_rss_bytes: int = 0
+    read_bytes: int = 0
+    write_bytes: int = 0
+    wall_seconds: float = 0.0
+    processes: int = 0
+
+    @classmethod
+    def from_rusage(cls, rusage, wall_seconds: float) -> "ProcessUsage":
+        return cls(
+            cpu_user_seconds=rusage.ru_utime,
+            cpu_system_seconds=rusage.ru_stime,
+            max_rss_bytes=rusage.ru_maxrss * 1024,
+            read_bytes=rusage.ru_inblock * BLOCK_SIZE,
+            write_bytes=rusage.ru_oublock * BLOCK_SIZE,
+            wall_seconds=wall_seconds,
+            processes=1,
+        )
+
+    @property
+    def cpu_seconds(self) -> float:
+        return self.cpu_user_seconds + self.cpu_system_seconds
+
+    def add(self, other: "ProcessUsage"):
+        """Fold another run into this total; peak memory is the largest single peak"""
+        self.cpu_user_seconds += other.cpu_user_seconds
+        self.cpu_system_seconds += other.cpu_system_seconds
+        self.max_rss_bytes = max(self.max_rss_bytes, other.max_rss_bytes)
+        self.read_bytes += other.read_bytes
+        self.write_bytes += other.write_bytes
+        self.wall_seconds += other.wall_seconds
+        self.processes += other.processes
+
+    def to_dict(self) -> dict:
+        """camelCase document stored on the job"""
+        return {
+            'cpuUserSeconds': round(self.cpu_user_seconds, 3),
+            'cpuSystemSeconds': round(self.cpu_system_seconds, 3),
+            'maxRssBytes': self.max_rss_bytes,
+            'readBytes': self.read_bytes,
+            'writeBytes': self.write_bytes,
+            'wallSeconds': round(self.wall_seconds, 3),
+            'processes': self.processes,
+        }
+
+
+def has_exited(process: subprocess.Popen) -> bool:
+    """
+    Whether the child has exited, without reaping it.
+
+    Use this instead of Popen.poll() from watcher threads so the rusage is
+    still there for wait_with_usage().
+    """
+    if process.returncode is not None:
+        return True
+    try:
+        return os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOHANG | os.WNOWAIT) is not None
+    except ChildProcessError:
+        return True
+
+
+def wait_with_usage(process: subprocess.Popen, started: float, timeout: Optional[float] = None) -> Optional[ProcessUsage]:
+    """
+    Popen.wait() that also returns the child's resource usage.
+
+    started is the time.monotonic() at spawn. Returns None when the child was
+    already reaped elsewhere. Raises subprocess.TimeoutExpired like Popen.wait().
+    """
+    if process.returncode is not None:
+        return None
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        try:
+            pid, status, rusage = os.wait4(process.pid, 0 if deadline is None else os.WNOHANG)
+        except ChildProcessError:
+            process.wait()
+            return None
+        if pid:
+            process.returncode = os.waitstatus_to_exitcode(status)
+            return ProcessUsage.from_rusage(rusage, time.monotonic() - started)
+        if time.monotonic() >= deadline:
+            raise subprocess.TimeoutExpired(process.args, timeout)
+        time.sleep(POLL_INTERVAL)
+
+
+def run_with_usage(cmd: List[str], timeout: float, env: Optional[dict] = None, on_start: Optional[Callable[[subprocess.Popen], None]] = None) -> Tuple[subprocess.CompletedProcess, Optional[ProcessUsage]]:
+    """
+    subprocess.run(cmd, capture_output=True, text=True, timeout=timeout) plus usage.
+
+    Output is captured in temporary files rather than pipes, so the child can be
+    reaped with wait4() without reader threads. The child gets its own process
+    group, which is killed on timeout or interruption.
+    """
+    with tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr:
+        started = time.monotonic()
+        process = subprocess.Popen(cmd, stdout=stdout, stderr=stderr, env=env, start_new_session=True)
+        if on_start:
+            on_start(process)
+        try:
+            usage = wait_with_usage(process, started, timeout)
+        except BaseException:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+            process.wait()
+            raise
+        stdout.seek(0)
+        stderr.seek(0)
+        return subprocess.CompletedProcess(
+            cmd,
+            process.returncode,
+            stdout.read().decode('utf-8', errors='replace'),
+            stderr.read().decode('utf-8', errors='replace'),
+        ), usage
+
+
+async def _read_pipe(loop: asyncio.AbstractEventLoop, pipe) -> bytes:
+    reader = asyncio.StreamReader()
+    transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+    try:
+        return await reader.read()
+    finally:
+        transport.close()
+
+
+async def _wait_for_exit(loop: asyncio.AbstractEventLoop, process: subprocess.Popen):
+    """
+    Wait for the child to exit without reaping it or tying up a thread.
+
+    A pidfd becomes readable when the child exits (Linux 5.3+); elsewhere the
+    exit is polled with has_exited().
+    """
+    try:
+        pidfd = os.pidfd_open(process.pid)
+    except (AttributeError, OSError):
+        while not has_exited(process):
+            await asyncio.sleep(POLL_INTERVAL)
+        return
+    exited = loop.create_future()
+    loop.add_reader(pidfd, lambda: exited.done() or exited.set_result(None))
+    try:
+        await exited
+    finally:
+        loop.remove_reader(pidfd)
+        os.close(pidfd)
+
+
+async def run_with_usage_async(cmd: List[str], timeout: float, env: Optional[dict] = None, on_start: Optional[Callable[[subprocess.Popen], None]] = None) -> Tuple[subprocess.CompletedProcess, Optional[ProcessUsage]]:
+    """
+    run_with_usage() for the event loop.
+
+    Output is read through asyncio pipes and the exit is awaited on a pidfd,
+    so the child can still be reaped with wait4() without occupying an
+    executor thread. Raises asyncio.TimeoutError on timeout; the child's
+    process group is killed on timeout or cancellation.
+    """
+    loop = asyncio.get_running_loop()
+    started = time.monotonic()
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env, start_new_session=True)
+    if on_start:
+        on_start(process)
+
+    async def communicate():
+        stdout, stderr = await asyncio.gather(_read_pipe(loop, process.stdout), _read_pipe(loop, process.stderr))
+        await _wait_for_exit(loop, process)
+        return stdout, stderr
+
+    try:
+        stdout, stderr = await asyncio.wait_for(communicate(), timeout=timeout)
+    except BaseException:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        # Returns at once after SIGKILL
+        process.wait()
+        raise
+    # The child has exited, so this reaps it without blocking
+    usage = wait_with_usage(process, started)
+    return subprocess.CompletedProcess(
+        cmd,
+        process.returncode,
+        stdout.decode('utf-8', errors='replace'),
+        stderr.decode('utf-8', errors='replace'),
+    ), usage
@@ -229,15 +229,15 @@ else
 fi
 
 echo '  [10/12] Restarting services...'
-\$SUDO systemctl restart ytd-api ytd-worker ytd-beat
+\$SUDO systemctl restart ytd-api ytd-worker ytd-worker-fast ytd-beat
 
 echo '  [11/12] Checking service status...'
 sleep 3
-if \$SUDO systemctl is-active --quiet ytd-api && \$SUDO systemctl is-active --quiet ytd-worker && \$SUDO systemctl is-active --quiet ytd-beat; then
+if \$SUDO systemctl is-active --quiet ytd-api && \$SUDO systemctl is-active --quiet ytd-worker && \$SUDO systemctl is-active --quiet ytd-worker-fast && \$SUDO systemctl is-active --quiet ytd-beat; then
     echo '  Services running successfully'
 else
     echo '  ERROR: Services failed to start'
-    \$SUDO systemctl status ytd-api ytd-worker ytd-beat --no-pager
+    \$SUDO systemctl status ytd-api ytd-worker ytd-worker-fast ytd-beat --no-pager
     exit 1
 fi
 "
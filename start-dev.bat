@@ -69,9 +69,10 @@ start "FastAPI Server" cmd /c "venv\Scripts\activate && uvicorn app.main:app --h
 REM Wait a bit for API to start
 timeout /t 3 /nobreak >nul
 
-REM Start Celery worker
-echo [INFO] Starting Celery worker...
-start "Celery Worker" cmd /c "venv\Scripts\activate && celery -A app.queue.celery_app worker --loglevel=info --pool=solo"
+REM Start Celery workers: one for downloads, one for cached jobs and maintenance
+echo [INFO] Starting Celery workers...
+start "Celery Worker (heavy)" cmd /c "venv\Scripts\activate && celery -A app.queue.celery_app worker --loglevel=info --pool=solo -Q heavy -n heavy@%%h"
+start "Celery Worker (fast)" cmd /c "venv\Scripts\activate && celery -A app.queue.celery_app worker --loglevel=info --pool=solo -Q fast,maintenance -n fast@%%h"
 
 REM Wait for services to fully start
 timeout /t 2 /nobreak >nul
@@ -83,10 +83,12 @@ API_PID=$!
 # Wait for API to start
 sleep 3
 
-# Start Celery worker in background
-info "Starting Celery worker..."
-celery -A app.queue.celery_app worker --loglevel=info --pool=solo &
+# Start Celery workers in background: one for downloads, one for cached jobs and maintenance
+info "Starting Celery workers..."
+celery -A app.queue.celery_app worker --loglevel=info --pool=solo -Q heavy -n heavy@%h &
 CELERY_PID=$!
+celery -A app.queue.celery_app worker --loglevel=info --pool=solo -Q fast,maintenance -n fast@%h &
+CELERY_FAST_PID=$!
 
 # Give services time to start
 sleep 2
@@ -99,7 +101,7 @@ echo "  API Docs:      http://localhost:3001/docs"
 echo "  Health Check:  http://localhost:3001/api/health/"
 echo ""
 echo "  API PID:       $API_PID"
-echo "  Celery PID:    $CELERY_PID"
+echo "  Celery PID:    $CELERY_PID (heavy), $CELERY_FAST_PID (fast, maintenance)"
 echo ""
 echo "  Press Ctrl+C to stop all services"
 echo ""
@@ -110,6 +112,7 @@ cleanup() {
     info "Stopping services..."
     kill $API_PID 2>/dev/null || true
     kill $CELERY_PID 2>/dev/null || true
+    kill $CELERY_FAST_PID 2>/dev/null || true
     log "Services stopped"
     exit 0
 }
@@ -0,0 +1,75 @@
+"""
+Unit tests for the YouTube account pool
+"""
+import pytest
+from unittest.mock import MagicMock, patch
+from app.services.account_pool import Account, AccountPool, parse_account_pool
+
+
+class TestAccountPool:
+    """Test account selection, health and cooldown"""
+
+    @pytest.fixture
+    def accounts(self, tmp_path):
+        """Three accounts with cookie files on disk"""
+        result = []
+        for name in ("acc-1", "acc-2", "acc-3"):
+            path = tmp_path / f"{name}.txt"
+            path.write_text("# Netscape HTTP Cookie File\n")
+            result.append(Account(name, str(path)))
+        return result
+
+    @pytest.fixture
+    def pool(self, accounts):
+        """Pool with Redis state replaced by an in-memory dict"""
+        pool = AccountPool(accounts)
+        pool.redis_client = None
+        pool.states = {a.id: {'health': 1.0, 'last_used': 0.0, 'cooling_down': False} for a in accounts}
+        pool._state = lambda account: dict(pool.states[account.id], last_used=pool._local_last_used.get(account.id, 0.0))
+        return pool
+
+    def test_parse_account_pool(self):
+        """Test pool parsing and the single-account fallback"""
+        accounts = parse_account_pool("a:/tmp/a.txt, b:/tmp/b.txt,broken", "default", None)
+        assert [a.id for a in accounts] == ["a", "b"]
+        assert accounts[1].cookies_file == "/tmp/b.txt"
+
+        assert parse_account_pool(None, "backend-1", "/tmp/c.txt") == [Account("backend-1", "/tmp/c.txt")]
+        assert parse_account_pool(None, "backend-1", None) == []
+
+    def test_least_recently_used_rotation(self, pool):
+        """Test consecutive acquisitions rotate through healthy accounts"""
+        with patch('app.services.account_pool.time.time', side_effect=[1, 2, 3, 4]):
+            picked = [pool.acquire().id for _ in range(4)]
+
+        assert picked == ["acc-1", "acc-2", "acc-3", "acc-1"]
+
+    def test_skips_cooling_down_and_excluded_accounts(self, pool):
+        """Test accounts in cooldown or already tried are not returned"""
+        pool.states["acc-1"]["cooling_down"] = True
+
+        assert pool.acquire(exclude=["acc-2"]).id == "acc-3"
+
+        pool.states["acc-3"]["cooling_down"] = True
+        assert pool.acquire(exclude=["acc-2"]) is None
+
+    def test_prefers_healthy_accounts(self, pool):
+        """Test unhealthy accounts are used only when no healthy one is left"""
+        pool.states["acc-1"]["health"] = 0.1
+        pool.states["acc-2"]["health"] = 0.2
+
+        assert pool.acquire(exclude=["acc-3"]).id == "acc-2"
+        assert pool.acquire().id == "acc-3"
+
+    @patch('app.services.account_pool.cookie_refresh_service')
+    def test_report_blocked_cools_down_and_refreshes(self, mock_refresh, accounts):
+        """Test bot detection lowers health, sets a cooldown and refreshes only that account"""
+        pool = AccountPool(accounts)
+        pool.redis_client = MagicMock()
+        pool.redis_client.hget.return_value = "1.0"
+
+        pool.report_blocked(accounts[1])
+
+        pool.redis_client.hset.assert_called_once_with("account:pool:acc-2", "health", 0.7)
+        assert pool.redis_client.setex.call_args[0][0] == "account:cooldown:acc-2"
+        mock_refresh.trigger_cookie_refresh.assert_called_once_with(reason="bot_detection", server_id="acc-2")
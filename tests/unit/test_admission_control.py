@@ -0,0 +1,84 @@
+"""
+Unit tests for queue-depth admission control
+"""
+import pytest
+from unittest.mock import MagicMock
+from app.exceptions import ServiceOverloadedError
+from app.services.admission_control import AdmissionController
+
+
+class TestAdmissionController:
+    """Test admission decisions from queue depth and drain time"""
+
+    @pytest.fixture
+    def controller(self, monkeypatch):
+        monkeypatch.setattr('app.services.admission_control.settings.ADMISSION_CONTROL_ENABLED', True)
+        monkeypatch.setattr('app.services.admission_control.settings.ADMISSION_MAX_QUEUE_DEPTH', 100)
+        monkeypatch.setattr('app.services.admission_control.settings.ADMISSION_MAX_DRAIN_SECONDS', 600)
+        monkeypatch.setattr('app.services.admission_control.settings.ADMISSION_HEAVY_WORKER_CONCURRENCY', 2)
+        monkeypatch.setattr('app.services.admission_control.settings.ADMISSION_FAST_WORKER_CONCURRENCY', 2)
+        monkeypatch.setattr('app.services.admission_control.settings.ADMISSION_DEFAULT_JOB_SECONDS', 30.0)
+        controller = AdmissionController()
+        controller.redis_client = MagicMock()
+        return controller
+
+    def _backlog(self, controller, depth, job_seconds=None):
+        controller.redis_client.pipeline.return_value.execute.return_value = [depth, job_seconds]
+
+    def test_admits_short_backlog(self, controller):
+        """Test a queue under both limits admits the job"""
+        self._backlog(controller, 10, "20.0")
+
+        controller.admit('heavy')
+
+    def test_rejects_long_drain_with_retry_after(self, controller):
+        """Test a backlog that would take too long to drain is rejected"""
+        # 80 jobs * 20s / 2 workers = 800s, 200s over the limit
+        self._backlog(controller, 80, "20.0")
+
+        with pytest.raises(ServiceOverloadedError) as exc_info:
+            controller.admit('heavy')
+
+        details = exc_info.value.details
+        assert exc_info.value.status_code == 503
+        assert details['eta_seconds'] == 800
+        assert details['retry_after_seconds'] == 200
+        assert details['queue_depth'] == 80
+
+    def test_rejects_deep_queue(self, controller):
+        """Test the depth limit applies even when jobs are quick"""
+        self._backlog(controller, 150, "1.0")
+
+        with pytest.raises(ServiceOverloadedError) as exc_info:
+            controller.admit('fast')
+
+        assert exc_info.value.details['retry_after_seconds'] == 25
+
+    def test_drain_estimate_uses_each_queue_concurrency(self, controller, monkeypatch):
+        """Test the fast queue's backlog is split over its own worker count"""
+        monkeypatch.setattr('app.services.admission_control.settings.ADMISSION_HEAVY_WORKER_CONCURRENCY', 1)
+        monkeypatch.setattr('app.services.admission_control.settings.ADMISSION_FAST_WORKER_CONCURRENCY', 4)
+        self._backlog(controller, 40, "10.0")
+
+        assert controller.load('heavy').drain_seconds == 400
+        assert controller.load('fast').drain_seconds == 100
+
+    def test_default_duration_before_measurements(self, controller):
+        """Test the configured duration is assumed until workers report one"""
+        self._backlog(controller, 10)
+
+        assert controller.load('heavy').drain_seconds == 150
+
+    def test_fails_open_when_redis_unavailable(self, controller):
+        """Test a broker error admits the job"""
+        controller.redis_client.pipeline.return_value.execute.side_effect = Exception("down")
+
+        controller.admit('heavy')
+
+    def test_record_duration(self, controller):
+        """Test worker durations are passed to the moving-average script"""
+        controller._record_duration = MagicMock()
+        controller.record_duration('heavy', 42.0)
+
+        args = controller._record_duration.call_args.kwargs['args']
+        assert args[:2] == ['heavy', 42.0]
@@ -0,0 +1,87 @@
+"""
+Unit tests for the content-addressed cookie jar cache
+"""
+import os
+import time
+import pytest
+from unittest.mock import patch
+from app.services.cookie_jar_cache import CookieJarCache
+
+
+class TestCookieJarCache:
+    """Test cookie jar reuse and eviction"""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        """Create cache instance writing into a temporary directory"""
+        with patch('app.services.cookie_jar_cache.settings') as mock_settings:
+            mock_settings.COOKIE_JAR_DIR = str(tmp_path)
+            mock_settings.COOKIE_JAR_TTL = 60
+            yield CookieJarCache()
+
+    def test_same_cookies_share_one_jar(self, cache):
+        """Test identical cookies in any order map to the same file"""
+        first = cache.acquire({"SID": "abc", "HSID": "def"})
+        second = cache.acquire({"HSID": "def", "SID": "abc"})
+
+        assert first == second
+        with open(first) as f:
+            content = f.read()
+        assert content.startswith("# Netscape HTTP Cookie File")
+        assert "\tSID\tabc" in content
+
+    def test_different_cookies_get_different_jars(self, cache):
+        """Test jars are keyed by cookie content"""
+        assert cache.acquire({"SID": "abc"}) != cache.acquire({"SID": "xyz"})
+
+    def test_existing_jar_is_not_overwritten(self, cache):
+        """Test cookies yt-dlp saved back into the jar survive the next acquire"""
+        path = cache.acquire({"SID": "abc"})
+        with open(path, "a") as f:
+            f.write(".youtube.com\tTRUE\t/\tTRUE\t0\tREFRESHED\t1\n")
+
+        cache.acquire({"SID": "abc"})
+
+        with open(path) as f:
+            assert "REFRESHED" in f.read()
+
+    def test_evicts_only_idle_expired_jars(self, cache):
+        """Test TTL eviction skips jars still referenced in this process"""
+        held = cache.acquire({"SID": "held"})
+        idle = cache.acquire({"SID": "idle"})
+        cache.release(idle)
+        expired = time.time() - 120
+        os.utime(held, (expired, expired))
+        os.utime(idle, (expired, expired))
+
+        cache.evict_expired(force=True)
+
+        assert os.path.exists(held)
+        assert not os.path.exists(idle)
+
+    def test_jar_held_by_another_process_is_not_evicted(self, cache):
+        """Test the lease lock protects jars that other worker processes are using"""
+        other_process = CookieJarCache()
+        held = other_process.acquire({"SID": "shared"})
+        expired = time.time() - 120
+        os.utime(held, (expired, expired))
+
+        cache.evict_expired(force=True)
+        assert os.path.exists(held)
+
+        other_process.release(held)
+        cache.evict_expired(force=True)
+        assert not os.path.exists(held)
+        assert not os.path.exists(held[:-len(".txt")] + ".lock")
+
+    def test_lease_released_with_last_reference(self, cache):
+        """Test a process keeps one lease per jar until its last call releases it"""
+        first = cache.acquire({"SID": "abc"})
+        cache.acquire({"SID": "abc"})
+        key = os.path.basename(first)[:-len(".txt")]
+
+        cache.release(first)
+        assert key in cache._leases
+
+        cache.release(first)
+        assert key not in cache._leases
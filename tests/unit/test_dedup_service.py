@@ -0,0 +1,77 @@
+"""
+Unit tests for serving repeat videos from earlier uploads
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.services.dedup_service import DedupService, extract_filename_from_url
+
+
+EXISTING = {
+    'jobId': 'job-old',
+    'downloadUrl': 'https://storage.googleapis.com/bucket/My%20Video.mp4?Expires=1',
+    'videoInfo': {'id': 'abc123', 'title': 'My Video'},
+    'storageProvider': 'azure',
+    'fileSize': 1024,
+}
+
+
+class TestDedupService:
+    """Test lookup and re-signing of completed downloads"""
+
+    @pytest.fixture
+    def db(self):
+        db = MagicMock()
+        db.downloads.find_one = AsyncMock(return_value=dict(EXISTING))
+        return db
+
+    @pytest.fixture
+    def storage(self):
+        with patch('app.services.dedup_service.storage_service') as mock_storage:
+            mock_storage.regenerate_signed_url = AsyncMock(return_value="https://signed/new")
+            yield mock_storage
+
+    def test_extract_filename_from_url(self):
+        """Test the object name is taken from the URL path and decoded"""
+        assert extract_filename_from_url(EXISTING['downloadUrl']) == "My Video.mp4"
+
+    @pytest.mark.asyncio
+    async def test_hit_returns_completed_fields(self, db, storage):
+        """Test an earlier upload is re-signed with its own provider"""
+        fields = await DedupService().completed_fields(dict(EXISTING))
+
+        storage.regenerate_signed_url.assert_awaited_once_with("My Video.mp4", 'azure')
+        assert fields['status'] == 'completed'
+        assert fields['progress'] == 100
+        assert fields['downloadUrl'] == "https://signed/new"
+        assert fields['videoInfo'] == EXISTING['videoInfo']
+        assert fields['dedupedFrom'] == 'job-old'
+
+    @pytest.mark.asyncio
+    async def test_find_completed_queries_completed_uploads(self, db):
+        """Test the lookup only matches completed jobs with a download URL"""
+        assert await DedupService().find_completed(db, 'abc123') == EXISTING
+
+        query = db.downloads.find_one.call_args.args[0]
+        assert query['videoInfo.id'] == 'abc123'
+        assert query['status'] == 'completed'
+
+    @pytest.mark.asyncio
+    async def test_miss_returns_none(self, storage):
+        """Test unknown videos take the queued path"""
+        assert await DedupService().completed_fields(None) is None
+        storage.regenerate_signed_url.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_resign_failure_falls_back_to_queue(self, db, storage):
+        """Test a storage error does not fail the request"""
+        storage.regenerate_signed_url.side_effect = Exception("storage down")
+
+        assert await DedupService().completed_fields(dict(EXISTING)) is None
+
+    @pytest.mark.asyncio
+    async def test_disabled(self, storage, monkeypatch):
+        """Test the fast path can be switched off"""
+        monkeypatch.setattr('app.services.dedup_service.settings.DEDUP_FAST_PATH_ENABLED', False)
+
+        assert await DedupService().completed_fields(dict(EXISTING)) is None
+        storage.regenerate_signed_url.assert_not_awaited()
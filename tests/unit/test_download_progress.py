@@ -0,0 +1,68 @@
+"""
+Unit tests for structured yt-dlp progress parsing
+"""
+from unittest.mock import MagicMock
+from app.services.download_progress import (
+    PROGRESS_PREFIX,
+    ProgressReporter,
+    build_progress_stats,
+    parse_progress_line,
+    scaled_progress
+)
+
+
+class TestDownloadProgress:
+    """Test progress template parsing and scaling"""
+
+    def test_parse_progress_line(self):
+        """Test template lines are parsed as JSON"""
+        line = PROGRESS_PREFIX + '{"status": "downloading", "downloaded_bytes": 512, "total_bytes": 1024, ' \
+            '"total_bytes_estimate": null, "speed": 2048.5, "eta": 3, "fragment_index": null, "fragment_count": null}\n'
+
+        event = parse_progress_line(line)
+
+        assert event["downloaded_bytes"] == 512
+        assert event["speed"] == 2048.5
+        assert event["fragment_index"] is None
+
+    def test_parse_ignores_other_output(self):
+        """Test regular yt-dlp output and broken lines are not progress"""
+        assert parse_progress_line("[youtube] abc: Downloading webpage\n") is None
+        assert parse_progress_line(PROGRESS_PREFIX + "{not json") is None
+
+    def test_build_progress_stats_uses_estimate(self):
+        """Test total falls back to the estimate for fragmented downloads"""
+        stats = build_progress_stats({
+            "downloaded_bytes": 100,
+            "total_bytes": None,
+            "total_bytes_estimate": 400.7,
+            "speed": 1000.4,
+            "fragment_index": 2,
+            "fragment_count": 8
+        })
+
+        assert stats["totalBytes"] == 400
+        assert stats["speedBps"] == 1000
+        assert stats["fragmentCount"] == 8
+
+    def test_scaled_progress(self):
+        """Test download completion maps onto the 20-80% job range"""
+        assert scaled_progress({"downloadedBytes": 0, "totalBytes": 100}) == 20
+        assert scaled_progress({"downloadedBytes": 50, "totalBytes": 100}) == 50
+        assert scaled_progress({"downloadedBytes": 100, "totalBytes": 100}) == 80
+        assert scaled_progress({"fragmentIndex": 1, "fragmentCount": 2}) == 50
+        assert scaled_progress({}) is None
+
+    def test_reporter_only_moves_forward(self):
+        """Test the callback fires only when overall progress advances"""
+        callback = MagicMock()
+        reporter = ProgressReporter(callback)
+
+        reporter.report({"status": "downloading", "downloaded_bytes": 50, "total_bytes": 100})
+        reporter.report({"status": "downloading", "downloaded_bytes": 10, "total_bytes": 100})
+        reporter.report({"status": "finished", "downloaded_bytes": 100, "total_bytes": 100})
+
+        callback.assert_called_once()
+        progress, stats = callback.call_args[0]
+        assert progress == 50
+        assert stats["downloadedBytes"] == 50
@@ -0,0 +1,51 @@
+"""
+Unit tests for download failure classification and retry backoff
+"""
+import pytest
+from unittest.mock import patch
+from app.exceptions import (
+    CookieUnavailableError,
+    FileUploadError,
+    JobCancelledError,
+    RateLimitError,
+    VideoDownloadError,
+    VideoNotFoundError,
+)
+from app.services.error_classifier import ErrorClass, classify_error, retry_delay
+
+
+class TestErrorClassifier:
+    """Test failure classes and their backoff"""
+
+    @pytest.mark.parametrize("error, expected", [
+        (VideoNotFoundError("abc", "Video is unavailable"), ErrorClass.PERMANENT),
+        (VideoDownloadError("abc", "YT-DLP: ERROR: [youtube] abc: Private video"), ErrorClass.PERMANENT),
+        (VideoDownloadError("abc", "YT-DLP: ERROR: Unable to download webpage: HTTP Error 429: Too Many Requests"), ErrorClass.RATE_LIMITED),
+        (RateLimitError(30), ErrorClass.RATE_LIMITED),
+        (CookieUnavailableError("acc-1", "bot_detection"), ErrorClass.AUTH),
+        (CookieUnavailableError("acc-1", "YouTube blocked session: ERROR: [youtube] abc: Private video"), ErrorClass.PERMANENT),
+        (VideoDownloadError("abc", "Download stalled with no progress for 60s."), ErrorClass.NETWORK),
+        (VideoDownloadError("abc", "YT-DLP: ERROR: HTTP Error 503: Service Unavailable"), ErrorClass.NETWORK),
+        (TimeoutError(), ErrorClass.NETWORK),
+        (FileUploadError("gcs", "503 Backend Error"), ErrorClass.STORAGE),
+        (FileUploadError("s3", "S3 not configured"), ErrorClass.PERMANENT),
+        (JobCancelledError("job-1"), ErrorClass.PERMANENT),
+        (ValueError("something odd"), ErrorClass.UNKNOWN),
+    ])
+    def test_classify(self, error, expected):
+        """Test exception types and yt-dlp messages map to the right class"""
+        assert classify_error(error) == expected
+
+    @patch('app.services.error_classifier.random.uniform', side_effect=lambda low, high: high)
+    def test_backoff_grows_exponentially_up_to_cap(self, mock_uniform):
+        """Test the jitter ceiling doubles per retry and stops at the class maximum"""
+        error = TimeoutError()
+
+        delays = [retry_delay(error, ErrorClass.NETWORK, retries) for retries in range(7)]
+
+        assert delays == [5, 10, 20, 40, 80, 120, 120]
+
+    @patch('app.services.error_classifier.random.uniform', return_value=1.0)
+    def test_rate_limit_retry_after_is_respected(self, mock_uniform):
+        """Test a server retry-after hint is never undercut by jitter"""
+        assert retry_delay(RateLimitError(45), ErrorClass.RATE_LIMITED, 0) == 45
@@ -0,0 +1,124 @@
+"""
+Unit tests for adaptive fragment concurrency
+"""
+import os
+import pytest
+from app.services import fragment_tuner as tuner_module
+from app.services.fragment_tuner import FragmentConcurrencyTuner
+
+MB = 1024 * 1024
+
+
+class TestFragmentConcurrencyTuner:
+    """Test concurrency choices and hill-climbing on throughput"""
+
+    @pytest.fixture(autouse=True)
+    def idle_host(self, monkeypatch):
+        monkeypatch.setattr(tuner_module.settings, 'YTDLP_CONCURRENT_FRAGMENTS', 0)
+        monkeypatch.setattr(tuner_module.settings, 'YTDLP_MAX_CONCURRENT_FRAGMENTS', 8)
+        monkeypatch.setattr(tuner_module.settings, 'YTDLP_FRAGMENT_HOST_BUDGET', 8)
+        monkeypatch.setattr(tuner_module, 'memory_available_ratio', lambda: 0.8)
+        monkeypatch.setattr(tuner_module, 'load_per_cpu', lambda: 0.1)
+
+    @pytest.fixture
+    def tuner(self, tmp_path):
+        tuner = FragmentConcurrencyTuner(tmp_path)
+        tuner._current = 8
+        return tuner
+
+    def _finish(self, tuner, lease, mbps, monkeypatch):
+        """Release lease as if it transferred at mbps over 10 seconds"""
+        lease.watch()(50, {})
+        monkeypatch.setattr(lease, 'download_seconds', lambda: 10.0)
+        tuner.release(lease, int(mbps * 10 * MB))
+
+    def test_fixed_concurrency(self, tuner, monkeypatch):
+        """Test a configured concurrency bypasses tuning"""
+        monkeypatch.setattr(tuner_module.settings, 'YTDLP_CONCURRENT_FRAGMENTS', 3)
+
+        assert tuner.acquire().concurrency == 3
+
+    def test_backs_off_under_pressure(self, tuner, monkeypatch):
+        """Test memory pressure halves and then floors the concurrency"""
+        monkeypatch.setattr(tuner_module, 'memory_available_ratio', lambda: 0.25)
+        assert tuner.acquire().concurrency == 4
+
+        monkeypatch.setattr(tuner_module, 'memory_available_ratio', lambda: 0.1)
+        assert tuner.acquire().concurrency == 1
+
+    def test_floor_follows_process_limiter_thresholds(self, tuner, monkeypatch):
+        """Test the tuner drops to one fragment exactly where the process limiter sheds load"""
+        monkeypatch.setattr(tuner_module.settings, 'PROCESS_LIMIT_MAX_LOAD', 3.0)
+        monkeypatch.setattr(tuner_module, 'load_per_cpu', lambda: 2.0)
+        assert tuner.acquire().concurrency == 4
+
+        monkeypatch.setattr(tuner_module.settings, 'PROCESS_LIMIT_MAX_LOAD', 1.5)
+        assert tuner.acquire().concurrency == 1
+
+    def test_budget_shared_across_processes(self, tuner, tmp_path):
+        """Test leases taken by another worker process shrink this job's share"""
+        other_process = FragmentConcurrencyTuner(tmp_path)
+        other_process._current = 8
+
+        first = other_process.acquire()
+        second = tuner.acquire()
+
+        assert first.concurrency == 8
+        assert second.concurrency == 4
+        assert tuner._active_jobs() == 2
+
+        other_process.release(first, 0)
+        assert tuner._active_jobs() == 1
+
+    def test_stale_lease_is_not_counted(self, tuner, tmp_path):
+        """Test a lease left behind by a crashed worker is dropped"""
+        stale = tmp_path / "fragments-crashed.lock"
+        stale.touch()
+
+        assert tuner._active_jobs() == 0
+        assert not stale.exists()
+
+    def test_release_removes_lease(self, tuner, tmp_path):
+        """Test a released lease leaves no file behind"""
+        lease = tuner.acquire()
+        tuner.release(lease, 0)
+
+        assert os.listdir(tmp_path) == []
+
+    def test_throughput_needs_download_phase(self, tuner):
+        """Test a run that never reported progress teaches the tuner nothing"""
+        lease = tuner.acquire()
+        lease.watch()
+
+        tuner.release(lease, 100 * MB)
+
+        assert tuner._throughput == {}
+
+    def test_watch_forwards_progress(self, tuner):
+        """Test the timing wrapper still reports progress to the job"""
+        seen = []
+        lease = tuner.acquire()
+
+        lease.watch(lambda progress, stats: seen.append(progress))(42, {})
+
+        assert seen == [42]
+        assert lease.download_seconds() >= 0
+        tuner.release(lease, 0)
+
+    def test_keeps_climbing_while_throughput_improves(self, tuner, monkeypatch):
+        """Test better throughput at a higher level keeps moving up"""
+        tuner._current = 2
+        self._finish(tuner, tuner.acquire(), 2.0, monkeypatch)
+        assert tuner._current == 3
+
+        self._finish(tuner, tuner.acquire(), 3.0, monkeypatch)
+        assert tuner._current == 4
+
+    def test_reverses_when_throughput_stops_improving(self, tuner, monkeypatch):
+        """Test no gain over the previous level turns the climb around"""
+        tuner._current = 2
+        self._finish(tuner, tuner.acquire(), 2.0, monkeypatch)
+        self._finish(tuner, tuner.acquire(), 2.0, monkeypatch)
+
+        assert tuner._direction == -1
+        assert tuner._current == 2
@@ -0,0 +1,65 @@
+"""
+Unit tests for the job cancellation flag
+"""
+import pytest
+from unittest.mock import MagicMock
+from app.exceptions import JobCancelledError
+from app.services.job_cancellation import JobCancellation
+
+
+class TestJobCancellation:
+    """Test setting and polling the per-job cancellation flag"""
+
+    @pytest.fixture
+    def cancellation(self):
+        cancellation = JobCancellation()
+        cancellation.redis_client = MagicMock()
+        cancellation.redis_client.exists.return_value = 0
+        return cancellation
+
+    def test_request_sets_expiring_flag(self, cancellation, monkeypatch):
+        """Test a cancel request stores the flag with a TTL"""
+        monkeypatch.setattr('app.services.job_cancellation.settings.JOB_CANCEL_TTL', 600)
+
+        assert cancellation.request("job-1")
+        cancellation.redis_client.setex.assert_called_once_with("job:cancel:job-1", 600, 1)
+
+    def test_raise_if_cancelled(self, cancellation):
+        """Test the stage checkpoint raises only for cancelled jobs"""
+        cancellation.raise_if_cancelled("job-1")
+
+        cancellation.redis_client.exists.return_value = 1
+        with pytest.raises(JobCancelledError):
+            cancellation.raise_if_cancelled("job-1")
+
+    def test_checker(self, cancellation, monkeypatch):
+        """Test the watchdog callback polls the job's flag"""
+        monkeypatch.setattr('app.services.job_cancellation.settings.JOB_CANCEL_POLL_INTERVAL', 0)
+        assert cancellation.checker(None) is None
+
+        check = cancellation.checker("job-1")
+        assert not check()
+        cancellation.redis_client.exists.return_value = 1
+        assert check()
+        cancellation.redis_client.exists.assert_called_with("job:cancel:job-1")
+
+    def test_checker_caches_negative_answers(self, cancellation, monkeypatch):
+        """Test the watchdog callback hits Redis at most once per poll interval"""
+        monkeypatch.setattr('app.services.job_cancellation.settings.JOB_CANCEL_POLL_INTERVAL', 60)
+        check = cancellation.checker("job-1")
+
+        assert not check()
+        cancellation.redis_client.exists.return_value = 1
+        assert not check()
+        assert cancellation.redis_client.exists.call_count == 1
+
+        monkeypatch.setattr('app.services.job_cancellation.settings.JOB_CANCEL_POLL_INTERVAL', 0)
+        assert check()
+        assert check()
+        assert cancellation.redis_client.exists.call_count == 2
+
+    def test_redis_errors_do_not_cancel(self, cancellation):
+        """Test an unreachable Redis never cancels a job"""
+        cancellation.redis_client.exists.side_effect = Exception("down")
+
+        assert not cancellation.is_cancelled("job-1")
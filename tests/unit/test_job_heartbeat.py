@@ -0,0 +1,77 @@
+"""
+Unit tests for running-job heartbeats
+"""
+import time
+import pytest
+from unittest.mock import MagicMock
+from app.services.job_heartbeat import JobHeartbeat
+
+
+class TestJobHeartbeat:
+    """Test heartbeat refresh and liveness lookups"""
+
+    @pytest.fixture
+    def heartbeat(self, monkeypatch):
+        monkeypatch.setattr('app.services.job_heartbeat.settings.JOB_HEARTBEAT_INTERVAL', 0.02)
+        monkeypatch.setattr('app.services.job_heartbeat.settings.JOB_HEARTBEAT_TTL', 60)
+        heartbeat = JobHeartbeat()
+        heartbeat.redis_client = MagicMock()
+        return heartbeat
+
+    def test_running_refreshes_and_clears(self, heartbeat):
+        """Test the key is refreshed while the job runs and removed afterwards"""
+        with heartbeat.running("job-1"):
+            time.sleep(0.1)
+
+        key = "job:heartbeat:job-1"
+        assert heartbeat.redis_client.setex.call_count >= 3
+        heartbeat.redis_client.setex.assert_called_with(key, 60, heartbeat.owner)
+        heartbeat.redis_client.delete.assert_called_once_with(key)
+
+        calls = heartbeat.redis_client.setex.call_count
+        time.sleep(0.05)
+        assert heartbeat.redis_client.setex.call_count == calls
+
+    def test_running_clears_on_error(self, heartbeat):
+        """Test a failing job stops its heartbeat"""
+        with pytest.raises(ValueError):
+            with heartbeat.running("job-1"):
+                raise ValueError("boom")
+
+        heartbeat.redis_client.delete.assert_called_once_with("job:heartbeat:job-1")
+
+    def test_running_clears_after_beat_in_flight(self, heartbeat):
+        """Test a slow refresh cannot recreate the key after it was cleared"""
+        heartbeat.redis_client.setex.side_effect = lambda *args: time.sleep(0.05)
+
+        with heartbeat.running("job-1"):
+            time.sleep(0.03)
+
+        assert heartbeat.redis_client.method_calls[-1][0] == 'delete'
+
+    def test_keep_alive_runs_on_each_beat_until_job_ends(self, heartbeat):
+        """Test state riding on the heartbeat is refreshed only while the job runs"""
+        refreshed = []
+
+        with heartbeat.running("job-1"):
+            heartbeat.keep_alive("job-1", lambda: refreshed.append(1))
+            time.sleep(0.1)
+
+        assert len(refreshed) >= 3
+        count = len(refreshed)
+        heartbeat.beat("job-1")
+        assert len(refreshed) == count
+
+    def test_alive(self, heartbeat):
+        """Test only jobs with a heartbeat key count as alive"""
+        heartbeat.redis_client.mget.return_value = ["host:1", None]
+
+        assert heartbeat.alive(["job-1", "job-2"]) == {"job-1"}
+        assert heartbeat.alive([]) == set()
+
+    def test_alive_raises_when_redis_fails(self, heartbeat):
+        """Test an outage is not mistaken for dead workers"""
+        heartbeat.redis_client.mget.side_effect = Exception("down")
+
+        with pytest.raises(Exception):
+            heartbeat.alive(["job-1"])
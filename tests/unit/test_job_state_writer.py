@@ -0,0 +1,135 @@
+"""
+Unit tests for write-behind job status updates
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.queue.job_state_writer import JobStateWriter
+
+
+class TestJobStateWriter:
+    """Test WebSocket fan-out and coalesced database writes"""
+
+    @pytest.fixture(autouse=True)
+    def manager(self):
+        """Capture WebSocket publishes"""
+        with patch('app.queue.job_state_writer.manager') as mock_manager:
+            mock_manager.send_update = AsyncMock()
+            yield mock_manager
+
+    @pytest.fixture
+    def db(self):
+        db = MagicMock()
+        db.downloads.bulk_write = AsyncMock()
+        return db
+
+    @pytest.fixture
+    def writer(self, monkeypatch):
+        monkeypatch.setattr('app.queue.job_state_writer.settings.JOB_STATE_FLUSH_INTERVAL', 60)
+        return JobStateWriter()
+
+    def _writes(self, db):
+        return [[op._doc['$set'] for op in call.args[0]] for call in db.downloads.bulk_write.call_args_list]
+
+    @pytest.mark.asyncio
+    async def test_progress_is_published_but_coalesced(self, writer, db, manager):
+        """Test progress-only updates reach WebSocket every time and Mongo once"""
+        await writer.update(db, "job-1", 'processing', progress=5)
+        for progress in (30, 50, 70, 90):
+            await writer.update(db, "job-1", 'processing', progress=progress)
+
+        assert manager.send_update.await_count == 5
+        assert db.downloads.bulk_write.await_count == 1
+
+        await writer.update(db, "job-1", 'completed', progress=100, downloadUrl="https://x")
+
+        writes = self._writes(db)
+        assert len(writes) == 2
+        assert writes[1][0]['status'] == 'completed'
+        assert writes[1][0]['progress'] == 100
+
+    @pytest.mark.asyncio
+    async def test_transitions_flush_other_jobs_in_one_batch(self, writer, db):
+        """Test buffered progress of other jobs rides along with a transition"""
+        await writer.update(db, "job-1", 'processing', progress=5)
+        await writer.update(db, "job-2", 'processing', progress=5)
+        await writer.update(db, "job-1", 'processing', progress=40)
+
+        await writer.update(db, "job-2", 'failed', error="boom")
+
+        last_batch = self._writes(db)[-1]
+        assert {fields['status'] for fields in last_batch} == {'processing', 'failed'}
+        assert len(last_batch) == 2
+
+    @pytest.mark.asyncio
+    async def test_interval_bounds_staleness(self, writer, db, monkeypatch):
+        """Test progress is persisted once the flush interval has elapsed"""
+        monkeypatch.setattr('app.queue.job_state_writer.settings.JOB_STATE_FLUSH_INTERVAL', 0)
+
+        await writer.update(db, "job-1", 'processing', progress=5)
+        await writer.update(db, "job-1", 'processing', progress=20)
+
+        assert db.downloads.bulk_write.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_write_is_retried_with_next_flush(self, writer, db, monkeypatch):
+        """Test a database error keeps progress fields for the next flush"""
+        monkeypatch.setattr('app.queue.job_state_writer.settings.JOB_STATE_FLUSH_INTERVAL', 0)
+        db.downloads.bulk_write.side_effect = [None, Exception("down"), None]
+
+        await writer.update(db, "job-1", 'processing', progress=5)
+        await writer.update(db, "job-1", 'processing', progress=10)
+        await writer.update(db, "job-1", 'processing', progress=20)
+
+        assert db.downloads.bulk_write.await_count == 3
+        assert self._writes(db)[-1][0]['progress'] == 20
+
+    @pytest.mark.asyncio
+    async def test_timer_flushes_buffered_progress(self, writer, db, monkeypatch):
+        """Test buffered progress is written after the interval without another update"""
+        monkeypatch.setattr('app.queue.job_state_writer.settings.JOB_STATE_FLUSH_INTERVAL', 0.05)
+
+        await writer.update(db, "job-1", 'processing', progress=5)
+        await writer.update(db, "job-1", 'processing', progress=30)
+        assert db.downloads.bulk_write.await_count == 1
+
+        await asyncio.sleep(0.1)
+
+        assert db.downloads.bulk_write.await_count == 2
+        assert self._writes(db)[-1][0]['progress'] == 30
+
+    @pytest.mark.asyncio
+    async def test_transition_cancels_timer(self, writer, db):
+        """Test a transition that writes everything leaves no timer behind"""
+        await writer.update(db, "job-1", 'processing', progress=5)
+        await writer.update(db, "job-1", 'processing', progress=30)
+        timer = writer._flush_timer
+
+        await writer.update(db, "job-1", 'completed', progress=100)
+        await asyncio.sleep(0)
+
+        assert timer.cancelled()
+        assert writer._flush_timer is None
+
+    @pytest.mark.asyncio
+    @patch('app.queue.job_state_writer.asyncio.sleep', new_callable=AsyncMock)
+    async def test_transition_write_is_retried(self, mock_sleep, writer, db):
+        """Test a failed status transition is retried before the update returns"""
+        db.downloads.bulk_write.side_effect = [Exception("primary stepped down"), None]
+
+        await writer.update(db, "job-1", 'completed', progress=100)
+
+        assert db.downloads.bulk_write.await_count == 2
+        assert self._writes(db)[-1][0]['status'] == 'completed'
+
+    @pytest.mark.asyncio
+    @patch('app.queue.job_state_writer.asyncio.sleep', new_callable=AsyncMock)
+    async def test_transition_write_failure_raises(self, mock_sleep, writer, db, monkeypatch):
+        """Test a transition that still cannot be written raises instead of being lost"""
+        monkeypatch.setattr('app.queue.job_state_writer.settings.JOB_STATE_WRITE_RETRIES', 2)
+        db.downloads.bulk_write.side_effect = Exception("down")
+
+        with pytest.raises(Exception, match="down"):
+            await writer.update(db, "job-1", 'failed', error="boom")
+
+        assert db.downloads.bulk_write.await_count == 3
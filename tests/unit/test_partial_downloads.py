@@ -0,0 +1,81 @@
+"""
+Unit tests for the resumable partial download registry
+"""
+import os
+import time
+import pytest
+from unittest.mock import MagicMock
+from app.services.partial_downloads import PartialDownloadRegistry
+
+
+class TestPartialDownloadRegistry:
+    """Test claiming, completing and collecting partial directories"""
+
+    @pytest.fixture
+    def registry(self, tmp_path):
+        """Create registry rooted in tmp_path with a mocked Redis"""
+        registry = PartialDownloadRegistry(tmp_path / "partial")
+        registry.redis_client = MagicMock()
+        registry.redis_client.exists.return_value = 0
+        return registry
+
+    def _age(self, directory, seconds):
+        past = time.time() - seconds
+        for path in [directory, *directory.iterdir()]:
+            os.utime(path, (past, past))
+
+    def test_retry_gets_same_directory_with_partial_files(self, registry):
+        """Test a second attempt of a job sees the first attempt's .part file"""
+        first = registry.claim("job-1", "vid")
+        (first / "vid.mp4.part").write_bytes(b"x" * 10)
+
+        second = registry.claim("job-1", "vid")
+
+        assert second == first
+        assert (second / "vid.mp4.part").exists()
+        assert registry.redis_client.setex.call_args[0][0] == "download:partial:job-1"
+
+    def test_unsafe_job_id_is_hashed(self, registry):
+        """Test job ids never escape the partial root"""
+        directory = registry.claim("../../etc", "vid")
+
+        assert directory.parent == registry.root
+
+    def test_complete_removes_files_and_entry(self, registry):
+        """Test finished downloads leave nothing behind"""
+        directory = registry.claim("job-1", "vid")
+
+        registry.complete("job-1")
+
+        assert not directory.exists()
+        registry.redis_client.delete.assert_called_once_with("download:partial:job-1")
+
+    def test_gc_removes_unregistered_idle_directories(self, registry):
+        """Test abandoned partials are collected but live and fresh ones kept"""
+        abandoned = registry.claim("abandoned", "vid")
+        (abandoned / "vid.mp4.part").write_bytes(b"x")
+        self._age(abandoned, 600)
+        live = registry.claim("live", "vid")
+        self._age(live, 600)
+        fresh = registry.claim("fresh", "vid")
+        registry.redis_client.exists.side_effect = lambda key: key.endswith(":live")
+
+        assert registry.gc() == 1
+
+        assert not abandoned.exists()
+        assert live.exists()
+        assert fresh.exists()
+
+    def test_gc_falls_back_to_ttl_without_redis(self, registry, monkeypatch):
+        """Test only partials idle past the TTL are collected when Redis is down"""
+        monkeypatch.setattr('app.services.partial_downloads.settings.PARTIAL_DOWNLOAD_TTL', 3600)
+        registry.redis_client = None
+        recent = registry.claim("recent", "vid")
+        self._age(recent, 600)
+        stale = registry.claim("stale", "vid")
+        self._age(stale, 7200)
+
+        registry.gc()
+
+        assert recent.exists()
+        assert not stale.exists()
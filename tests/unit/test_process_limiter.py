@@ -0,0 +1,130 @@
+"""
+Unit tests for the adaptive process limiter
+"""
+import signal
+import pytest
+from unittest.mock import patch
+from app.exceptions import WorkerOverloadedError
+from app.services import process_limiter as limiter_module
+from app.services.process_limiter import ProcessLimiter
+
+
+class TestProcessLimiter:
+    """Test slot accounting and AIMD adjustments"""
+
+    @pytest.fixture
+    def limiter(self, tmp_path, monkeypatch):
+        """Create limiter with slots under tmp_path on an idle host"""
+        monkeypatch.setattr(limiter_module.settings, 'PROCESS_LIMIT_ENABLED', True)
+        monkeypatch.setattr(limiter_module.settings, 'PROCESS_LIMIT_DIR', str(tmp_path))
+        monkeypatch.setattr(limiter_module.settings, 'PROCESS_LIMIT_INITIAL', 2)
+        monkeypatch.setattr(limiter_module.settings, 'PROCESS_LIMIT_MIN', 1)
+        monkeypatch.setattr(limiter_module.settings, 'PROCESS_LIMIT_MAX', 4)
+        monkeypatch.setattr(limiter_module.settings, 'PROCESS_LIMIT_WAIT_TIMEOUT', 0)
+        monkeypatch.setattr(limiter_module.settings, 'PROCESS_LIMIT_PRESSURE_INTERVAL', 0)
+        monkeypatch.setattr(limiter_module, 'memory_available_ratio', lambda: 0.8)
+        monkeypatch.setattr(limiter_module, 'load_per_cpu', lambda: 0.1)
+        monkeypatch.setattr(limiter_module, 'POLL_INTERVAL', 0)
+        return ProcessLimiter()
+
+    def limit(self, limiter):
+        return int(limiter._update_state(lambda state: None)['limit'])
+
+    def test_queues_beyond_limit(self, limiter):
+        """Test a third process cannot start while two slots are held"""
+        first = limiter.acquire('yt-dlp')
+        second = limiter.acquire('yt-dlp')
+
+        with pytest.raises(WorkerOverloadedError):
+            limiter.acquire('ffmpeg')
+
+        limiter.release(first)
+        third = limiter.acquire('ffmpeg')
+        assert third is not None
+        limiter.release(second)
+        limiter.release(third)
+
+    def test_success_increases_limit(self, limiter):
+        """Test each healthy run grows the limit by one up to the maximum"""
+        for _ in range(5):
+            with limiter.slot('yt-dlp'):
+                pass
+
+        assert self.limit(limiter) == 4
+
+    def test_low_memory_halves_limit(self, limiter, monkeypatch):
+        """Test memory pressure halves the limit before spawning"""
+        for _ in range(2):
+            with limiter.slot('yt-dlp'):
+                pass
+        monkeypatch.setattr(limiter_module, 'memory_available_ratio', lambda: 0.05)
+
+        limiter.release(limiter.acquire('yt-dlp'))
+
+        assert self.limit(limiter) == 2
+
+    def test_timeouts_lower_limit(self, limiter, monkeypatch):
+        """Test a run of timeouts pushes the limit down"""
+        monkeypatch.setattr(limiter_module.settings, 'PROCESS_LIMIT_MAX_TIMEOUT_RATE', 0.3)
+
+        for _ in range(2):
+            with pytest.raises(TimeoutError):
+                with limiter.slot('yt-dlp'):
+                    raise TimeoutError()
+
+        assert self.limit(limiter) == 1
+
+    def test_unrelated_failures_leave_limit_alone(self, limiter):
+        """Test failures that are not host pressure do not move the limit"""
+        with pytest.raises(ValueError):
+            with limiter.slot('yt-dlp'):
+                raise ValueError("bad url")
+
+        assert self.limit(limiter) == 2
+
+    def test_failed_exit_does_not_grow_limit(self, limiter):
+        """Test a child that exited nonzero is released without growing the limit"""
+        with limiter.slot('yt-dlp') as slot:
+            slot.record_exit(1)
+
+        assert self.limit(limiter) == 2
+
+    def test_oom_kill_halves_limit(self, limiter, monkeypatch):
+        """Test a child SIGKILLed by the kernel lowers the limit like host pressure"""
+        for _ in range(2):
+            with limiter.slot('yt-dlp'):
+                pass
+        monkeypatch.setattr(limiter_module, 'DECREASE_COOLDOWN', 0)
+
+        with limiter.slot('yt-dlp') as slot:
+            slot.record_exit(-signal.SIGKILL)
+
+        assert self.limit(limiter) == 2
+
+    def test_watchdog_kill_is_not_oom(self, limiter):
+        """Test a SIGKILL sent by our own watchdog is not mistaken for the OOM killer"""
+        with limiter.slot('yt-dlp') as slot:
+            slot.record_exit(-signal.SIGKILL, killed=True)
+
+        assert not slot.oom_killed
+        assert slot.failed
+
+    def test_pressure_sampled_at_interval(self, limiter, monkeypatch):
+        """Test waiters reuse the last limit instead of sampling the host on every poll"""
+        monkeypatch.setattr(limiter_module.settings, 'PROCESS_LIMIT_PRESSURE_INTERVAL', 60)
+        samples = []
+        monkeypatch.setattr(limiter_module, 'memory_available_ratio', lambda: samples.append(1) or 0.8)
+
+        for _ in range(3):
+            limiter.release(limiter.acquire('yt-dlp'))
+
+        # One pressure sample, plus one per release recording the healthy run
+        assert len(samples) == 4
+
+    @patch('app.services.process_limiter.settings')
+    def test_disabled_limiter_grants_nothing(self, mock_settings):
+        """Test the limiter is a no-op when disabled"""
+        mock_settings.PROCESS_LIMIT_ENABLED = False
+
+        with ProcessLimiter().slot('yt-dlp') as slot:
+            assert slot is None
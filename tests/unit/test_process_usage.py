@@ -0,0 +1,101 @@
+"""
+Unit tests for child process resource accounting
+"""
+import asyncio
+import subprocess
+import sys
+import time
+import pytest
+from app.services.job_context import JobContext
+from app.utils.process_usage import ProcessUsage, has_exited, run_with_usage, run_with_usage_async, wait_with_usage
+
+
+class TestProcessUsage:
+    """Test rusage collection for finished children"""
+
+    def test_run_collects_output_and_usage(self):
+        """Test run_with_usage behaves like subprocess.run and reports usage"""
+        result, usage = run_with_usage(
+            [sys.executable, '-c', 'import sys; sum(range(2_000_000)); print("out"); print("err", file=sys.stderr); sys.exit(3)'],
+            timeout=30
+        )
+
+        assert result.returncode == 3
+        assert result.stdout.strip() == "out"
+        assert result.stderr.strip() == "err"
+        assert usage.processes == 1
+        assert usage.cpu_seconds > 0
+        assert usage.max_rss_bytes > 1024 * 1024
+
+    def test_run_timeout_kills_child(self):
+        """Test a slow child is killed and TimeoutExpired raised"""
+        started = []
+
+        with pytest.raises(subprocess.TimeoutExpired):
+            run_with_usage([sys.executable, '-c', 'import time; time.sleep(30)'], timeout=0.3, on_start=started.append)
+
+        assert started[0].returncode is not None
+
+    @pytest.mark.asyncio
+    async def test_async_run_collects_output_and_usage(self):
+        """Test the event-loop variant returns the same result and rusage"""
+        result, usage = await run_with_usage_async(
+            [sys.executable, '-c', 'import sys; sum(range(2_000_000)); print("out"); print("err", file=sys.stderr); sys.exit(3)'],
+            timeout=30
+        )
+
+        assert result.returncode == 3
+        assert result.stdout.strip() == "out"
+        assert result.stderr.strip() == "err"
+        assert usage.processes == 1
+        assert usage.cpu_seconds > 0
+
+    @pytest.mark.asyncio
+    async def test_async_run_timeout_kills_child(self):
+        """Test a slow child is killed and asyncio.TimeoutError raised"""
+        started = []
+
+        with pytest.raises(asyncio.TimeoutError):
+            await run_with_usage_async([sys.executable, '-c', 'import time; time.sleep(30)'], timeout=0.3, on_start=started.append)
+
+        assert started[0].returncode is not None
+
+    def test_has_exited_does_not_reap(self):
+        """Test the watchdog check leaves the exit status for wait_with_usage"""
+        started = time.monotonic()
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        while not has_exited(process):
+            time.sleep(0.01)
+
+        usage = wait_with_usage(process, started)
+
+        assert process.returncode == 0
+        assert usage is not None
+
+    def test_job_context_aggregates_per_operation(self):
+        """Test usage from several runs is summed per operation"""
+        context = JobContext(job_id="job-1")
+        context.add_usage('download', ProcessUsage(1.0, 0.5, 100, 10, 20, 2.0, 1))
+        context.add_usage('download', ProcessUsage(2.0, 0.5, 300, 0, 5, 3.0, 1))
+
+        summary = context.usage_summary()['download']
+
+        assert summary['cpuUserSeconds'] == 3.0
+        assert summary['maxRssBytes'] == 300
+        assert summary['writeBytes'] == 25
+        assert summary['processes'] == 2
+
+    def test_job_download_timeout_ends_before_soft_time_limit(self, monkeypatch):
+        """Test the download deadline leaves upload headroom before Celery's soft limit"""
+        monkeypatch.setattr('app.services.job_context.settings.YTDLP_DOWNLOAD_TIMEOUT', 300)
+        monkeypatch.setattr('app.services.job_context.settings.CELERY_TASK_SOFT_TIME_LIMIT', 240)
+        monkeypatch.setattr('app.services.job_context.settings.TASK_UPLOAD_HEADROOM', 60)
+
+        context = JobContext(job_id="job-1", started_at=time.monotonic() - 100)
+        assert 79 <= context.download_timeout() <= 80
+
+        context = JobContext(job_id="job-1", started_at=time.monotonic() - 1000)
+        assert context.download_timeout() == 1.0
+
+        monkeypatch.setattr('app.services.job_context.settings.YTDLP_DOWNLOAD_TIMEOUT', 30)
+        assert JobContext(job_id="job-1").download_timeout() == 30
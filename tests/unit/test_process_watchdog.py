@@ -0,0 +1,69 @@
+"""
+Unit tests for the downloader process watchdog
+"""
+import subprocess
+import sys
+import pytest
+from unittest.mock import patch
+from app.services.process_watchdog import ProcessWatchdog
+
+
+def _spawn(code: str) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, "-c", code], start_new_session=True)
+
+
+class TestProcessWatchdog:
+    """Test deadline and stall enforcement"""
+
+    @pytest.fixture(autouse=True)
+    def fast_checks(self, monkeypatch):
+        monkeypatch.setattr(ProcessWatchdog, 'CHECK_INTERVAL', 0.05)
+
+    @patch('app.services.process_watchdog.record_watchdog_kill')
+    def test_kills_stalled_process(self, mock_record):
+        """Test a child with no progress is killed and the reason recorded"""
+        process = _spawn("import time; time.sleep(30)")
+        watchdog = ProcessWatchdog(process, total_timeout=30, stall_timeout=0.2).start()
+
+        process.wait(timeout=5)
+        watchdog.stop()
+
+        assert watchdog.fired
+        assert "stalled" in watchdog.reason
+        mock_record.assert_called_once_with("yt-dlp", "stall")
+
+    @patch('app.services.process_watchdog.record_watchdog_kill')
+    def test_enforces_total_timeout(self, mock_record):
+        """Test the deadline applies even while the child keeps making progress"""
+        process = _spawn("import time; time.sleep(30)")
+        watchdog = ProcessWatchdog(process, total_timeout=0.3, stall_timeout=0).start()
+
+        process.wait(timeout=5)
+        watchdog.stop()
+
+        assert "timed out" in watchdog.reason
+        mock_record.assert_called_once_with("yt-dlp", "timeout")
+
+    @patch('app.services.process_watchdog.record_watchdog_kill')
+    def test_leaves_finished_process_alone(self, mock_record):
+        """Test a child that exits normally is not reported"""
+        process = _spawn("pass")
+        watchdog = ProcessWatchdog(process, total_timeout=30, stall_timeout=30).start()
+
+        process.wait(timeout=5)
+        watchdog.stop()
+
+        assert not watchdog.fired
+        mock_record.assert_not_called()
+
+    @patch('app.services.process_watchdog.record_watchdog_kill')
+    def test_kills_cancelled_job(self, mock_record):
+        """Test a child whose job was cancelled is killed without counting as a timeout"""
+        process = _spawn("import time; time.sleep(30)")
+        watchdog = ProcessWatchdog(process, total_timeout=30, stall_timeout=30, cancelled=lambda: True).start()
+
+        process.wait(timeout=5)
+        watchdog.stop()
+
+        assert watchdog.was_cancelled
+        mock_record.assert_called_once_with("yt-dlp", "cancelled")
@@ -0,0 +1,102 @@
+"""
+Unit tests for the thread-to-loop progress bridge
+"""
+import asyncio
+import threading
+import time
+import pytest
+from app.queue.progress_bridge import ProgressBridge
+
+
+def _download(callback, updates, pause=0.0):
+    """Stand-in for a download thread reporting progress"""
+    for progress in updates:
+        callback(progress, {'downloadedBytes': progress})
+        if pause:
+            time.sleep(pause)
+    return "done"
+
+
+class TestProgressBridge:
+    """Test forwarding and throttling of progress updates"""
+
+    @pytest.mark.asyncio
+    async def test_forwards_thread_updates_without_polling(self):
+        """Test updates from a worker thread reach the loop and the result is returned"""
+        emitted = []
+
+        async def emit(progress, stats):
+            emitted.append((progress, stats))
+
+        bridge = ProgressBridge(emit, initial=10, min_delta=1, min_interval=0)
+        loop = asyncio.get_event_loop()
+
+        result = await bridge.run(loop.run_in_executor(None, _download, bridge.callback, [20, 30, 40], 0.02))
+
+        assert result == "done"
+        assert [p for p, _ in emitted] == [20, 30, 40]
+        assert emitted[0][1] == {'downloadedBytes': 20}
+
+    @pytest.mark.asyncio
+    async def test_small_and_stale_updates_are_dropped(self):
+        """Test updates below min_delta or not above the last emitted value are skipped"""
+        emitted = []
+
+        async def emit(progress, stats):
+            emitted.append(progress)
+
+        bridge = ProgressBridge(emit, initial=10, min_delta=5, min_interval=0)
+        loop = asyncio.get_event_loop()
+
+        await bridge.run(loop.run_in_executor(None, _download, bridge.callback, [12, 16, 14, 18, 30], 0.02))
+
+        assert emitted == [16, 30]
+
+    @pytest.mark.asyncio
+    async def test_interval_coalesces_bursts(self):
+        """Test a burst within min_interval collapses into the newest update"""
+        emitted = []
+
+        async def emit(progress, stats):
+            emitted.append(progress)
+
+        bridge = ProgressBridge(emit, initial=0, min_delta=1, min_interval=0.2)
+        loop = asyncio.get_event_loop()
+
+        def burst(callback):
+            _download(callback, [10])
+            time.sleep(0.05)
+            _download(callback, [20, 30, 40])
+            time.sleep(0.4)
+
+        await bridge.run(loop.run_in_executor(None, burst, bridge.callback))
+
+        assert emitted == [10, 40]
+
+    @pytest.mark.asyncio
+    async def test_work_errors_propagate(self):
+        """Test a failing download raises out of run()"""
+        async def emit(progress, stats):
+            pass
+
+        bridge = ProgressBridge(emit, min_delta=1, min_interval=0)
+
+        async def fail():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            await bridge.run(fail())
+
+    def test_callback_after_loop_closed_is_ignored(self):
+        """Test a late callback from the thread does not raise"""
+        loop = asyncio.new_event_loop()
+
+        async def make():
+            return ProgressBridge(lambda p, s: None, min_delta=1, min_interval=0)
+
+        bridge = loop.run_until_complete(make())
+        loop.close()
+
+        thread = threading.Thread(target=bridge.callback, args=(50,))
+        thread.start()
+        thread.join()
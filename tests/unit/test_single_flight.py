@@ -0,0 +1,140 @@
+"""
+Unit tests for single-flight coordination of jobs for the same video
+"""
+import pytest
+from unittest.mock import MagicMock
+from app.services.single_flight import SingleFlight, _REFRESH_SCRIPT, _RELEASE_SCRIPT
+
+
+class FakeRedis:
+    """Just enough of a Redis client for the lock, with expiry on a fake clock"""
+
+    def __init__(self):
+        self.data = {}
+        self.expires_at = {}
+        self.now = 0.0
+
+    def advance(self, seconds):
+        self.now += seconds
+        for key, expires_at in list(self.expires_at.items()):
+            if expires_at <= self.now:
+                self.data.pop(key, None)
+                del self.expires_at[key]
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        if ex:
+            self.expires_at[key] = self.now + ex
+        return True
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def expire(self, key, seconds):
+        if key not in self.data:
+            return False
+        self.expires_at[key] = self.now + seconds
+        return True
+
+    def register_script(self, script):
+        def release(keys, args):
+            if self.data.get(keys[0]) == args[0]:
+                del self.data[keys[0]]
+                self.expires_at.pop(keys[0], None)
+                return 1
+            return 0
+
+        def refresh(keys, args):
+            if self.data.get(keys[0]) == args[0]:
+                self.expires_at[keys[0]] = self.now + args[1] / 1000
+                return 1
+            return 0
+        return refresh if 'PEXPIRE' in script else release
+
+
+class TestSingleFlight:
+    """Test leader election, follower deferral and lock release"""
+
+    @pytest.fixture
+    def flight(self, monkeypatch):
+        monkeypatch.setattr('app.services.single_flight.settings.SINGLE_FLIGHT_ENABLED', True)
+        monkeypatch.setattr('app.services.single_flight.settings.SINGLE_FLIGHT_WAIT_TIMEOUT', 180)
+        monkeypatch.setattr('app.services.single_flight.settings.SINGLE_FLIGHT_LOCK_TTL', 60)
+        flight = SingleFlight()
+        flight.redis_client = FakeRedis()
+        flight._release = flight.redis_client.register_script(_RELEASE_SCRIPT)
+        flight._refresh = flight.redis_client.register_script(_REFRESH_SCRIPT)
+        return flight
+
+    def test_first_job_becomes_leader(self, flight):
+        """Test the first job for a video takes the lock"""
+        assert flight.join("vid", "job-1") == SingleFlight.LEADER
+        assert flight.redis_client.get("singleflight:lock:vid") == "job-1"
+
+    def test_leader_keeps_lock_when_rerun(self, flight):
+        """Test a retried or requeued leader does not defer to itself"""
+        flight.join("vid", "job-1")
+
+        assert flight.join("vid", "job-1") == SingleFlight.LEADER
+
+    def test_follower_defers_while_leader_runs(self, flight):
+        """Test a second job goes back on the queue instead of downloading"""
+        flight.join("vid", "job-1")
+
+        assert flight.join("vid", "job-2") == SingleFlight.DEFER
+        assert flight.join("vid", "job-2", waited=165) == SingleFlight.DEFER
+
+    def test_follower_leads_after_release(self, flight):
+        """Test releasing the lock lets the next check of a follower take over"""
+        flight.join("vid", "job-1")
+        flight.join("vid", "job-2")
+
+        flight.release("vid", "job-1")
+
+        assert flight.join("vid", "job-2", waited=15) == SingleFlight.LEADER
+
+    def test_release_by_non_owner_keeps_lock(self, flight):
+        """Test a job that lost the lock cannot release the new leader's"""
+        flight.join("vid", "job-1")
+
+        flight.release("vid", "job-2")
+
+        assert flight.join("vid", "job-2") == SingleFlight.DEFER
+
+    def test_long_running_leader_keeps_lock(self, flight):
+        """Test heartbeat refreshes keep the lock well past its TTL"""
+        flight.join("vid", "job-1")
+
+        for _ in range(40):
+            flight.redis_client.advance(15)
+            assert flight.refresh("vid", "job-1")
+
+        assert flight.redis_client.get("singleflight:lock:vid") == "job-1"
+        assert flight.join("vid", "job-2", waited=15) == SingleFlight.DEFER
+
+    def test_dead_leader_lock_lapses(self, flight):
+        """Test a leader that stops refreshing frees the video for a follower"""
+        flight.join("vid", "job-1")
+
+        flight.redis_client.advance(61)
+
+        assert flight.join("vid", "job-2", waited=60) == SingleFlight.LEADER
+        # The old leader cannot extend the new leader's lock
+        assert not flight.refresh("vid", "job-1")
+
+    def test_follower_timeout_proceeds_uncoordinated(self, flight):
+        """Test a follower stops deferring once the leader takes too long"""
+        flight.join("vid", "job-1")
+
+        assert flight.join("vid", "job-2", waited=180) == SingleFlight.UNCOORDINATED
+        # The leader still owns the lock
+        assert flight.redis_client.get("singleflight:lock:vid") == "job-1"
+
+    def test_fails_open_without_redis(self, flight):
+        """Test a Redis outage never blocks downloads"""
+        flight.redis_client = MagicMock()
+        flight.redis_client.set.side_effect = ConnectionError("down")
+
+        assert flight.join("vid", "job-2") == SingleFlight.LEADER
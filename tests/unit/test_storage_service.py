@@ -148,3 +148,93 @@ class TestMultiStorageService:
             # Cleanup
             if os.path.exists(temp_file):
                 os.remove(temp_file)
+
+
+class FakeStream:
+    """Producer for upload_stream: serves chunks, then close() reports how the producer ended"""
+
+    def __init__(self, chunks, error=None):
+        self.chunks = list(chunks)
+        self.error = error
+        self.closed = False
+
+    def read(self, size=-1):
+        return self.chunks.pop(0) if self.chunks else b""
+
+    def close(self):
+        self.closed = True
+        if self.error:
+            raise self.error
+
+
+class TestStreamUpload:
+    """Test streamed uploads commit complete streams and abort failed ones"""
+
+    @pytest.fixture
+    def storage_service(self, monkeypatch):
+        monkeypatch.setattr('app.services.storage_service.settings.STREAM_UPLOAD_CHUNK_SIZE', 4)
+        return MultiStorageService()
+
+    @pytest.fixture
+    def mock_tracker(self):
+        with patch('app.services.storage_service.storage_tracker') as mock_tracker:
+            mock_tracker.add_file_usage = AsyncMock()
+            yield mock_tracker
+
+    @pytest.mark.asyncio
+    @patch('app.services.storage_service.multi_storage')
+    async def test_stream_to_gcs(self, mock_multi, mock_tracker, storage_service):
+        """Test a complete stream is written in chunks and committed"""
+        mock_tracker.get_available_providers_under_limit = AsyncMock(return_value=['gcs'])
+        mock_writer = MagicMock()
+        mock_blob = mock_multi.get_gcs_bucket.return_value.blob.return_value
+        mock_blob.open.return_value = mock_writer
+        stream = FakeStream([b"abcd", b"efgh", b"ij"])
+
+        with patch.object(storage_service, 'regenerate_signed_url', AsyncMock(return_value="https://signed")):
+            url, provider, file_size = await storage_service.upload_stream(stream, "video.mp4")
+
+        assert (url, provider, file_size) == ("https://signed", "gcs", 10)
+        assert [c.args[0] for c in mock_writer.write.call_args_list] == [b"abcd", b"efgh", b"ij"]
+        assert stream.closed
+        mock_writer.close.assert_called_once()
+        mock_tracker.add_file_usage.assert_called_once()
+
+    @pytest.mark.asyncio
+    @patch('app.services.storage_service.multi_storage')
+    async def test_gcs_producer_failure_leaves_no_blob(self, mock_multi, mock_tracker, storage_service):
+        """Test a stream that fails partway never finalizes the resumable upload"""
+        from app.exceptions import VideoDownloadError
+
+        mock_tracker.get_available_providers_under_limit = AsyncMock(return_value=['gcs'])
+        mock_writer = MagicMock()
+        mock_multi.get_gcs_bucket.return_value.blob.return_value.open.return_value = mock_writer
+        stream = FakeStream([b"abcd"], error=VideoDownloadError("vid", "ffmpeg: stream failed"))
+
+        with pytest.raises(VideoDownloadError):
+            await storage_service.upload_stream(stream, "video.mp4")
+
+        mock_writer.write.assert_called_once_with(b"abcd")
+        mock_writer.close.assert_not_called()
+        mock_tracker.add_file_usage.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch('app.services.storage_service.multi_storage')
+    async def test_s3_producer_failure_aborts_multipart(self, mock_multi, mock_tracker, storage_service):
+        """Test a stream that fails partway aborts the multipart upload"""
+        from app.exceptions import VideoDownloadError
+
+        mock_tracker.get_available_providers_under_limit = AsyncMock(return_value=['s3'])
+        mock_s3 = mock_multi.get_s3_client.return_value
+        mock_multi.get_s3_bucket_name.return_value = "bucket"
+        mock_s3.create_multipart_upload.return_value = {'UploadId': 'upload-1'}
+        mock_s3.upload_part.return_value = {'ETag': 'etag'}
+        stream = FakeStream([b"abcd", b"ef"], error=VideoDownloadError("vid", "Stream stalled."))
+
+        with pytest.raises(VideoDownloadError):
+            await storage_service.upload_stream(stream, "video.mp4")
+
+        assert mock_s3.upload_part.call_count == 2
+        mock_s3.complete_multipart_upload.assert_not_called()
+        mock_s3.abort_multipart_upload.assert_called_once()
+        assert mock_s3.abort_multipart_upload.call_args.kwargs['UploadId'] == 'upload-1'
@@ -0,0 +1,111 @@
+"""
+Unit tests for the stuck job reaper
+"""
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.queue import cleanup_tasks
+
+STALE = datetime(2024, 1, 1, 12, 0, 0)
+URL = "https://www.youtube.com/shorts/abcdefghijk"
+
+
+class TestReapStuckJobs:
+    """Test requeueing and failing processing jobs without a heartbeat"""
+
+    @pytest.fixture
+    def db(self):
+        db = MagicMock()
+        db.downloads.update_one = AsyncMock(return_value=MagicMock(modified_count=1))
+        return db
+
+    @pytest.fixture
+    def reaper(self, db, monkeypatch):
+        monkeypatch.setattr('app.queue.cleanup_tasks.settings.JOB_HEARTBEAT_TTL', 60)
+        monkeypatch.setattr('app.queue.cleanup_tasks.settings.JOB_REAP_MAX_ATTEMPTS', 2)
+        with patch('app.queue.cleanup_tasks._get_db', AsyncMock(return_value=db)), \
+             patch('app.queue.cleanup_tasks._publish_status', AsyncMock()), \
+             patch('app.queue.cleanup_tasks.job_heartbeat') as heartbeat, \
+             patch('app.queue.cleanup_tasks.process_download') as task, \
+             patch('app.queue.cleanup_tasks.dedup_service') as dedup:
+            heartbeat.alive.return_value = set()
+            dedup.find_completed = AsyncMock(return_value=None)
+            yield MagicMock(heartbeat=heartbeat, task=task, dedup=dedup)
+
+    def _candidates(self, db, *downloads):
+        db.downloads.find.return_value.to_list = AsyncMock(return_value=list(downloads))
+
+    @pytest.mark.asyncio
+    async def test_live_heartbeat_is_skipped(self, db, reaper):
+        """Test a job whose worker is still beating is left alone"""
+        self._candidates(db, {'jobId': "job-1", 'url': URL, 'updatedAt': STALE})
+        reaper.heartbeat.alive.return_value = {"job-1"}
+
+        result = await cleanup_tasks._reap_stuck_jobs_async()
+
+        assert result == {'requeued': 0, 'failed': 0}
+        db.downloads.update_one.assert_not_awaited()
+        reaper.task.apply_async.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_orphan_is_requeued_if_unchanged(self, db, reaper):
+        """Test the requeue only matches the updatedAt that was read and counts the attempt"""
+        self._candidates(db, {'jobId': "job-1", 'url': URL, 'updatedAt': STALE, 'reapCount': 1})
+
+        result = await cleanup_tasks._reap_stuck_jobs_async()
+
+        assert result == {'requeued': 1, 'failed': 0}
+        query, update = db.downloads.update_one.await_args.args
+        assert query == {'jobId': "job-1", 'status': 'processing', 'updatedAt': STALE}
+        assert update['$set']['status'] == 'queued'
+        assert update['$set']['reapCount'] == 2
+        reaper.task.apply_async.assert_called_once_with(
+            args=(URL, "job-1", None), queue=cleanup_tasks.download_queue(has_upload=False), task_id="job-1"
+        )
+
+    @pytest.mark.asyncio
+    async def test_requeue_routes_through_download_queue(self, db, reaper):
+        """Test an orphan whose video was uploaded meanwhile goes to the fast queue"""
+        self._candidates(db, {'jobId': "job-1", 'url': URL, 'updatedAt': STALE})
+        reaper.dedup.find_completed.return_value = {'jobId': "job-0"}
+
+        await cleanup_tasks._reap_stuck_jobs_async()
+
+        reaper.dedup.find_completed.assert_awaited_once_with(db, "abcdefghijk")
+        assert reaper.task.apply_async.call_args.kwargs['queue'] == cleanup_tasks.download_queue(has_upload=True)
+
+    @pytest.mark.asyncio
+    async def test_lost_race_is_not_requeued(self, db, reaper):
+        """Test a job that changed since it was read is not requeued"""
+        self._candidates(db, {'jobId': "job-1", 'url': URL, 'updatedAt': STALE})
+        db.downloads.update_one.return_value = MagicMock(modified_count=0)
+
+        result = await cleanup_tasks._reap_stuck_jobs_async()
+
+        assert result == {'requeued': 0, 'failed': 0}
+        reaper.task.apply_async.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_exhausted_attempts_mark_failed(self, db, reaper):
+        """Test a job requeued JOB_REAP_MAX_ATTEMPTS times is failed instead"""
+        self._candidates(db, {'jobId': "job-1", 'url': URL, 'updatedAt': STALE, 'reapCount': 2})
+
+        result = await cleanup_tasks._reap_stuck_jobs_async()
+
+        assert result == {'requeued': 0, 'failed': 1}
+        query, update = db.downloads.update_one.await_args.args
+        assert query['updatedAt'] == STALE
+        assert update['$set']['status'] == 'failed'
+        reaper.task.apply_async.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_outage_aborts_sweep(self, db, reaper):
+        """Test an unreadable heartbeat store reaps nothing"""
+        self._candidates(db, {'jobId': "job-1", 'url': URL, 'updatedAt': STALE})
+        reaper.heartbeat.alive.side_effect = RuntimeError("Heartbeat store is not available")
+
+        with pytest.raises(RuntimeError):
+            await cleanup_tasks._reap_stuck_jobs_async()
+
+        db.downloads.update_one.assert_not_awaited()
+        reaper.task.apply_async.assert_not_called()
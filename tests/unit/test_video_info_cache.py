@@ -0,0 +1,76 @@
+"""
+Unit tests for the video metadata cache
+"""
+import pytest
+from unittest.mock import MagicMock, patch
+from app.services.video_info_cache import VideoInfoCache
+from app.models.download import VideoInfo
+
+
+class TestVideoInfoCache:
+    """Test video info cache behaviour"""
+
+    @pytest.fixture
+    def cache(self):
+        """Create cache instance with a mocked Redis client"""
+        cache = VideoInfoCache()
+        cache.redis_client = MagicMock()
+        return cache
+
+    @pytest.fixture
+    def video_info(self):
+        return VideoInfo(
+            id="test_video_123",
+            title="Test Video Title",
+            thumbnail="https://i.ytimg.com/vi/test_video_123/maxresdefault.jpg",
+            duration=60,
+            quality="1080p"
+        )
+
+    def test_get_hit(self, cache, video_info):
+        """Test cached JSON is returned as VideoInfo"""
+        cache.redis_client.get.return_value = video_info.model_dump_json()
+
+        result = cache.get("test_video_123")
+
+        assert result == video_info
+        cache.redis_client.get.assert_called_with("video:info:test_video_123")
+
+    def test_get_miss(self, cache):
+        """Test miss returns None"""
+        cache.redis_client.get.return_value = None
+
+        assert cache.get("test_video_123") is None
+
+    def test_get_redis_error_is_a_miss(self, cache):
+        """Test Redis failures never break metadata fetches"""
+        cache.redis_client.get.side_effect = Exception("connection refused")
+
+        assert cache.get("test_video_123") is None
+        assert cache.get_negative("test_video_123") is None
+
+    @patch('app.services.video_info_cache.settings')
+    def test_set_evicts_oldest_entries(self, mock_settings, cache, video_info):
+        """Test entries beyond the size bound are evicted oldest first"""
+        mock_settings.VIDEO_INFO_CACHE_ENABLED = True
+        mock_settings.VIDEO_INFO_CACHE_TTL = 60
+        mock_settings.VIDEO_INFO_CACHE_MAX_ENTRIES = 2
+
+        pipe = MagicMock()
+        pipe.execute.return_value = [True, 0, 1, 3]
+        cache.redis_client.pipeline.return_value = pipe
+        cache.redis_client.zpopmin.return_value = [("old_video_01", 1.0)]
+
+        cache.set(video_info)
+
+        cache.redis_client.zpopmin.assert_called_once_with("video:info:index", 1)
+        cache.redis_client.delete.assert_called_once_with("video:info:old_video_01")
+
+    def test_negative_entry(self, cache):
+        """Test unavailable videos are remembered with their reason"""
+        cache.set_negative("gone_video_1", "Video is unavailable")
+        cache.redis_client.get.return_value = "Video is unavailable"
+
+        assert cache.get_negative("gone_video_1") == "Video is unavailable"
+        args = cache.redis_client.setex.call_args[0]
+        assert args[0] == "video:info:neg:gone_video_1"
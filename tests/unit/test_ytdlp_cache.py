@@ -0,0 +1,92 @@
+"""
+Unit tests for the shared yt-dlp cache directory
+"""
+import os
+import time
+import pytest
+from unittest.mock import patch
+from app.services import ytdlp_cache as cache_module
+from app.services.ytdlp_cache import YtDlpCache
+
+
+class TestYtDlpCache:
+    """Test hit/miss accounting and pruning"""
+
+    @pytest.fixture
+    def cache(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(cache_module.settings, 'YTDLP_CACHE_ENABLED', True)
+        monkeypatch.setattr(cache_module.settings, 'YTDLP_CACHE_DIR', str(tmp_path))
+        monkeypatch.setattr(cache_module.settings, 'YTDLP_CACHE_MAX_MB', 64)
+        return YtDlpCache()
+
+    @pytest.fixture
+    def lookups(self):
+        with patch('app.services.ytdlp_cache.ytdlp_cache_lookups_total') as counter:
+            yield counter
+
+    def _write(self, cache, name, data=b"{}", mtime=None):
+        path = cache.path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def _results(self, lookups):
+        return [c.kwargs['result'] for c in lookups.labels.call_args_list]
+
+    def test_untouched_cache_is_hit(self, cache, lookups):
+        """Test a run that writes nothing reused the cache"""
+        self._write(cache, "youtube-nsig/abc.json", mtime=time.time() - 60)
+
+        with cache.track('download'):
+            pass
+
+        assert self._results(lookups) == ['hit']
+
+    def test_written_entry_is_miss(self, cache, lookups):
+        """Test a run that stores a new entry had to compute it"""
+        with cache.track('download'):
+            self._write(cache, "youtube-nsig/abc.json")
+
+        assert self._results(lookups) == ['miss']
+
+    def test_overlapping_runs_count_one_miss(self, cache, lookups):
+        """Test an entry written while two runs overlap is a miss for only one of them"""
+        with cache.track('get_video_info'):
+            with cache.track('download'):
+                self._write(cache, "youtube-nsig/abc.json")
+
+        assert sorted(self._results(lookups)) == ['hit', 'miss']
+
+    def test_rewritten_entry_is_miss_again(self, cache, lookups):
+        """Test a recomputed entry (new player version) counts again"""
+        with cache.track('download'):
+            self._write(cache, "youtube-nsig/abc.json")
+        with cache.track('download'):
+            self._write(cache, "youtube-nsig/abc.json", mtime=time.time() + 1)
+
+        assert self._results(lookups) == ['miss', 'miss']
+
+    def test_prune_drops_oldest_and_keeps_index(self, cache, monkeypatch):
+        """Test pruning removes the least recently written entries only"""
+        monkeypatch.setattr(cache_module.settings, 'YTDLP_CACHE_MAX_MB', 1)
+        now = time.time()
+        self._write(cache, "youtube-sigfuncs/old.json", b"x" * 700 * 1024, mtime=now - 100)
+        self._write(cache, "youtube-nsig/new.json", b"x" * 700 * 1024, mtime=now)
+        with cache.track('download'):
+            pass
+
+        assert cache.prune() == 1
+        assert not (cache.path / "youtube-sigfuncs/old.json").exists()
+        assert (cache.path / "youtube-nsig/new.json").exists()
+        assert (cache.path / cache_module.INDEX_FILE).exists()
+
+    def test_disabled_cache(self, cache, lookups, monkeypatch):
+        """Test a disabled cache is neither used nor counted"""
+        monkeypatch.setattr(cache_module.settings, 'YTDLP_CACHE_ENABLED', False)
+
+        with cache.track('download'):
+            pass
+
+        assert cache.cli_args() == ['--no-cache-dir']
+        lookups.labels.assert_not_called()
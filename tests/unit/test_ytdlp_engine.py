@@ -0,0 +1,125 @@
+"""
+Unit tests for the in-process yt-dlp engine pool
+"""
+import os
+import threading
+import time
+import pytest
+from app.services.ytdlp_engine import (
+    EngineCancelled,
+    EngineStalled,
+    YtDlpEngine,
+    YtDlpEngineError,
+    YtDlpEngineUnavailable,
+)
+from app.utils.process_usage import ProcessUsage
+
+
+def _sleep_then_return(seconds: float, value):
+    """Stand-in for a yt-dlp call running in a pool worker"""
+    time.sleep(seconds)
+    return value
+
+
+def _pid():
+    return os.getpid()
+
+
+def _fail(message: str):
+    raise ValueError(message)
+
+
+def _die():
+    os._exit(1)
+
+
+class TestYtDlpEngine:
+    """Test per-call isolation of the engine's worker processes"""
+
+    @pytest.fixture
+    def engine(self):
+        # fork keeps the test quick and inherits this interpreter's modules
+        engine = YtDlpEngine(max_workers=2, start_method='fork')
+        engine._available = True
+        engine.POLL_INTERVAL = 0.05
+        yield engine
+        engine.shutdown()
+
+    def test_returns_result_and_usage(self, engine):
+        """Test a call's result and resource usage come back from the worker"""
+        usages = []
+
+        assert engine._run(_sleep_then_return, 0, "info", on_usage=usages.append) == "info"
+        assert isinstance(usages[0], ProcessUsage)
+        assert usages[0].processes == 1
+
+    def test_errors_keep_the_worker(self, engine):
+        """Test a yt-dlp error is raised and the worker is reused"""
+        pid = engine._run(_pid)
+
+        with pytest.raises(YtDlpEngineError, match="private video"):
+            engine._run(_fail, "private video")
+
+        assert engine._run(_pid) == pid
+
+    def _in_flight(self, engine, results):
+        """Start a slow call in another thread that must survive its neighbour being killed"""
+        thread = threading.Thread(target=lambda: results.append(engine._run(_sleep_then_return, 0.5, "survived")))
+        thread.start()
+        time.sleep(0.1)
+        return thread
+
+    def test_timeout_kills_only_its_worker(self, engine):
+        """Test a timed-out call does not take the other in-flight call down"""
+        results = []
+        thread = self._in_flight(engine, results)
+
+        with pytest.raises(TimeoutError):
+            engine._run(_sleep_then_return, 30, None, timeout=0.2)
+
+        thread.join(timeout=5)
+        assert results == ["survived"]
+
+    def test_stall_kills_only_its_worker(self, engine):
+        """Test a stalled call is ended while another call completes"""
+        results = []
+        thread = self._in_flight(engine, results)
+
+        with pytest.raises(EngineStalled):
+            engine._run(_sleep_then_return, 30, None, stalled=lambda: True)
+
+        thread.join(timeout=5)
+        assert results == ["survived"]
+
+    def test_cancel_kills_only_its_worker(self, engine):
+        """Test a cancelled call is ended while another call completes"""
+        results = []
+        thread = self._in_flight(engine, results)
+
+        with pytest.raises(EngineCancelled):
+            engine._run(_sleep_then_return, 30, None, cancelled=lambda: True)
+
+        thread.join(timeout=5)
+        assert results == ["survived"]
+
+    def test_killed_worker_is_replaced(self, engine):
+        """Test the next call after a kill gets a fresh worker"""
+        with pytest.raises(TimeoutError):
+            engine._run(_sleep_then_return, 30, None, timeout=0.1)
+
+        assert engine._run(_sleep_then_return, 0, "ok") == "ok"
+
+    def test_worker_death_is_unavailable(self, engine):
+        """Test a worker dying under a call lets the caller fall back to the subprocess path"""
+        with pytest.raises(YtDlpEngineUnavailable):
+            engine._run(_die)
+
+        assert engine._run(_sleep_then_return, 0, "ok") == "ok"
+
+    def test_workers_are_recycled(self, engine):
+        """Test a worker is replaced after max_tasks_per_worker calls"""
+        engine.max_tasks_per_worker = 2
+        first = engine._run(_pid)
+        assert engine._run(_pid) == first
+
+        assert engine._run(_pid) != first